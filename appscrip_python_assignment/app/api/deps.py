@@ -1,9 +1,16 @@
-from fastapi import Depends
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Awaitable, Callable, Optional, TypeVar
 
+from fastapi import Depends, HTTPException, Response, status
+
+from app.core.admission import admission
 from app.core.security import get_current_user
-from app.core.rate_limiter import rate_limiter_dependency
+from app.core.rate_limiter import charge_rate_limit, rate_limiter_dependency
 from app.core.session import touch_session
 from app.schemas.auth import UserInDB
+from app.services.sector_index import canonicalize
+
+T = TypeVar("T")
 
 
 # async def get_active_user(user: UserInDB = Depends(get_current_user)) -> UserInDB:
@@ -20,5 +27,53 @@ async def with_rate_limit(
     Combines: authenticated user + rate limit check + session touch.
     Returns the current user for use in endpoints.
     """
-    touch_session(user.username)
+    await touch_session(user.username)
     return user
+
+
+def admitted(dependency: Callable[..., Awaitable[T]]) -> Callable[..., AsyncIterator[T]]:
+    """
+    `dependency` (authentication + rate limiting), then an admission slot
+    (503 when the server is at capacity), so rate-limited callers never
+    queue. The slot is held until the response, streamed or not, is sent.
+    """
+
+    async def _admitted(
+        result: T = Depends(dependency),
+        user: UserInDB = Depends(get_current_user),
+    ) -> AsyncIterator[T]:
+        async with admission.slot(user.priority):
+            yield result
+
+    return _admitted
+
+
+@asynccontextmanager
+async def charged_slot(user: UserInDB, response: Optional[Response] = None) -> AsyncIterator[None]:
+    """
+    For endpoints that answer from a cache first: charge the rate limit and
+    hold an admission slot only around the work a miss costs. Rate-limit
+    headers are added to `response`.
+    """
+    await charge_rate_limit(user.username, response=response)
+    async with admission.slot(user.priority):
+        yield
+
+
+# path segments of other /analyze/... routes, never sector names (e.g. a
+# GET /analyze/jobs would otherwise reach /analyze/{sector})
+RESERVED_SECTOR_NAMES = frozenset({"jobs", "batch"})
+
+
+def clean_sector(sector: str) -> str:
+    """
+    Normalize a sector path/body value to its canonical sector ("IT services"
+    -> "information technology"); 400 if empty, too long or reserved.
+    """
+    sector_clean = sector.strip().lower()
+    if not sector_clean or len(sector_clean) > 60 or sector_clean in RESERVED_SECTOR_NAMES:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Invalid sector name.",
+        )
+    return canonicalize(sector_clean)
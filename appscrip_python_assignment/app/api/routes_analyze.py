@@ -1,62 +1,419 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+import asyncio
+import json
+import math
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from email.utils import formatdate, parsedate_to_datetime
+from functools import partial
+from typing import AsyncIterator, Dict, Iterator, List, Optional, Tuple
 
-from app.api.deps import with_rate_limit
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Response, status
+from fastapi.responses import StreamingResponse
+
+from app.api.deps import admitted, charged_slot, clean_sector, with_rate_limit
+from app.config import settings
+from app.core.admission import admission
+from app.core.cache import CacheEntry, report_cache
+from app.core.metrics import UPSTREAM_ERRORS
+from app.core.rate_limiter import RateLimitResult, charge_rate_limit, rate_limit_headers
+from app.core.report_store import StoredReport, report_store
+from app.core.security import get_current_user
+from app.core.session import record_sector_request, touch_session
 from app.schemas.auth import UserInDB
-from app.schemas.analyze import AnalyzeResponse
-from app.services.collector import collect_sector_info
-from app.services.ai_client import analyze_with_gemini
-from app.services.report_builder import build_markdown_report
+from app.schemas.analyze import AnalyzeResponse, BatchAnalyzeRequest
+from app.services.batch import batch_cost, run_batch
+from app.services.pipeline import (
+    Section,
+    SectionFeed,
+    publish_report,
+    report_sources,
+    run_analysis_pipeline,
+    stream_analysis_pipeline,
+)
+from app.services.report_builder import (
+    ANALYSIS_SECTIONS,
+    build_html_report,
+    build_report_document,
+    markdown_as_html,
+    render_header,
+    render_sources,
+)
 
 router = APIRouter(tags=["analysis"])
 
 
+def _fresh_for(report: StoredReport) -> float:
+    """Seconds the report stays current (same TTLs as the report cache)."""
+    ttl = (
+        settings.report_cache_degraded_ttl_seconds
+        if report.degraded
+        else settings.report_cache_ttl_seconds
+    )
+    return ttl - report.age()
+
+
+# representation -> response media type (`json` is AnalyzeResponse)
+REPORT_MEDIA_TYPES = {
+    "json": "application/json",
+    "markdown": "text/markdown; charset=utf-8",
+    "html": "text/html; charset=utf-8",
+}
+# Accept media range -> representation
+_ACCEPTED = {
+    "application/json": "json",
+    "application/*": "json",
+    "*/*": "json",
+    "text/markdown": "markdown",
+    "text/*": "markdown",
+    "text/html": "html",
+}
+
+
+def _negotiate(accept: Optional[str]) -> str:
+    """Pick a representation from an Accept header (highest q, then first listed)."""
+    if not accept:
+        return "json"
+    best, best_q = None, 0.0
+    for media_range in accept.split(","):
+        media_type, _, params = media_range.strip().partition(";")
+        fmt = _ACCEPTED.get(media_type.strip().lower())
+        if fmt is None:
+            continue
+        q = 1.0
+        for param in params.split(";"):
+            name, _, value = param.strip().partition("=")
+            if name == "q":
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.0
+        if q > best_q:
+            best, best_q = fmt, q
+    if best is None:
+        raise HTTPException(
+            status_code=status.HTTP_406_NOT_ACCEPTABLE,
+            detail="Supported: " + ", ".join(sorted(set(_ACCEPTED))),
+        )
+    return best
+
+
+def _etag_for(report: StoredReport, fmt: str) -> str:
+    # json keeps the report's own ETag; other representations get a suffix
+    return report.etag if fmt == "json" else report.etag[:-1] + f'-{fmt}"'
+
+
+def _validators(report: StoredReport, etag: Optional[str] = None) -> dict:
+    return {
+        "ETag": etag or report.etag,
+        "Last-Modified": formatdate(report.generated_at, usegmt=True),
+        "Cache-Control": f"private, max-age={max(0, math.floor(_fresh_for(report)))}",
+    }
+
+
+def _not_modified(
+    report: StoredReport,
+    if_none_match: Optional[str],
+    if_modified_since: Optional[str],
+    etag: Optional[str] = None,
+) -> bool:
+    if if_none_match is not None:
+        # If-None-Match wins over If-Modified-Since (RFC 9110 13.1.3); weak compare
+        tags = {tag.strip().removeprefix("W/") for tag in if_none_match.split(",")}
+        return "*" in tags or (etag or report.etag) in tags
+    if if_modified_since is not None:
+        try:
+            since = parsedate_to_datetime(if_modified_since).timestamp()
+        except (TypeError, ValueError):
+            return False
+        return int(report.generated_at) <= since
+    return False
+
+
+def _sse(event: str, data: dict) -> str:
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+def _section_event(section: str, lines: list[str]) -> str:
+    return _sse("section", {"section": section, "markdown": "\n".join(lines)})
+
+
+def _entry_sections(entry: CacheEntry) -> Iterator[Section]:
+    yield "header", render_header(entry.collected)
+    yield "sources", render_sources(entry.collected)
+    for field, render in ANALYSIS_SECTIONS.items():
+        yield field, render(entry.analysis)
+
+
+# live sections of the streamed loads in flight
+_live_feeds: Dict[asyncio.Task, SectionFeed] = {}
+
+
+def _streamed_load(sector: str) -> Tuple[asyncio.Task, Optional[SectionFeed]]:
+    """
+    The load of `sector` in flight, with its live sections if it is a
+    streamed one; otherwise a new streamed load. Either way, concurrent
+    streams and `/analyze` calls share one pipeline run.
+    """
+    task = report_cache.join(sector, "India")
+    if task is not None:
+        return task, _live_feeds.get(task)
+    feed = SectionFeed()
+    task = report_cache.start(
+        sector, "India", partial(stream_analysis_pipeline, sector, "India", feed)
+    )
+    _live_feeds[task] = feed
+    task.add_done_callback(lambda done: _live_feeds.pop(done, None))
+    return task, feed
+
+
+async def stream_admission(
+    sector: str,
+    current_user: UserInDB = Depends(with_rate_limit),
+) -> AsyncIterator[UserInDB]:
+    """
+    An admission slot, held until the last event is sent, for streams that
+    have to run (or join) a pipeline load; a cached report streams without one.
+    """
+    if report_cache.peek(clean_sector(sector), "India") is not None:
+        yield current_user
+        return
+    async with admission.slot(current_user.priority):
+        yield current_user
+
+
+@router.get(
+    "/analyze/{sector}/stream",
+    summary="Stream the report as server-sent events while Gemini generates it",
+    response_class=StreamingResponse,
+)
+async def analyze_sector_stream(
+    sector: str,
+    response: Response,
+    current_user: UserInDB = Depends(stream_admission),
+):
+    """
+    Same report as `/analyze/{sector}`, delivered incrementally (text/event-stream).
+
+    Events:
+    - `section`: `{"section": ..., "markdown": ...}`. The header and source
+      snippets are sent as soon as collection finishes; analysis sections
+      (summary, time_horizon, opportunities, risks, evidence_points) follow
+      as Gemini produces them.
+    - `done`: `{"markdown_report": ...}` with the complete report, as stored
+      in the report history.
+    - `error`: `{"detail": ...}` if generation fails mid-stream.
+    """
+
+    sector_clean = clean_sector(sector)
+    record_sector_request(sector_clean)
+
+    async def _events():
+        try:
+            entry = report_cache.peek(sector_clean, "India")
+            if entry is None:
+                task, feed = _streamed_load(sector_clean)
+                if feed is not None:
+                    async for name, lines in feed.follow():
+                        yield _section_event(name, lines)
+                # shield: this client leaving must not stop the shared run
+                entry = await asyncio.shield(task)
+            else:
+                feed = None
+            if feed is None:
+                for name, lines in _entry_sections(entry):
+                    yield _section_event(name, lines)
+
+            report = await publish_report(entry)
+            yield _sse("done", {"markdown_report": report.markdown})
+        except Exception as exc:
+            yield _sse("error", {"detail": f"Failed to generate analysis: {exc}"})
+
+    return StreamingResponse(
+        _events(),
+        media_type="text/event-stream",
+        # carry over the rate-limit headers set by the dependency
+        headers={
+            **response.headers,
+            "Cache-Control": "no-cache",
+            "X-Accel-Buffering": "no",
+        },
+    )
+
+
+@dataclass
+class ChargedBatch:
+    sectors: List[str]
+    pack_prompts: bool
+    charged: RateLimitResult
+
+
+async def charge_batch(
+    body: BatchAnalyzeRequest,
+    current_user: UserInDB = Depends(get_current_user),
+) -> ChargedBatch:
+    """Validate a batch and charge its Gemini calls to the user's batch bucket."""
+    sectors: list[str] = []
+    for raw in body.sectors:
+        sector_clean = clean_sector(raw)
+        if sector_clean not in sectors:
+            sectors.append(sector_clean)
+    if len(sectors) > settings.batch_max_sectors:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"At most {settings.batch_max_sectors} sectors per batch.",
+        )
+    for sector_clean in sectors:
+        record_sector_request(sector_clean)
+
+    charged = await charge_rate_limit(
+        current_user.username,
+        batch_cost(sectors, body.pack_prompts),
+        limit=settings.batch_rate_limit_calls,
+        bucket="batch",
+    )
+    await touch_session(current_user.username)
+    return ChargedBatch(sectors, body.pack_prompts, charged)
+
+
+@router.post(
+    "/analyze/batch",
+    summary="Analyze many sectors; results stream back as NDJSON",
+    response_class=StreamingResponse,
+    responses={
+        413: {"description": "The batch needs more Gemini calls than BATCH_RATE_LIMIT_CALLS"},
+        503: {"description": "At capacity (admission control); see Retry-After"},
+    },
+)
+async def analyze_batch(batch: ChargedBatch = Depends(admitted(charge_batch))):
+    """
+    Analyze several sectors in one request.
+
+    Each line of the response is a JSON object (`sector`, `status`,
+    `markdown_report` or `detail`), written as soon as that sector completes.
+    Batches are charged per Gemini call they need, from a per-user budget of
+    BATCH_RATE_LIMIT_CALLS per window (separate from single requests), so
+    cached sectors are free and `pack_prompts=true` is cheaper.
+    """
+
+    async def _ndjson_lines():
+        async for item in run_batch(batch.sectors, pack_prompts=batch.pack_prompts):
+            yield item.model_dump_json() + "\n"
+
+    return StreamingResponse(
+        _ndjson_lines(),
+        media_type="application/x-ndjson",
+        headers=rate_limit_headers(batch.charged, settings.batch_rate_limit_calls),
+    )
+
+
 @router.get(
     "/analyze/{sector}",
     response_model=AnalyzeResponse,
-    summary="Analyze a sector and return a markdown trade opportunities report",
+    summary="Analyze a sector and return a trade opportunities report",
+    responses={
+        200: {
+            "content": {
+                "text/markdown": {"schema": {"type": "string"}},
+                "text/html": {"schema": {"type": "string"}},
+            }
+        },
+        406: {"description": "None of the Accept media types is supported"},
+        503: {"description": "At capacity (admission control); see Retry-After"},
+    },
 )
 async def analyze_sector(
     sector: str,
-    current_user: UserInDB = Depends(with_rate_limit),
+    response: Response,
+    format: Optional[str] = Query(
+        None,
+        pattern="^(json|markdown|html)$",
+        description="Representation; overrides the Accept header",
+    ),
+    accept: Optional[str] = Header(None),
+    if_none_match: Optional[str] = Header(None),
+    if_modified_since: Optional[str] = Header(None),
+    current_user: UserInDB = Depends(get_current_user),
 ):
     """
-    Analyze a given sector in India and return a structured markdown report.
+    Analyze a given sector in India and return a structured report.
 
     Steps:
     1. Validate sector input.
     2. Collect recent web information about the sector (India-focused).
     3. Use Gemini to analyze the collected data.
-    4. Build a markdown report from the AI analysis.
-    """
+       (steps 2-3 are served from the report cache or the report store
+       while the last report is still fresh)
+    4. Build a markdown report from the AI analysis and store it.
 
-    sector_clean = sector.strip().lower()
-    if not sector_clean or len(sector_clean) > 60:
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail="Invalid sector name.",
-        )
+    The representation follows `Accept` (or `?format=`):
+    - `application/json` (default): `AnalyzeResponse` with the markdown and
+      the report as structured data (`report`)
+    - `text/markdown`: the markdown report itself
+    - `text/html`: a standalone HTML page
 
-    try:
-        # Step 1: Collect data
-        collected = await collect_sector_info(sector_clean, country="India")
-
-        # Step 2: AI analysis (Gemini)
-        analysis = await analyze_with_gemini(collected)
+    Responses carry `ETag` / `Last-Modified`; a matching `If-None-Match`
+    (or `If-Modified-Since`) gets `304 Not Modified`. Fresh reports (and
+    304s) are free; only a request that runs the pipeline is rate-limited
+    and takes an admission slot.
+    """
 
-        # Step 3: Build markdown report
-        markdown = build_markdown_report(collected, analysis)
+    sector_clean = clean_sector(sector)
+    fmt = format or _negotiate(accept)
+    record_sector_request(sector_clean)
+    await touch_session(current_user.username)
 
-        return AnalyzeResponse(
-            sector=sector_clean,
-            markdown_report=markdown,
-        )
+    entry: Optional[CacheEntry] = None
+    try:
+        entry = report_cache.peek(sector_clean, "India")
+        if entry is not None:
+            report = await publish_report(entry)
+        else:
+            # e.g. after a restart, or generated by another worker
+            report = await report_store.latest(sector_clean, "India")
+            if report is None or _fresh_for(report) <= 0:
+                # Step 1 + 2: Collect data and run AI analysis (Gemini), cached
+                async with charged_slot(current_user, response):
+                    entry = await report_cache.get_or_load(
+                        sector_clean,
+                        "India",
+                        partial(run_analysis_pipeline, sector_clean, country="India"),
+                    )
+                # Step 3: Build markdown report
+                report = await publish_report(entry)
 
     except HTTPException:
         # Let FastAPI handle explicit HTTP errors as-is
         raise
     except Exception as exc:
         # Wrap unexpected errors as 502 (bad gateway)
+        UPSTREAM_ERRORS.inc("analyze")
         raise HTTPException(
             status_code=status.HTTP_502_BAD_GATEWAY,
             detail=f"Failed to generate analysis: {exc}",
         ) from exc
+
+    etag = _etag_for(report, fmt)
+    # carry over the rate-limit headers of a charged request
+    headers = {**response.headers, **_validators(report, etag), "Vary": "Accept"}
+    if _not_modified(report, if_none_match, if_modified_since, etag):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+
+    if fmt == "markdown":
+        return Response(report.markdown, media_type=REPORT_MEDIA_TYPES[fmt], headers=headers)
+
+    sources = (entry.collected, entry.analysis) if entry is not None else report_sources(report)
+    generated_at = datetime.fromtimestamp(report.generated_at, tz=timezone.utc)
+    if fmt == "html":
+        html = (
+            build_html_report(*sources, generated_at=generated_at)
+            if sources is not None
+            else markdown_as_html(report.markdown)
+        )
+        return Response(html, media_type=REPORT_MEDIA_TYPES[fmt], headers=headers)
+
+    response.headers.update(headers)
+    return AnalyzeResponse(
+        sector=sector_clean,
+        markdown_report=report.markdown,
+        report=build_report_document(*sources, generated_at) if sources is not None else None,
+    )
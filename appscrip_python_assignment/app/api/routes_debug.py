@@ -0,0 +1,53 @@
+from fastapi import APIRouter, Depends, HTTPException, Query, Response, status
+
+from app.core.diagnostics import format_collapsed, loop_monitor, profile_for, profile_store
+from app.core.security import get_admin_user
+from app.schemas.auth import UserInDB
+
+# Mounted only with DIAGNOSTICS_ENABLED=true; admin users only
+router = APIRouter(prefix="/debug", tags=["ops"])
+
+COLLAPSED_MEDIA_TYPE = "text/plain; charset=utf-8"
+
+
+@router.get("/loop", summary="Event-loop lag and recent blocking callbacks")
+async def loop_stats(current_user: UserInDB = Depends(get_admin_user)):
+    """Heartbeat lag and the stacks captured for the last stalls."""
+    return loop_monitor.stats()
+
+
+@router.post(
+    "/profile",
+    summary="Sample the whole process for a few seconds",
+    response_class=Response,
+)
+async def profile_process(
+    seconds: float = Query(5.0, gt=0, le=60),
+    current_user: UserInDB = Depends(get_admin_user),
+):
+    """
+    Collapsed stacks (one `frame;frame;... count` line per stack), ready for
+    flamegraph.pl or speedscope.
+    """
+    counts = await profile_for(seconds)
+    return Response(content=format_collapsed(counts), media_type=COLLAPSED_MEDIA_TYPE)
+
+
+@router.get("/profiles", summary="List recent per-request profiles")
+async def list_profiles(current_user: UserInDB = Depends(get_admin_user)):
+    return profile_store.list()
+
+
+@router.get(
+    "/profiles/{profile_id}",
+    summary="Collapsed stacks of one profiled request",
+    response_class=Response,
+)
+async def get_profile(profile_id: str, current_user: UserInDB = Depends(get_admin_user)):
+    profile = profile_store.get(profile_id)
+    if profile is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Unknown or expired profile id.",
+        )
+    return Response(content=profile["collapsed"], media_type=COLLAPSED_MEDIA_TYPE)
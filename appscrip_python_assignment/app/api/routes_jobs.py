@@ -0,0 +1,91 @@
+import math
+from datetime import datetime, timezone
+from typing import Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Response, status
+
+from app.api.deps import clean_sector, with_rate_limit
+from app.config import settings
+from app.core.security import get_current_user
+from app.core.session import record_sector_request
+from app.schemas.analyze import AnalyzeJobRequest, AnalyzeJobStatus
+from app.schemas.auth import UserInDB
+from app.services.jobs import JobRecord, QueueFullError, job_backend, new_job
+
+router = APIRouter(tags=["analysis"])
+
+
+def _dt(ts: Optional[float]) -> Optional[datetime]:
+    return datetime.fromtimestamp(ts, tz=timezone.utc) if ts is not None else None
+
+
+def _job_status(job: JobRecord) -> AnalyzeJobStatus:
+    return AnalyzeJobStatus(
+        id=job.id,
+        sector=job.sector,
+        status=job.status,
+        created_at=_dt(job.created_at),
+        started_at=_dt(job.started_at),
+        finished_at=_dt(job.finished_at),
+        report_id=job.report_id,
+        markdown_report=job.markdown,
+        detail=job.error,
+    )
+
+
+@router.post(
+    "/analyze/jobs",
+    response_model=AnalyzeJobStatus,
+    status_code=status.HTTP_202_ACCEPTED,
+    summary="Queue a sector analysis and return a job id immediately",
+)
+async def create_analyze_job(
+    body: AnalyzeJobRequest,
+    response: Response,
+    current_user: UserInDB = Depends(with_rate_limit),
+):
+    """
+    Start an analysis without holding the connection open; poll
+    `GET /analyze/jobs/{id}` (also sent as `Location`) for the result.
+
+    A queued or running job of yours for the same sector is returned
+    instead of starting a new one. Returns 429 when the job queue is full.
+    """
+
+    sector_clean = clean_sector(body.sector)
+    record_sector_request(sector_clean)
+
+    try:
+        job = await job_backend.submit(new_job(sector_clean, username=current_user.username))
+    except QueueFullError:
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail="Too many pending analysis jobs. Please try again later.",
+            # roughly one pipeline run frees a slot
+            headers={
+                **response.headers,
+                "Retry-After": str(math.ceil(settings.llm_timeout_seconds)),
+            },
+        )
+
+    response.headers["Location"] = f"/analyze/jobs/{job.id}"
+    return _job_status(job)
+
+
+@router.get(
+    "/analyze/jobs/{job_id}",
+    response_model=AnalyzeJobStatus,
+    summary="Poll an analysis job",
+)
+async def get_analyze_job(
+    job_id: str,
+    current_user: UserInDB = Depends(get_current_user),
+):
+    job = await job_backend.get(job_id)
+    # someone else's job: same answer as an unknown id
+    if job is None or job.username != current_user.username:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Job not found (unknown id or result expired).",
+        )
+    return _job_status(job)
@@ -0,0 +1,53 @@
+from datetime import datetime, timezone
+from typing import Optional
+
+from fastapi import APIRouter, Depends, Query
+
+from app.api.deps import clean_sector
+from app.core.report_store import report_store
+from app.core.security import get_current_user
+from app.schemas.auth import UserInDB
+from app.schemas.reports import ReportHistoryResponse, StoredReportItem
+
+router = APIRouter(tags=["reports"])
+
+
+@router.get(
+    "/reports/{sector}/history",
+    response_model=ReportHistoryResponse,
+    summary="List previously generated reports for a sector, newest first",
+)
+async def report_history(
+    sector: str,
+    limit: int = Query(20, ge=1, le=100),
+    before: Optional[int] = Query(None, ge=1, description="`next_before` of the previous page"),
+    include_reports: bool = Query(False, description="Include the markdown of each report"),
+    current_user: UserInDB = Depends(get_current_user),
+):
+    """
+    Read report history from the report store; never runs the pipeline.
+    """
+
+    sector_clean = clean_sector(sector)
+
+    # fetch one extra row to know whether another page exists
+    reports = await report_store.history(
+        sector_clean, "India", limit=limit + 1, before_id=before
+    )
+    page = reports[:limit]
+
+    return ReportHistoryResponse(
+        sector=sector_clean,
+        items=[
+            StoredReportItem(
+                id=report.id,
+                sector=report.sector,
+                generated_at=datetime.fromtimestamp(report.generated_at, tz=timezone.utc),
+                etag=report.etag,
+                degraded=report.degraded,
+                markdown_report=report.markdown if include_reports else None,
+            )
+            for report in page
+        ],
+        next_before=page[-1].id if len(reports) > limit else None,
+    )
@@ -1,4 +1,9 @@
 # from pydantic import BaseSettings, Field
+import os
+import tempfile
+from functools import lru_cache
+from typing import Any, Optional, cast
+
 from pydantic_settings import BaseSettings
 from pydantic import Field
 
@@ -7,13 +12,196 @@ class Settings(BaseSettings):
     gemini_api_key: str = Field(..., env="GEMINI_API_KEY")
     rate_limit_requests: int = Field(3, env="RATE_LIMIT_REQUESTS")
     rate_limit_window_seconds: int = Field(60, env="RATE_LIMIT_WINDOW_SECONDS")
+    # "memory" (single process), "shm" (shared by the workers on one host,
+    # see `python -m app.serve`) or "redis" (shared across workers/nodes)
+    rate_limit_backend: str = Field("memory", env="RATE_LIMIT_BACKEND")
+    rate_limit_max_buckets: int = Field(100_000, env="RATE_LIMIT_MAX_BUCKETS")  # shm table size
+    rate_limit_idle_seconds: int = Field(3600, env="RATE_LIMIT_IDLE_SECONDS")
+    rate_limit_sweep_interval_seconds: int = Field(60, env="RATE_LIMIT_SWEEP_INTERVAL_SECONDS")
+    redis_url: str = Field("redis://localhost:6379/0", env="REDIS_URL")
     jwt_secret: str = Field(..., env="JWT_SECRET")
     jwt_algorithm: str = Field("HS256", env="JWT_ALGORITHM")
     jwt_expire_minutes: int = Field(60, env="JWT_EXPIRE_MINUTES")
+    auth_token_cache_size: int = Field(4096, env="AUTH_TOKEN_CACHE_SIZE")
+    auth_hash_workers: int = Field(2, env="AUTH_HASH_WORKERS")
+    auth_hash_max_queue: int = Field(64, env="AUTH_HASH_MAX_QUEUE")
+    # JSON user store with precomputed bcrypt hashes (defaults to app/data/users.json)
+    users_file: Optional[str] = Field(None, env="USERS_FILE")
+
+    # import Gemini/lxml/passlib in a background thread at startup instead of
+    # on the first request that needs them (imports are lazy either way)
+    preload_on_startup: bool = Field(True, env="PRELOAD_ON_STARTUP")
+
+    # per-user session stats: "memory" (per process), "shm" (per host) or "redis" (shared)
+    session_backend: str = Field("memory", env="SESSION_BACKEND")
+    session_max_entries: int = Field(100_000, env="SESSION_MAX_ENTRIES")
+    session_idle_seconds: int = Field(3600, env="SESSION_IDLE_SECONDS")
+
+    # report cache (collected data + AI analysis per sector)
+    report_cache_ttl_seconds: int = Field(900, env="REPORT_CACHE_TTL_SECONDS")
+    report_cache_stale_seconds: int = Field(1800, env="REPORT_CACHE_STALE_SECONDS")
+    report_cache_max_entries: int = Field(256, env="REPORT_CACHE_MAX_ENTRIES")
+    report_cache_max_bytes: int = Field(8_000_000, env="REPORT_CACHE_MAX_BYTES")
+    report_cache_degraded_ttl_seconds: int = Field(60, env="REPORT_CACHE_DEGRADED_TTL_SECONDS")
+
+    # persistent report history (SQLite file)
+    report_store_path: str = Field("reports.sqlite3", env="REPORT_STORE_PATH")
+    report_store_history_limit: int = Field(200, env="REPORT_STORE_HISTORY_LIMIT")
+
+    # background refresh of frequently requested sectors
+    prewarm_enabled: bool = Field(True, env="PREWARM_ENABLED")
+    prewarm_top_k: int = Field(12, env="PREWARM_TOP_K")
+    prewarm_min_requests: float = Field(3.0, env="PREWARM_MIN_REQUESTS")
+    prewarm_interval_seconds: float = Field(60.0, env="PREWARM_INTERVAL_SECONDS")
+    prewarm_lead_seconds: float = Field(180.0, env="PREWARM_LEAD_SECONDS")
+    prewarm_jitter: float = Field(0.2, env="PREWARM_JITTER")
+    prewarm_max_calls_per_minute: int = Field(6, env="PREWARM_MAX_CALLS_PER_MINUTE")
+    prewarm_half_life_seconds: float = Field(3600.0, env="PREWARM_HALF_LIFE_SECONDS")
+    prewarm_max_tracked_sectors: int = Field(1024, env="PREWARM_MAX_TRACKED_SECTORS")
+
+    # async analysis jobs (POST /analyze/jobs)
+    # "memory" (workers run in the API process) or "redis" (python -m app.worker)
+    jobs_backend: str = Field("memory", env="JOBS_BACKEND")
+    jobs_max_queue: int = Field(100, env="JOBS_MAX_QUEUE")
+    jobs_workers: int = Field(4, env="JOBS_WORKERS")
+    # set false on API processes when dedicated workers consume a redis queue
+    jobs_run_workers: bool = Field(True, env="JOBS_RUN_WORKERS")
+    jobs_result_ttl_seconds: int = Field(3600, env="JOBS_RESULT_TTL_SECONDS")
+    # redis: a worker silent for this long is presumed dead; the jobs it had
+    # taken go back to the front of the queue
+    jobs_lease_seconds: int = Field(30, env="JOBS_LEASE_SECONDS")
+
+    # /metrics (Prometheus) and the optional Server-Timing response header
+    metrics_enabled: bool = Field(True, env="METRICS_ENABLED")
+    metrics_server_timing: bool = Field(False, env="METRICS_SERVER_TIMING")
+
+    # opt-in event-loop lag / blocking detector and sampling profiler (/debug/*)
+    diagnostics_enabled: bool = Field(False, env="DIAGNOSTICS_ENABLED")
+    diagnostics_lag_interval_seconds: float = Field(0.1, env="DIAGNOSTICS_LAG_INTERVAL_SECONDS")
+    diagnostics_slow_callback_ms: float = Field(100.0, env="DIAGNOSTICS_SLOW_CALLBACK_MS")
+    diagnostics_profile_interval_ms: float = Field(5.0, env="DIAGNOSTICS_PROFILE_INTERVAL_MS")
+    diagnostics_profile_header: str = Field("X-Profile", env="DIAGNOSTICS_PROFILE_HEADER")
+    diagnostics_max_profiles: int = Field(20, env="DIAGNOSTICS_MAX_PROFILES")
+
+    # shared outbound HTTP client (connection pool)
+    http_max_connections: int = Field(100, env="HTTP_MAX_CONNECTIONS")
+    http_max_keepalive_connections: int = Field(20, env="HTTP_MAX_KEEPALIVE_CONNECTIONS")
+    http_keepalive_expiry_seconds: float = Field(30.0, env="HTTP_KEEPALIVE_EXPIRY_SECONDS")
+    http_http2: bool = Field(False, env="HTTP_HTTP2")
+    http_connect_timeout_seconds: float = Field(3.0, env="HTTP_CONNECT_TIMEOUT_SECONDS")
+    http_read_timeout_seconds: float = Field(10.0, env="HTTP_READ_TIMEOUT_SECONDS")
+    http_per_host_concurrency: int = Field(8, env="HTTP_PER_HOST_CONCURRENCY")
+
+    # collector fan-out
+    collector_deadline_seconds: float = Field(6.0, env="COLLECTOR_DEADLINE_SECONDS")
+    collector_max_items: int = Field(8, env="COLLECTOR_MAX_ITEMS")
+    collector_rss_enabled: bool = Field(True, env="COLLECTOR_RSS_ENABLED")
+
+    # Gemini call scheduler
+    llm_max_concurrency: int = Field(4, env="LLM_MAX_CONCURRENCY")
+    llm_timeout_seconds: float = Field(25.0, env="LLM_TIMEOUT_SECONDS")
+    # one request overall: slot wait, every attempt and the backoff between them
+    llm_request_deadline_seconds: float = Field(60.0, env="LLM_REQUEST_DEADLINE_SECONDS")
+    llm_max_retries: int = Field(2, env="LLM_MAX_RETRIES")
+    llm_backoff_base_seconds: float = Field(0.5, env="LLM_BACKOFF_BASE_SECONDS")
+    llm_backoff_max_seconds: float = Field(8.0, env="LLM_BACKOFF_MAX_SECONDS")
+    llm_hedge_enabled: bool = Field(False, env="LLM_HEDGE_ENABLED")
+    llm_breaker_failure_threshold: int = Field(5, env="LLM_BREAKER_FAILURE_THRESHOLD")
+    llm_breaker_reset_seconds: float = Field(30.0, env="LLM_BREAKER_RESET_SECONDS")
+
+    # admission control in front of /analyze (per worker process): concurrency
+    # limit adapted to the latency of these stages vs their recent low (p10),
+    # bounded priority queue with a deadline, 503 + Retry-After beyond that
+    admission_enabled: bool = Field(True, env="ADMISSION_ENABLED")
+    admission_initial_limit: int = Field(32, env="ADMISSION_INITIAL_LIMIT")
+    admission_min_limit: int = Field(4, env="ADMISSION_MIN_LIMIT")
+    admission_max_limit: int = Field(512, env="ADMISSION_MAX_LIMIT")
+    admission_max_queue: int = Field(128, env="ADMISSION_MAX_QUEUE")
+    admission_queue_timeout_seconds: float = Field(10.0, env="ADMISSION_QUEUE_TIMEOUT_SECONDS")
+    admission_latency_stages: str = Field(
+        "collect.total,gemini.call,gemini.stream,gemini.call_batch",
+        env="ADMISSION_LATENCY_STAGES",
+    )
+    # shrink the limit when latency exceeds this multiple of the stage's recent low
+    admission_latency_tolerance: float = Field(2.0, env="ADMISSION_LATENCY_TOLERANCE")
+    admission_backoff: float = Field(0.75, env="ADMISSION_BACKOFF")
+    # /health answers 503 while saturated (load balancers steer traffic away)
+    admission_health_unavailable_when_saturated: bool = Field(
+        True, env="ADMISSION_HEALTH_UNAVAILABLE_WHEN_SATURATED"
+    )
+
+    # prompt compaction
+    prompt_token_budget: int = Field(1200, env="PROMPT_TOKEN_BUDGET")
+    prompt_max_snippet_chars: int = Field(320, env="PROMPT_MAX_SNIPPET_CHARS")
+    prompt_dedupe_threshold: float = Field(0.6, env="PROMPT_DEDUPE_THRESHOLD")
+    prompt_min_item_words: int = Field(4, env="PROMPT_MIN_ITEM_WORDS")
+
+    # batch analysis
+    batch_max_sectors: int = Field(50, env="BATCH_MAX_SECTORS")
+    batch_concurrency: int = Field(8, env="BATCH_CONCURRENCY")
+    batch_pack_size: int = Field(5, env="BATCH_PACK_SIZE")
+    # Gemini calls per RATE_LIMIT_WINDOW_SECONDS that a user's batches may
+    # make, from a bucket separate from RATE_LIMIT_REQUESTS
+    batch_rate_limit_calls: int = Field(50, env="BATCH_RATE_LIMIT_CALLS")
+
+    # incremental re-analysis: share of collected items that are new since the
+    # last stored analysis (by URL + snippet fingerprint) up to which that
+    # analysis is reused as is / updated with a delta prompt; above: full prompt
+    incremental_enabled: bool = Field(True, env="INCREMENTAL_ENABLED")
+    incremental_reuse_threshold: float = Field(0.15, env="INCREMENTAL_REUSE_THRESHOLD")
+    incremental_delta_threshold: float = Field(0.5, env="INCREMENTAL_DELTA_THRESHOLD")
+    # delta / reused analyses chain off a full one at most this old
+    incremental_max_age_seconds: int = Field(6 * 3600, env="INCREMENTAL_MAX_AGE_SECONDS")
+
+    # sector canonicalisation (alias table + hashed n-gram vectors)
+    sector_semantic_enabled: bool = Field(True, env="SECTOR_SEMANTIC_ENABLED")
+    sector_aliases_file: Optional[str] = Field(None, env="SECTOR_ALIASES_FILE")
+    sector_index_dir: Optional[str] = Field(None, env="SECTOR_INDEX_DIR")  # default: SHARED_STATE_DIR
+    sector_match_threshold: float = Field(0.8, env="SECTOR_MATCH_THRESHOLD")
+    sector_vector_dims: int = Field(512, env="SECTOR_VECTOR_DIMS")
+
+    # multi-worker mode (`python -m app.serve`): worker count (default: one
+    # per CPU) and where the shared-memory tables live (default: <tmp>/trade-opportunities-api)
+    server_workers: Optional[int] = Field(None, env="SERVER_WORKERS")
+    shared_state_dir: Optional[str] = Field(None, env="SHARED_STATE_DIR")
 
     class Config:
         env_file = ".env"
         env_file_encoding = "utf-8"
 
 
-settings = Settings()
+@lru_cache(maxsize=1)
+def get_settings() -> Settings:
+    """
+    The process-wide Settings, built (env + .env parsed) on first call.
+    Tests can `get_settings.cache_clear()` after changing the environment.
+    """
+    return Settings()
+
+
+class _LazySettings:
+    """
+    Stand-in for `settings`: every attribute read or write goes to
+    `get_settings()`, so `get_settings.cache_clear()` applies to `settings`
+    users too, and importing this module alone needs no GEMINI_API_KEY /
+    JWT_SECRET. Modules that build singletons from settings at import
+    (report_cache, gemini_scheduler, admission, report_store, the rate-limit,
+    session and job backends, and so `app.main`) still need them.
+    """
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(get_settings(), name)
+
+    def __setattr__(self, name: str, value: Any) -> None:
+        setattr(get_settings(), name, value)
+
+
+# `from app.config import settings` keeps working for existing modules
+settings = cast(Settings, _LazySettings())
+
+
+def shared_state_dir() -> str:
+    """Directory for files shared by the worker processes on a host."""
+    return get_settings().shared_state_dir or os.path.join(
+        tempfile.gettempdir(), "trade-opportunities-api"
+    )
@@ -0,0 +1,269 @@
+import asyncio
+import heapq
+import itertools
+import math
+import statistics
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Deque, Dict, List, Optional, Sequence, Tuple
+
+from fastapi import HTTPException, status
+
+from app.config import settings
+from app.core.metrics import ADMISSION_REJECTED, ADMISSION_WAIT_SECONDS, observe_stages
+
+# queue order; lower is served first
+PRIORITIES = {"high": 0, "normal": 1, "low": 2}
+
+
+class AdmissionController:
+    """
+    Global gate in front of the analysis endpoints (one per worker process):
+    - at most `limit` admitted requests run at once; the others wait in a
+      bounded queue, by priority class then arrival, for at most
+      `queue_timeout_seconds`
+    - `limit` adapts to downstream latency (Vegas-style signal, AIMD
+      control): every `window` stage samples, the median ratio of a stage's
+      latency to its baseline (the `baseline_percentile` of its last
+      `baseline_samples`, so a few freak-fast samples don't drag it down) is
+      compared with `latency_tolerance`; within it the limit grows by one
+      (only while the limit is actually in use), beyond it (requests queueing
+      for Gemini or the search sources, a slow upstream) it is cut by `backoff`
+    - requests that can't be served in time get 503 + Retry-After as soon as
+      that is known: when their expected queue wait (from the average time a
+      slot is held) exceeds what is left of the deadline, when the queue is
+      full (a higher-priority arrival takes the place of the newest
+      lowest-priority waiter instead), or when the deadline passes
+    """
+
+    def __init__(
+        self,
+        enabled: bool,
+        initial_limit: int,
+        min_limit: int,
+        max_limit: int,
+        max_queue: int,
+        queue_timeout_seconds: float,
+        latency_tolerance: float,
+        backoff: float,
+        window: int = 10,
+        baseline_samples: int = 500,
+        baseline_percentile: float = 10.0,
+    ):
+        self.enabled = enabled
+        self.min_limit = max(1, min_limit)
+        self.max_limit = max(self.min_limit, max_limit)
+        self.limit = min(self.max_limit, max(self.min_limit, initial_limit))
+        self.max_queue = max_queue
+        self.queue_timeout_seconds = queue_timeout_seconds
+        self.latency_tolerance = latency_tolerance
+        self.backoff = backoff
+        self.window = window
+        self.baseline_samples = baseline_samples
+        self.baseline_percentile = baseline_percentile
+
+        self.in_flight = 0
+        # (priority rank, arrival, deadline, future resolved when a slot is handed over)
+        self._queue: List[Tuple[int, int, float, asyncio.Future]] = []
+        self._arrivals = itertools.count()
+        self._baselines: Dict[str, Deque[float]] = {}
+        self._window: List[Tuple[str, float]] = []
+        self._last_ratio: Optional[float] = None
+        self._hold_seconds: Optional[float] = None  # EWMA of time a slot is held
+        self._last_rejection = 0.0
+
+        self.admitted = 0
+        self.queued_total = 0
+        self.rejected: Dict[str, int] = {"overloaded": 0, "queue_full": 0, "evicted": 0, "timeout": 0}
+        self.limit_increases = 0
+        self.limit_decreases = 0
+
+    # -- adaptive limit ----------------------------------------------------
+
+    def _baseline(self, stage: str) -> float:
+        ordered = sorted(self._baselines[stage])
+        return ordered[int((len(ordered) - 1) * self.baseline_percentile / 100)]
+
+    def observe(self, stage: str, seconds: float) -> None:
+        """A latency sample from a downstream stage (see `metrics.observe_stages`)."""
+        history = self._baselines.get(stage)
+        if history is None:
+            history = self._baselines[stage] = deque(maxlen=self.baseline_samples)
+        history.append(seconds)
+        self._window.append((stage, seconds))
+        if len(self._window) < self.window:
+            return
+
+        baselines = {stage: self._baseline(stage) for stage, _ in self._window}
+        ratio = statistics.median(
+            seconds / baselines[stage] if baselines[stage] > 0 else 1.0
+            for stage, seconds in self._window
+        )
+        self._window.clear()
+        self._last_ratio = ratio
+        if ratio > self.latency_tolerance:
+            limit = max(self.min_limit, int(self.limit * self.backoff))
+            if limit < self.limit:
+                self.limit = limit
+                self.limit_decreases += 1
+        elif self.in_flight * 2 >= self.limit and self.limit < self.max_limit:
+            # an unused limit says nothing about capacity: grow only under load
+            self.limit += 1
+            self.limit_increases += 1
+            self._dispatch()
+
+    # -- queue -------------------------------------------------------------
+
+    def _expected_wait(self, position: int) -> float:
+        if self._hold_seconds is None:
+            return 0.0
+        return position * self._hold_seconds / self.limit
+
+    def _rejection(self, reason: str) -> HTTPException:
+        self.rejected[reason] += 1
+        self._last_rejection = time.monotonic()
+        ADMISSION_REJECTED.inc(reason)
+        retry_after = self._expected_wait(len(self._queue) + 1) or self.queue_timeout_seconds
+        return HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Server is at capacity. Please try again later.",
+            headers={"Retry-After": str(min(60, max(1, math.ceil(retry_after))))},
+        )
+
+    def _dispatch(self) -> None:
+        """Hand free slots to the best waiters."""
+        while self._queue and self.in_flight < self.limit:
+            future = heapq.heappop(self._queue)[-1]
+            if not future.done():
+                self.in_flight += 1
+                future.set_result(None)
+
+    def _shed_hopeless(self) -> None:
+        """503 now for waiters that, at the current pace, won't get a slot by their deadline."""
+        now = time.monotonic()
+        kept: List[Tuple[int, int, float, asyncio.Future]] = []
+        for entry in sorted(self._queue):
+            if now + self._expected_wait(len(kept) + 1) <= entry[2]:
+                kept.append(entry)
+            elif not entry[-1].done():
+                entry[-1].set_exception(self._rejection("overloaded"))
+        if len(kept) < len(self._queue):
+            self._queue = kept  # a sorted list is a valid heap
+
+    def _remove(self, entry: Tuple[int, int, float, asyncio.Future]) -> None:
+        try:
+            self._queue.remove(entry)
+        except ValueError:
+            return
+        heapq.heapify(self._queue)
+
+    async def _acquire(self, priority: str) -> None:
+        if self.in_flight < self.limit and not self._queue:
+            self.in_flight += 1
+            return
+
+        rank = PRIORITIES[priority]
+        ahead = sum(1 for entry in self._queue if entry[0] <= rank)
+        if self._expected_wait(ahead + 1) > self.queue_timeout_seconds:
+            raise self._rejection("overloaded")
+        if len(self._queue) >= self.max_queue:
+            worst = max(self._queue, default=None)  # lowest class, newest arrival
+            if worst is None or worst[0] <= rank:
+                raise self._rejection("queue_full")
+            self._remove(worst)
+            worst[-1].set_exception(self._rejection("evicted"))
+
+        future = asyncio.get_running_loop().create_future()
+        deadline = time.monotonic() + self.queue_timeout_seconds
+        entry = (rank, next(self._arrivals), deadline, future)
+        heapq.heappush(self._queue, entry)
+        self.queued_total += 1
+        try:
+            await asyncio.wait_for(future, self.queue_timeout_seconds)
+        except asyncio.TimeoutError:
+            self._remove(entry)
+            raise self._rejection("timeout") from None
+        except asyncio.CancelledError:
+            # client went away; give back a slot that was already handed over
+            if future.done() and not future.cancelled() and future.exception() is None:
+                self._release()
+            else:
+                self._remove(entry)
+            raise
+
+    def _release(self) -> None:
+        self.in_flight -= 1
+        self._dispatch()
+
+    @asynccontextmanager
+    async def slot(self, priority: str = "normal") -> AsyncIterator[None]:
+        """Hold an admission slot for the block, or raise 503."""
+        if not self.enabled:
+            yield
+            return
+        arrived = time.monotonic()
+        await self._acquire(priority)
+        start = time.monotonic()
+        self.admitted += 1
+        ADMISSION_WAIT_SECONDS.observe(start - arrived)
+        try:
+            yield
+        finally:
+            held = time.monotonic() - start
+            self._hold_seconds = (
+                held if self._hold_seconds is None else 0.9 * self._hold_seconds + 0.1 * held
+            )
+            self._release()
+            self._shed_hopeless()
+
+    # -- reporting ---------------------------------------------------------
+
+    @property
+    def saturated(self) -> bool:
+        """Every slot taken and requests waiting or shed within the last second."""
+        return self.in_flight >= self.limit and (
+            bool(self._queue) or time.monotonic() - self._last_rejection < 1.0
+        )
+
+    def health(self) -> Dict[str, Any]:
+        return {
+            "saturated": self.saturated,
+            "in_flight": self.in_flight,
+            "limit": self.limit,
+            "queued": len(self._queue),
+            "max_queue": self.max_queue,
+        }
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            **self.health(),
+            "enabled": self.enabled,
+            "min_limit": self.min_limit,
+            "max_limit": self.max_limit,
+            "admitted": self.admitted,
+            "queued_total": self.queued_total,
+            "rejected": dict(self.rejected),
+            "limit_increases": self.limit_increases,
+            "limit_decreases": self.limit_decreases,
+            "latency_ratio": self._last_ratio,
+            "hold_seconds": self._hold_seconds,
+        }
+
+
+def _latency_stages() -> Sequence[str]:
+    return [stage.strip() for stage in settings.admission_latency_stages.split(",") if stage.strip()]
+
+
+admission = AdmissionController(
+    enabled=settings.admission_enabled,
+    initial_limit=settings.admission_initial_limit,
+    min_limit=settings.admission_min_limit,
+    max_limit=settings.admission_max_limit,
+    max_queue=settings.admission_max_queue,
+    queue_timeout_seconds=settings.admission_queue_timeout_seconds,
+    latency_tolerance=settings.admission_latency_tolerance,
+    backoff=settings.admission_backoff,
+)
+if admission.enabled:
+    observe_stages(_latency_stages(), admission.observe)
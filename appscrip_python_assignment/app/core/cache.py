@@ -0,0 +1,250 @@
+import asyncio
+import time
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+
+from cachetools import LRUCache
+
+from app.config import settings
+from app.core.report_store import StoredReport
+from app.schemas.analyze import AIAnalysis, CollectedData
+
+# loader: runs the full pipeline for one sector and returns its results
+Loader = Callable[[], Awaitable[Tuple[CollectedData, AIAnalysis]]]
+
+
+@dataclass
+class CacheEntry:
+    collected: CollectedData
+    analysis: AIAnalysis
+    created_at: float  # unix timestamp
+    size: int  # approximate bytes
+    # set by publish_report: the rendered, stored report for this entry
+    report: Optional[StoredReport] = None
+
+    def age(self) -> float:
+        return time.time() - self.created_at
+
+    @property
+    def degraded(self) -> bool:
+        return self.analysis.degraded
+
+
+def _estimate_size(collected: CollectedData, analysis: AIAnalysis) -> int:
+    # serialized JSON length is a cheap, stable proxy for memory footprint
+    return len(collected.model_dump_json()) + len(analysis.model_dump_json())
+
+
+def _new_entry(collected: CollectedData, analysis: AIAnalysis) -> CacheEntry:
+    return CacheEntry(
+        collected=collected,
+        analysis=analysis,
+        created_at=time.time(),
+        size=_estimate_size(collected, analysis),
+    )
+
+
+class _BoundedLRU(LRUCache):
+    """
+    LRU cache bounded by total bytes (via getsizeof) and by entry count.
+    """
+
+    def __init__(self, max_entries: int, max_bytes: int):
+        super().__init__(maxsize=max_bytes, getsizeof=lambda entry: entry.size)
+        self.max_entries = max_entries
+        self.evictions = 0
+
+    def __setitem__(self, key, value):
+        while key not in self and len(self) >= self.max_entries:
+            self.popitem()
+        super().__setitem__(key, value)
+
+    def popitem(self):
+        item = super().popitem()
+        self.evictions += 1
+        return item
+
+
+class ReportCache:
+    """
+    In-memory cache of pipeline results keyed by (sector, country).
+
+    - entries younger than `ttl_seconds` are served as-is
+    - entries within the following `stale_seconds` are served stale while a
+      background refresh runs
+    - concurrent misses for the same key share one in-flight pipeline run
+    - degraded (collector-only) results live for `degraded_ttl_seconds` and
+      never replace the last good analysis
+    """
+
+    def __init__(
+        self,
+        ttl_seconds: int,
+        stale_seconds: int,
+        max_entries: int,
+        max_bytes: int,
+        degraded_ttl_seconds: int = 60,
+    ):
+        self.ttl_seconds = ttl_seconds
+        self.stale_seconds = stale_seconds
+        self.degraded_ttl_seconds = degraded_ttl_seconds
+        self._entries = _BoundedLRU(max_entries=max_entries, max_bytes=max_bytes)
+        self._inflight: Dict[str, asyncio.Task] = {}
+
+        self.hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.refresh_errors = 0
+
+    @staticmethod
+    def make_key(sector: str, country: str) -> str:
+        return f"{sector.strip().lower()}|{country.strip().lower()}"
+
+    async def get_or_load(
+        self, sector: str, country: str, loader: Loader
+    ) -> CacheEntry:
+        """
+        Return the cached entry for (sector, country), running `loader` on a miss.
+        """
+        key = self.make_key(sector, country)
+
+        entry = self._entries.get(key)
+        if entry is not None:
+            age = entry.age()
+            ttl = self._ttl_for(entry)
+            if age < ttl:
+                self.hits += 1
+                return entry
+            if age < ttl + self.stale_seconds:
+                self.stale_hits += 1
+                if key not in self._inflight:
+                    self._start_load(key, loader).add_done_callback(
+                        self._on_refresh_done
+                    )
+                return entry
+            # too old to serve as stale; kept only as a last-good fallback
+
+        task = self._inflight.get(key)
+        if task is not None:
+            self.coalesced += 1
+        else:
+            self.misses += 1
+            task = self._start_load(key, loader)
+
+        # shield: a cancelled caller must not cancel the run other callers share
+        return await asyncio.shield(task)
+
+    def _ttl_for(self, entry: CacheEntry) -> float:
+        return self.degraded_ttl_seconds if entry.degraded else self.ttl_seconds
+
+    def peek(self, sector: str, country: str) -> Optional[CacheEntry]:
+        """Return a fresh entry without loading or touching the counters."""
+        entry = self._entries.get(self.make_key(sector, country))
+        if entry is not None and entry.age() < self._ttl_for(entry):
+            return entry
+        return None
+
+    def expires_in(self, sector: str, country: str) -> Optional[float]:
+        """
+        Seconds until the entry stops being fresh (negative once stale),
+        or None if nothing is cached.
+        """
+        entry = self._entries.get(self.make_key(sector, country))
+        if entry is None:
+            return None
+        return self._ttl_for(entry) - entry.age()
+
+    def refresh(self, sector: str, country: str, loader: Loader) -> asyncio.Task:
+        """
+        Reload (sector, country) in the background, joining a load already in
+        flight. Callers keep being served the current entry meanwhile.
+        """
+        key = self.make_key(sector, country)
+        task = self._inflight.get(key)
+        if task is None:
+            task = self._start_load(key, loader)
+            task.add_done_callback(self._on_refresh_done)
+        return task
+
+    def join(self, sector: str, country: str) -> Optional[asyncio.Task]:
+        """The load of (sector, country) in flight, if any, to await (shielded)."""
+        task = self._inflight.get(self.make_key(sector, country))
+        if task is not None:
+            self.coalesced += 1
+        return task
+
+    def start(self, sector: str, country: str, loader: Loader) -> asyncio.Task:
+        """
+        Run `loader` as the in-flight load of (sector, country), whatever is
+        cached; `get_or_load` misses and `join` share it. Call only when
+        `join` found nothing.
+        """
+        self.misses += 1
+        return self._start_load(self.make_key(sector, country), loader)
+
+    def put(
+        self, sector: str, country: str, collected: CollectedData, analysis: AIAnalysis
+    ) -> CacheEntry:
+        """Store results computed outside `get_or_load` (e.g. batched calls)."""
+        return self._keep(self.make_key(sector, country), _new_entry(collected, analysis))
+
+    def _start_load(self, key: str, loader: Loader) -> asyncio.Task:
+        task = asyncio.ensure_future(self._load(key, loader))
+        self._inflight[key] = task
+
+        def _clear(done: asyncio.Task) -> None:
+            if self._inflight.get(key) is done:
+                del self._inflight[key]
+
+        task.add_done_callback(_clear)
+        return task
+
+    async def _load(self, key: str, loader: Loader) -> CacheEntry:
+        collected, analysis = await loader()
+        return self._keep(key, _new_entry(collected, analysis))
+
+    def _keep(self, key: str, entry: CacheEntry) -> CacheEntry:
+        """Store a new result and return the entry callers should serve."""
+        if entry.degraded:
+            previous = self._entries.get(key)
+            if previous is not None and not previous.degraded:
+                # an old real analysis beats a collector-only one
+                return previous
+        self._store(key, entry)
+        return entry
+
+    def _store(self, key: str, entry: CacheEntry) -> None:
+        if entry.size > self._entries.maxsize:
+            # larger than the whole cache; serve it but don't keep it
+            return
+        self._entries[key] = entry
+
+    def _on_refresh_done(self, task: asyncio.Task) -> None:
+        # background refresh failures keep the stale entry; just count them
+        if not task.cancelled() and task.exception() is not None:
+            self.refresh_errors += 1
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "hits": self.hits,
+            "stale_hits": self.stale_hits,
+            "misses": self.misses,
+            "coalesced": self.coalesced,
+            "refresh_errors": self.refresh_errors,
+            "evictions": self._entries.evictions,
+            "entries": len(self._entries),
+            "bytes": self._entries.currsize,
+            "max_entries": self._entries.max_entries,
+            "max_bytes": self._entries.maxsize,
+            "inflight": len(self._inflight),
+        }
+
+
+report_cache = ReportCache(
+    ttl_seconds=settings.report_cache_ttl_seconds,
+    stale_seconds=settings.report_cache_stale_seconds,
+    max_entries=settings.report_cache_max_entries,
+    max_bytes=settings.report_cache_max_bytes,
+    degraded_ttl_seconds=settings.report_cache_degraded_ttl_seconds,
+)
@@ -0,0 +1,301 @@
+import asyncio
+import logging
+import os
+import sys
+import threading
+import time
+import traceback
+import uuid
+from collections import Counter, OrderedDict, deque
+from typing import Any, Callable, Dict, List, Optional
+
+from app.config import settings
+from app.core.metrics import Histogram
+
+logger = logging.getLogger(__name__)
+
+LOOP_LAG_SECONDS = Histogram(
+    "trade_api_event_loop_lag_seconds",
+    "How late the diagnostics heartbeat woke up (only with DIAGNOSTICS_ENABLED).",
+    buckets=(0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5),
+)
+
+# leaf frames of threads that are parked, not working (excluded from profiles)
+_IDLE_LEAVES = ("wait (threading.py", "select (selectors.py", "_worker (thread.py")
+
+
+def _frame_label(frame) -> str:
+    code = frame.f_code
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+
+def _collapse(frame, root: str) -> str:
+    """Stack as one `root;outer;...;leaf` line (flamegraph.pl / speedscope format)."""
+    labels = []
+    while frame is not None:
+        labels.append(_frame_label(frame))
+        frame = frame.f_back
+    labels.append(root)
+    return ";".join(reversed(labels))
+
+
+def format_collapsed(counts: Counter) -> str:
+    return "".join(f"{stack} {n}\n" for stack, n in counts.most_common())
+
+
+class SamplingProfiler:
+    """
+    Samples the stacks of all threads every `interval_seconds` from a
+    background thread, while at least one subscriber is attached. Each
+    subscriber gets its own Counter of collapsed stacks.
+
+    Samples are process-wide: a per-request profile also contains whatever
+    else the event loop and thread pools did during that request.
+    """
+
+    def __init__(self, interval_seconds: float):
+        self.interval_seconds = interval_seconds
+        self._lock = threading.Lock()
+        self._subscribers: List[Counter] = []
+        self._thread: Optional[threading.Thread] = None
+        self.samples = 0
+
+    def subscribe(self) -> Counter:
+        counts: Counter = Counter()
+        with self._lock:
+            self._subscribers.append(counts)
+            if self._thread is None:
+                self._thread = threading.Thread(
+                    target=self._run, name="diagnostics-profiler", daemon=True
+                )
+                self._thread.start()
+        return counts
+
+    def unsubscribe(self, counts: Counter) -> Counter:
+        """Detach `counts`; once this returns the sampler no longer writes to it."""
+        with self._lock:
+            self._subscribers = [c for c in self._subscribers if c is not counts]
+        return counts
+
+    def _run(self) -> None:
+        own = threading.get_ident()
+        while True:
+            with self._lock:
+                if not self._subscribers:
+                    self._thread = None
+                    return
+            names = {t.ident: t.name for t in threading.enumerate()}
+            stacks = []
+            for ident, frame in sys._current_frames().items():
+                if ident == own or _frame_label(frame).startswith(_IDLE_LEAVES):
+                    continue
+                stacks.append(_collapse(frame, names.get(ident, f"thread-{ident}")))
+            with self._lock:
+                # under the lock: an unsubscribed Counter is read while we sample
+                self.samples += 1
+                for counts in self._subscribers:
+                    counts.update(stacks)
+            time.sleep(self.interval_seconds)
+
+
+class LoopMonitor:
+    """
+    Measures event-loop lag and catches blocking callbacks.
+
+    - a heartbeat task sleeps `interval_seconds` in the loop; how late it
+      wakes up is the lag (recorded in LOOP_LAG_SECONDS)
+    - a watchdog thread notices when the heartbeat is overdue by more than
+      `slow_callback_seconds` and grabs the loop thread's stack while the
+      offending callback is still running, then logs it
+    """
+
+    def __init__(self, interval_seconds: float, slow_callback_seconds: float, max_stalls: int = 50):
+        self.interval_seconds = interval_seconds
+        self.slow_callback_seconds = slow_callback_seconds
+        self.stalls: deque = deque(maxlen=max_stalls)
+        self._task: Optional[asyncio.Task] = None
+        self._stop = threading.Event()
+        self._loop_thread: Optional[int] = None
+        self._last_beat = time.perf_counter()
+        self._beats = 0
+        self._reported_beat = -1
+        self.max_lag = 0.0
+
+    async def _heartbeat(self) -> None:
+        while True:
+            start = time.perf_counter()
+            await asyncio.sleep(self.interval_seconds)
+            now = time.perf_counter()
+            lag = max(0.0, now - start - self.interval_seconds)
+            self._last_beat = now
+            self._beats += 1
+            self.max_lag = max(self.max_lag, lag)
+            LOOP_LAG_SECONDS.observe(lag)
+            if self.stalls and self._reported_beat == self._beats - 1:
+                # the stall the watchdog reported just ended: record its full length
+                self.stalls[-1]["blocked_ms"] = round(lag * 1000, 1)
+
+    def _watch(self) -> None:
+        check_every = min(self.interval_seconds, self.slow_callback_seconds / 2)
+        while not self._stop.wait(check_every):
+            overdue = time.perf_counter() - self._last_beat - self.interval_seconds
+            beat = self._beats
+            if overdue < self.slow_callback_seconds or beat == self._reported_beat:
+                continue
+            frame = sys._current_frames().get(self._loop_thread)
+            stack = traceback.format_stack(frame) if frame is not None else []
+            self.stalls.append(
+                {
+                    "at": time.time(),
+                    "blocked_ms": round(overdue * 1000, 1),
+                    "stack": [line.rstrip() for line in stack],
+                }
+            )
+            self._reported_beat = beat
+            logger.warning(
+                "event loop blocked for at least %.0fms; loop thread is at:\n%s",
+                overdue * 1000,
+                "".join(stack),
+            )
+
+    def start(self) -> None:
+        if self._task is not None:
+            return
+        self._loop_thread = threading.get_ident()
+        self._last_beat = time.perf_counter()
+        self._stop.clear()
+        self._task = asyncio.ensure_future(self._heartbeat())
+        threading.Thread(target=self._watch, name="diagnostics-watchdog", daemon=True).start()
+
+    async def stop(self) -> None:
+        self._stop.set()
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "running": self._task is not None,
+            "interval_ms": self.interval_seconds * 1000,
+            "slow_callback_ms": self.slow_callback_seconds * 1000,
+            "max_lag_ms": round(self.max_lag * 1000, 1),
+            "stalls": list(self.stalls),
+        }
+
+
+class ProfileStore:
+    """Last `max_profiles` per-request profiles, by id."""
+
+    def __init__(self, max_profiles: int):
+        self.max_profiles = max_profiles
+        self._profiles: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+
+    def add(self, path: str, duration: float, ticks: int, counts: Counter) -> str:
+        profile_id = uuid.uuid4().hex[:16]
+        self._profiles[profile_id] = {
+            "path": path,
+            "duration_ms": round(duration * 1000, 1),
+            # sampling rounds; idle threads aren't counted, so stacks can sum to less
+            "samples": ticks,
+            "stacks": len(counts),
+            "collapsed": format_collapsed(counts),
+        }
+        while len(self._profiles) > self.max_profiles:
+            self._profiles.popitem(last=False)
+        return profile_id
+
+    def get(self, profile_id: str) -> Optional[Dict[str, Any]]:
+        return self._profiles.get(profile_id)
+
+    def list(self) -> List[Dict[str, Any]]:
+        return [
+            {"id": pid, **{k: v for k, v in p.items() if k != "collapsed"}}
+            for pid, p in reversed(self._profiles.items())
+        ]
+
+
+class ProfilingMiddleware:
+    """
+    ASGI middleware: requests carrying `header` (any value but "0") are
+    sampled until the response starts, if `authorize` accepts their
+    `Authorization` header value; the response gets `X-Profile-Id`, and the
+    collapsed stacks are served at /debug/profiles/{id}. Other requests
+    pass through untouched, header or not.
+    """
+
+    def __init__(
+        self,
+        app,
+        profiler: SamplingProfiler,
+        store: ProfileStore,
+        header: str,
+        authorize: Callable[[Optional[str]], bool],
+    ):
+        self.app = app
+        self.profiler = profiler
+        self.store = store
+        self.header = header.lower().encode("latin-1")
+        self.authorize = authorize
+
+    def _wants_profile(self, scope) -> bool:
+        if scope["type"] != "http":
+            return False
+        headers = dict(scope.get("headers", ()))
+        if headers.get(self.header, b"") in (b"", b"0"):
+            return False
+        authorization = headers.get(b"authorization")
+        return self.authorize(authorization.decode("latin-1") if authorization else None)
+
+    async def __call__(self, scope, receive, send):
+        if not self._wants_profile(scope):
+            await self.app(scope, receive, send)
+            return
+
+        start = time.perf_counter()
+        first_tick = self.profiler.samples
+        counts = self.profiler.subscribe()
+        stopped = False
+
+        async def _send(message):
+            nonlocal stopped
+            if message["type"] == "http.response.start" and not stopped:
+                stopped = True
+                self.profiler.unsubscribe(counts)
+                profile_id = self.store.add(
+                    scope["path"],
+                    time.perf_counter() - start,
+                    self.profiler.samples - first_tick,
+                    counts,
+                )
+                message = {
+                    **message,
+                    "headers": [*message.get("headers", []), (b"x-profile-id", profile_id.encode())],
+                }
+            await send(message)
+
+        try:
+            await self.app(scope, receive, _send)
+        finally:
+            if not stopped:
+                self.profiler.unsubscribe(counts)
+
+
+async def profile_for(seconds: float) -> Counter:
+    """Sample the whole process for `seconds` (admin-triggered profile)."""
+    counts = profiler.subscribe()
+    try:
+        await asyncio.sleep(seconds)
+    finally:
+        profiler.unsubscribe(counts)
+    return counts
+
+
+# Only started / mounted when DIAGNOSTICS_ENABLED=true (see app.main); otherwise
+# nothing here runs: no heartbeat, no threads, no middleware.
+loop_monitor = LoopMonitor(
+    interval_seconds=settings.diagnostics_lag_interval_seconds,
+    slow_callback_seconds=settings.diagnostics_slow_callback_ms / 1000,
+)
+profiler = SamplingProfiler(interval_seconds=settings.diagnostics_profile_interval_ms / 1000)
+profile_store = ProfileStore(max_profiles=settings.diagnostics_max_profiles)
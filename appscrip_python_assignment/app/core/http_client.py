@@ -0,0 +1,72 @@
+import asyncio
+import urllib.parse
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Dict, Optional
+
+import httpx
+
+from app.config import settings
+
+# Application-scoped client; created/closed by the FastAPI lifespan in app.main
+_client: Optional[httpx.AsyncClient] = None
+
+# key: host, value: semaphore capping concurrent requests to that host
+_host_semaphores: Dict[str, asyncio.Semaphore] = {}
+
+
+def _build_client() -> httpx.AsyncClient:
+    limits = httpx.Limits(
+        max_connections=settings.http_max_connections,
+        max_keepalive_connections=settings.http_max_keepalive_connections,
+        keepalive_expiry=settings.http_keepalive_expiry_seconds,
+    )
+    timeout = httpx.Timeout(
+        settings.http_read_timeout_seconds,
+        connect=settings.http_connect_timeout_seconds,
+    )
+    # http2=True requires the optional `h2` package (pip install httpx[http2])
+    return httpx.AsyncClient(
+        http2=settings.http_http2,
+        limits=limits,
+        timeout=timeout,
+        follow_redirects=True,
+    )
+
+
+async def start_http_client() -> httpx.AsyncClient:
+    global _client
+    if _client is None or _client.is_closed:
+        _client = _build_client()
+    return _client
+
+
+async def close_http_client() -> None:
+    global _client
+    if _client is not None:
+        await _client.aclose()
+        _client = None
+    _host_semaphores.clear()
+
+
+def get_http_client() -> httpx.AsyncClient:
+    """
+    Return the shared client.
+    Falls back to creating it lazily when used outside the app lifespan
+    (scripts, benchmarks).
+    """
+    global _client
+    if _client is None or _client.is_closed:
+        _client = _build_client()
+    return _client
+
+
+@asynccontextmanager
+async def host_slot(url: str) -> AsyncIterator[None]:
+    """Limit concurrent in-flight requests per upstream host."""
+    host = urllib.parse.urlsplit(url).netloc
+    sem = _host_semaphores.get(host)
+    if sem is None:
+        sem = asyncio.Semaphore(settings.http_per_host_concurrency)
+        _host_semaphores[host] = sem
+    async with sem:
+        yield
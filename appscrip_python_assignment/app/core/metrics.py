@@ -0,0 +1,281 @@
+import bisect
+import time
+from contextvars import ContextVar
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from app.config import settings
+
+# Flip off to make every `timed` block and counter a no-op (see benchmarks/metrics_overhead.py)
+enabled: bool = settings.metrics_enabled
+
+DEFAULT_BUCKETS: Tuple[float, ...] = (
+    0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0,
+)
+
+# (stage, seconds) recorded during the current request, for Server-Timing
+_request_timings: ContextVar[Optional[List[Tuple[str, float]]]] = ContextVar(
+    "request_timings", default=None
+)
+
+_REGISTRY: List["_Metric"] = []
+
+# stage -> callbacks given (stage, seconds) after each `timed` block, even
+# with metrics disabled (admission control adapts to these latencies)
+_stage_observers: Dict[str, List[Callable[[str, float], None]]] = {}
+
+
+def observe_stages(stages: Iterable[str], callback: Callable[[str, float], None]) -> None:
+    """
+    Call `callback(stage, seconds)` whenever a block timed as one of `stages`
+    completes; blocks that raised are left out (a failure that returns at
+    once says nothing about the stage's speed).
+    """
+    for stage in stages:
+        _stage_observers.setdefault(stage, []).append(callback)
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    pairs = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if value != int(value) else str(int(value))
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        _REGISTRY.append(self)
+
+    def samples(self) -> List[str]:
+        raise NotImplementedError
+
+    def render(self) -> List[str]:
+        return [
+            f"# HELP {self.name} {self.documentation}",
+            f"# TYPE {self.name} {self.kind}",
+            *self.samples(),
+        ]
+
+
+class Counter(_Metric):
+    """Monotonic counter; label values are passed positionally."""
+
+    kind = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+        if not self.labelnames:
+            self._values[()] = 0.0  # export 0 rather than nothing
+
+    def inc(self, *labelvalues: str, amount: float = 1.0) -> None:
+        if enabled:
+            self._values[labelvalues] = self._values.get(labelvalues, 0.0) + amount
+
+    def value(self, *labelvalues: str) -> float:
+        return self._values.get(labelvalues, 0.0)
+
+    def samples(self) -> List[str]:
+        return [
+            f"{self.name}{_format_labels(self.labelnames, labels)} {_format_value(v)}"
+            for labels, v in sorted(self._values.items())
+        ]
+
+
+class Histogram(_Metric):
+    """
+    Cumulative-bucket histogram. Each label set keeps per-bucket counts
+    (non-cumulative, summed on export) plus sum and count.
+    """
+
+    kind = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS,
+    ):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # labels -> [count per bucket..., +Inf count, sum]
+        self._series: Dict[Tuple[str, ...], List[float]] = {}
+
+    def observe(self, value: float, *labelvalues: str) -> None:
+        if not enabled:
+            return
+        series = self._series.get(labelvalues)
+        if series is None:
+            series = self._series[labelvalues] = [0.0] * (len(self.buckets) + 2)
+        series[bisect.bisect_left(self.buckets, value)] += 1
+        series[-1] += value
+
+    def samples(self) -> List[str]:
+        lines: List[str] = []
+        for labels, series in sorted(self._series.items()):
+            cumulative = 0.0
+            for bound, count in zip((*self.buckets, float("inf")), series):
+                cumulative += count
+                le = _format_labels(
+                    self.labelnames, labels, f'le="{_format_value(bound)}"'
+                )
+                lines.append(f"{self.name}_bucket{le} {_format_value(cumulative)}")
+            plain = _format_labels(self.labelnames, labels)
+            lines.append(f"{self.name}_sum{plain} {series[-1]!r}")
+            lines.append(f"{self.name}_count{plain} {_format_value(cumulative)}")
+        return lines
+
+
+STAGE_SECONDS = Histogram(
+    "trade_api_stage_duration_seconds",
+    "Time spent in each pipeline stage.",
+    ["stage"],
+)
+REQUEST_SECONDS = Histogram(
+    "trade_api_http_request_duration_seconds",
+    "Time from request start to the end of the response.",
+)
+HTTP_RESPONSES = Counter(
+    "trade_api_http_responses_total", "HTTP responses by status code.", ["code"]
+)
+COLLECTOR_FALLBACKS = Counter(
+    "trade_api_collector_fallbacks_total",
+    "Collections that returned the static fallback (no source answered in time).",
+)
+JSON_PARSE_FAILURES = Counter(
+    "trade_api_llm_json_parse_failures_total",
+    "Gemini responses with no usable JSON object.",
+)
+ANALYSIS_REFRESHES = Counter(
+    "trade_api_analysis_refreshes_total",
+    "Pipeline analyses by how they were produced (full, delta, reused).",
+    ["mode"],
+)
+RATE_LIMITED = Counter(
+    "trade_api_rate_limited_total", "Requests rejected by the per-user rate limiter."
+)
+ADMISSION_REJECTED = Counter(
+    "trade_api_admission_rejected_total",
+    "Analysis requests shed with 503 by admission control.",
+    ["reason"],
+)
+ADMISSION_WAIT_SECONDS = Histogram(
+    "trade_api_admission_wait_seconds",
+    "Time admitted analysis requests spent in the admission queue.",
+)
+PROMPT_TOKENS = Histogram(
+    "trade_api_llm_prompt_tokens",
+    "Tokens per Gemini prompt: estimated before sending, actual as reported by the API.",
+    ["kind"],
+    buckets=(250, 500, 1000, 2000, 4000, 8000, 16000, 32000, 64000),
+)
+UPSTREAM_ERRORS = Counter(
+    "trade_api_upstream_errors_total",
+    "Analyses that failed with 502 Bad Gateway.",
+    ["endpoint"],
+)
+
+
+class timed:
+    """
+    `with timed("stage"):` records the block's duration in the stage
+    histogram and in the current request's Server-Timing list.
+    """
+
+    __slots__ = ("stage", "start")
+
+    def __init__(self, stage: str):
+        self.stage = stage
+
+    def __enter__(self) -> "timed":
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        observers = _stage_observers.get(self.stage)
+        if not enabled and not observers:
+            return
+        elapsed = time.perf_counter() - self.start
+        if observers and exc_info[0] is None:
+            for observer in observers:
+                observer(self.stage, elapsed)
+        if not enabled:
+            return
+        STAGE_SECONDS.observe(elapsed, self.stage)
+        timings = _request_timings.get()
+        if timings is not None:
+            timings.append((self.stage, elapsed))
+
+
+def _server_timing(timings: List[Tuple[str, float]]) -> bytes:
+    # stage names become metric names: dots aren't tokens, so use underscores
+    return ", ".join(
+        f"{stage.replace('.', '_')};dur={seconds * 1000:.1f}" for stage, seconds in timings
+    ).encode("latin-1")
+
+
+class MetricsMiddleware:
+    """
+    ASGI middleware: request duration + status-code counter, and (with
+    `server_timing`) a `Server-Timing` header listing the stages timed
+    while handling the request.
+    """
+
+    def __init__(self, app, server_timing: bool = False):
+        self.app = app
+        self.server_timing = server_timing
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not enabled:
+            await self.app(scope, receive, send)
+            return
+
+        start = time.perf_counter()
+        timings: Optional[List[Tuple[str, float]]] = [] if self.server_timing else None
+        token = _request_timings.set(timings)
+        status_code = 500
+
+        async def _send(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                if timings is not None:
+                    timings.append(("total", time.perf_counter() - start))
+                    message = {
+                        **message,
+                        "headers": [
+                            *message.get("headers", []),
+                            (b"server-timing", _server_timing(timings)),
+                        ],
+                    }
+            await send(message)
+
+        try:
+            await self.app(scope, receive, _send)
+        finally:
+            _request_timings.reset(token)
+            REQUEST_SECONDS.observe(time.perf_counter() - start)
+            HTTP_RESPONSES.inc(str(status_code))
+
+
+def render_prometheus() -> str:
+    """All registered metrics in the Prometheus text exposition format (0.0.4)."""
+    lines: List[str] = []
+    for metric in _REGISTRY:
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
@@ -1,48 +1,295 @@
+import math
 import time
-from typing import Dict
+from dataclasses import dataclass
+from typing import Dict, Optional
 
-from fastapi import HTTPException, status, Depends
+from fastapi import HTTPException, Response, status, Depends
 
-from app.config import settings
+from app.config import settings, shared_state_dir
+from app.core.metrics import RATE_LIMITED
 from app.core.security import get_current_user
 from app.schemas.auth import UserInDB
 
-# key: username, value: {tokens, last_refill}
-_buckets: Dict[str, Dict[str, float]] = {}
 
+@dataclass
+class RateLimitResult:
+    allowed: bool
+    remaining: float  # tokens left after this call
+    retry_after: float  # seconds until the requested cost would be available
+
+
+class RateLimiterBackend:
+    """
+    Token-bucket storage. `consume` must refill and take tokens atomically.
+    """
+
+    async def consume(
+        self, key: str, cost: float, capacity: float, refill_per_second: float
+    ) -> RateLimitResult:
+        raise NotImplementedError
+
+
+class InMemoryBackend(RateLimiterBackend):
+    """
+    Process-local buckets. Only correct with a single worker process.
+    Idle buckets are swept periodically so memory tracks active users.
+    """
+
+    def __init__(self, sweep_interval_seconds: float, idle_seconds: float):
+        # key: username, value: {tokens, last_refill}
+        self._buckets: Dict[str, Dict[str, float]] = {}
+        self.sweep_interval_seconds = sweep_interval_seconds
+        self.idle_seconds = idle_seconds
+        self._last_sweep = time.time()
+
+    def _get_bucket_for(
+        self, key: str, capacity: float, refill_per_second: float, now: float
+    ) -> Dict[str, float]:
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            bucket = {"tokens": capacity, "last_refill": now}
+            self._buckets[key] = bucket
+            return bucket
+
+        # refill tokens
+        elapsed = now - bucket["last_refill"]
+        if elapsed > 0:
+            new_tokens = bucket["tokens"] + elapsed * refill_per_second
+            bucket["tokens"] = min(capacity, new_tokens)
+            bucket["last_refill"] = now
 
-def _get_bucket_for(user_id: str) -> Dict[str, float]:
-    now = time.time()
-    bucket = _buckets.get(user_id)
-    if bucket is None:
-        bucket = {"tokens": float(settings.rate_limit_requests), "last_refill": now}
-        _buckets[user_id] = bucket
         return bucket
 
-    # refill tokens
-    elapsed = now - bucket["last_refill"]
-    if elapsed > 0:
-        refill_rate = (
-            settings.rate_limit_requests / settings.rate_limit_window_seconds
-        )  # tokens per second
-        new_tokens = bucket["tokens"] + elapsed * refill_rate
-        bucket["tokens"] = min(float(settings.rate_limit_requests), new_tokens)
-        bucket["last_refill"] = now
+    def evict_idle(self, now: float, capacity: float, refill_per_second: float) -> int:
+        # a bucket idle long enough to be full again is equivalent to no bucket
+        idle = max(self.idle_seconds, capacity / refill_per_second)
+        stale = [k for k, b in self._buckets.items() if now - b["last_refill"] > idle]
+        for key in stale:
+            del self._buckets[key]
+        return len(stale)
+
+    async def consume(
+        self, key: str, cost: float, capacity: float, refill_per_second: float
+    ) -> RateLimitResult:
+        now = time.time()
+        if now - self._last_sweep > self.sweep_interval_seconds:
+            self._last_sweep = now
+            self.evict_idle(now, capacity, refill_per_second)
+
+        bucket = self._get_bucket_for(key, capacity, refill_per_second, now)
+        if bucket["tokens"] < cost:
+            return RateLimitResult(
+                allowed=False,
+                remaining=bucket["tokens"],
+                retry_after=(cost - bucket["tokens"]) / refill_per_second,
+            )
+
+        bucket["tokens"] -= cost
+        return RateLimitResult(allowed=True, remaining=bucket["tokens"], retry_after=0.0)
+
+    def __len__(self) -> int:
+        return len(self._buckets)
+
+
+class SharedMemoryBackend(RateLimiterBackend):
+    """
+    Buckets in a memory-mapped table shared by every worker on the host
+    (`python -m app.serve`); refill + take run under the bucket's stripe
+    lock. Idle buckets read as full; when a stripe fills up, the least
+    recently used bucket is dropped.
+    """
+
+    FIELDS = ("tokens", "last_refill")
+
+    def __init__(self, directory: str, max_buckets: int, idle_seconds: float):
+        from app.core.shared_state import SharedTable, table_path
+
+        self._table = SharedTable(
+            table_path(directory, "ratelimit", self.FIELDS, max_buckets),
+            fields=self.FIELDS,
+            capacity=max_buckets,
+            touched_field="last_refill",
+            idle_seconds=idle_seconds,
+        )
+
+    async def consume(
+        self, key: str, cost: float, capacity: float, refill_per_second: float
+    ) -> RateLimitResult:
+        now = time.time()
+
+        def take(row):
+            if row is None:
+                tokens = capacity
+            else:
+                tokens, last_refill = row
+                tokens = min(capacity, tokens + max(0.0, now - last_refill) * refill_per_second)
+            if tokens < cost:
+                return (tokens, now), RateLimitResult(
+                    allowed=False,
+                    remaining=tokens,
+                    retry_after=(cost - tokens) / refill_per_second,
+                )
+            return (tokens - cost, now), RateLimitResult(
+                allowed=True, remaining=tokens - cost, retry_after=0.0
+            )
+
+        return self._table.update(key, now, take)
+
+
+# Refill + take in one round trip. Uses the Redis server clock so every
+# worker/node sees the same time. Returns {allowed, tokens, retry_after}.
+_TOKEN_BUCKET_LUA = """
+local capacity = tonumber(ARGV[1])
+local rate = tonumber(ARGV[2])
+local cost = tonumber(ARGV[3])
+local ttl = tonumber(ARGV[4])
 
-    return bucket
+local t = redis.call('TIME')
+local now = tonumber(t[1]) + tonumber(t[2]) / 1000000
 
+local state = redis.call('HMGET', KEYS[1], 'tokens', 'ts')
+local tokens = tonumber(state[1])
+local ts = tonumber(state[2])
+if tokens == nil then
+  tokens = capacity
+  ts = now
+end
 
-async def rate_limiter_dependency(current_user: UserInDB = Depends(get_current_user)):
-    user_id = current_user.username
-    bucket = _get_bucket_for(user_id)
+local elapsed = now - ts
+if elapsed > 0 then
+  tokens = math.min(capacity, tokens + elapsed * rate)
+end
 
-    if bucket["tokens"] < 1.0:
+local allowed = 0
+local retry_after = 0
+if tokens >= cost then
+  tokens = tokens - cost
+  allowed = 1
+else
+  retry_after = (cost - tokens) / rate
+end
+
+redis.call('HSET', KEYS[1], 'tokens', tostring(tokens), 'ts', tostring(now))
+redis.call('EXPIRE', KEYS[1], ttl)
+return {allowed, tostring(tokens), tostring(retry_after)}
+"""
+
+
+class RedisBackend(RateLimiterBackend):
+    """
+    Buckets shared by every worker/node through Redis (atomic Lua script).
+    Idle buckets expire via key TTL. Requires the `redis` package.
+    `client`: an existing redis.asyncio client to use instead of `url`.
+    """
+
+    def __init__(
+        self, url: str, idle_seconds: float, key_prefix: str = "ratelimit:", client=None
+    ):
+        if client is None:
+            import redis.asyncio as redis_asyncio  # optional dependency
+
+            client = redis_asyncio.from_url(url)
+        self._client = client
+        self._script = self._client.register_script(_TOKEN_BUCKET_LUA)
+        self.idle_seconds = idle_seconds
+        self.key_prefix = key_prefix
+
+    async def consume(
+        self, key: str, cost: float, capacity: float, refill_per_second: float
+    ) -> RateLimitResult:
+        # keep keys at least as long as it takes an empty bucket to refill
+        ttl = math.ceil(max(self.idle_seconds, capacity / refill_per_second))
+        allowed, tokens, retry_after = await self._script(
+            keys=[self.key_prefix + key],
+            args=[capacity, refill_per_second, cost, ttl],
+        )
+        return RateLimitResult(
+            allowed=bool(int(allowed)),
+            remaining=float(tokens),
+            retry_after=float(retry_after),
+        )
+
+
+def _build_backend() -> RateLimiterBackend:
+    if settings.rate_limit_backend == "redis":
+        return RedisBackend(
+            settings.redis_url, idle_seconds=settings.rate_limit_idle_seconds
+        )
+    if settings.rate_limit_backend == "shm":
+        return SharedMemoryBackend(
+            shared_state_dir(),
+            max_buckets=settings.rate_limit_max_buckets,
+            # a bucket idle for a whole window is full again anyway
+            idle_seconds=max(
+                settings.rate_limit_idle_seconds, settings.rate_limit_window_seconds
+            ),
+        )
+    return InMemoryBackend(
+        sweep_interval_seconds=settings.rate_limit_sweep_interval_seconds,
+        idle_seconds=settings.rate_limit_idle_seconds,
+    )
+
+
+_backend: RateLimiterBackend = _build_backend()
+
+
+def rate_limit_headers(result: RateLimitResult, limit: Optional[int] = None) -> Dict[str, str]:
+    headers = {
+        "X-RateLimit-Limit": str(settings.rate_limit_requests if limit is None else limit),
+        "X-RateLimit-Remaining": str(math.floor(result.remaining)),
+    }
+    if not result.allowed:
+        headers["Retry-After"] = str(max(1, math.ceil(result.retry_after)))
+    return headers
+
+
+async def charge_rate_limit(
+    user_id: str,
+    cost: float = 1.0,
+    response: Optional[Response] = None,
+    limit: Optional[int] = None,
+    bucket: str = "",
+) -> RateLimitResult:
+    """
+    Take `cost` tokens from the user's bucket, or raise 429 if there aren't enough.
+    Single calls cost 1 from the RATE_LIMIT_REQUESTS bucket; batch endpoints
+    charge by the upstream work they cause to their own `bucket` holding
+    `limit` tokens per window. A cost larger than the whole bucket can never
+    be paid: 413, without Retry-After.
+    Rate-limit headers are added to `response` (and always to the 429).
+    """
+    if limit is None:
+        limit = settings.rate_limit_requests
+    if cost > limit:
+        raise HTTPException(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail=(
+                f"This request needs {math.ceil(cost)} calls; at most {limit} "
+                f"are allowed per {settings.rate_limit_window_seconds} seconds."
+            ),
+        )
+    capacity = float(limit)
+    refill_rate = limit / settings.rate_limit_window_seconds  # tokens per second
+    key = f"{bucket}:{user_id}" if bucket else user_id
+    result = await _backend.consume(key, cost, capacity, refill_rate)
+
+    if not result.allowed:
         # no tokens left
+        RATE_LIMITED.inc()
         raise HTTPException(
             status_code=status.HTTP_429_TOO_MANY_REQUESTS,
             detail="Rate limit exceeded. Please try again later.",
+            headers=rate_limit_headers(result, limit),
         )
 
-    bucket["tokens"] -= 1.0
-    _buckets[user_id] = bucket
+    if response is not None:
+        response.headers.update(rate_limit_headers(result, limit))
+    return result
+
+
+async def rate_limiter_dependency(
+    response: Response,
+    current_user: UserInDB = Depends(get_current_user),
+):
+    await charge_rate_limit(current_user.username, response=response)
     return True
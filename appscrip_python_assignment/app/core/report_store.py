@@ -0,0 +1,244 @@
+import asyncio
+import hashlib
+import sqlite3
+import threading
+import time
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Tuple
+
+from cachetools import LRUCache
+
+from app.config import settings
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS reports (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    sector TEXT NOT NULL,
+    country TEXT NOT NULL,
+    generated_at REAL NOT NULL,
+    etag TEXT NOT NULL,
+    degraded INTEGER NOT NULL DEFAULT 0,
+    markdown TEXT NOT NULL,
+    payload TEXT,
+    UNIQUE (sector, country, generated_at)
+);
+CREATE INDEX IF NOT EXISTS reports_by_sector ON reports (sector, country, id);
+"""
+
+_COLUMNS = "id, sector, country, generated_at, etag, degraded, markdown, payload"
+
+
+@dataclass
+class StoredReport:
+    id: int
+    sector: str
+    country: str
+    generated_at: float  # unix timestamp of the analysis the report was built from
+    etag: str
+    degraded: bool
+    markdown: str
+    # JSON of the collected data + analysis the report was rendered from
+    # (other formats are rendered from it); None for rows from older versions
+    payload: Optional[str] = None
+
+    def age(self) -> float:
+        return time.time() - self.generated_at
+
+
+def make_etag(markdown: str) -> str:
+    # strong validator: the report text already embeds its generation time
+    return '"' + hashlib.sha256(markdown.encode("utf-8")).hexdigest()[:32] + '"'
+
+
+def _row_to_report(row: tuple) -> StoredReport:
+    id_, sector, country, generated_at, etag, degraded, markdown, payload = row
+    return StoredReport(
+        id=id_,
+        sector=sector,
+        country=country,
+        generated_at=generated_at,
+        etag=etag,
+        degraded=bool(degraded),
+        markdown=markdown,
+        payload=payload,
+    )
+
+
+class ReportStore:
+    """
+    SQLite-backed history of generated reports, keyed by (sector, country)
+    and generation time.
+
+    - one connection in WAL mode, so readers in other workers don't block the writer
+    - queries run on a worker thread; the event loop never waits on disk
+    - saving the same generation twice is a no-op (remembered in memory,
+      concurrent saves share one insert, and a UNIQUE constraint enforces it
+      across processes)
+    - at most `history_limit` reports are kept per sector
+    """
+
+    def __init__(self, path: str, history_limit: int = 200):
+        self.path = path
+        self.history_limit = history_limit
+        self._conn: Optional[sqlite3.Connection] = None
+        self._lock = threading.Lock()
+        # (sector, country, generated_at) -> id of the saved row
+        self._saved: LRUCache = LRUCache(maxsize=1024)
+        # same key -> insert currently running for it
+        self._inflight: Dict[Tuple[str, str, float], asyncio.Future] = {}
+
+        self.writes = 0
+        self.reads = 0
+
+    def _connection(self) -> sqlite3.Connection:
+        if self._conn is None:
+            conn = sqlite3.connect(
+                self.path, check_same_thread=False, isolation_level=None
+            )
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.executescript(_SCHEMA)
+            columns = {row[1] for row in conn.execute("PRAGMA table_info(reports)")}
+            if "payload" not in columns:
+                try:
+                    conn.execute("ALTER TABLE reports ADD COLUMN payload TEXT")
+                except sqlite3.OperationalError:
+                    pass  # another worker added it first
+            self._conn = conn
+        return self._conn
+
+    # -- sync helpers (run via asyncio.to_thread) ---------------------------
+
+    def _insert(self, report: StoredReport) -> int:
+        with self._lock:
+            conn = self._connection()
+            cur = conn.execute(
+                "INSERT OR IGNORE INTO reports "
+                "(sector, country, generated_at, etag, degraded, markdown, payload) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (
+                    report.sector,
+                    report.country,
+                    report.generated_at,
+                    report.etag,
+                    int(report.degraded),
+                    report.markdown,
+                    report.payload,
+                ),
+            )
+            if cur.rowcount:
+                row_id = cur.lastrowid
+                conn.execute(
+                    "DELETE FROM reports WHERE sector = ? AND country = ? AND id <= ("
+                    "  SELECT id FROM reports WHERE sector = ? AND country = ?"
+                    "  ORDER BY id DESC LIMIT 1 OFFSET ?)",
+                    (
+                        report.sector,
+                        report.country,
+                        report.sector,
+                        report.country,
+                        self.history_limit,
+                    ),
+                )
+            else:
+                # another worker saved this generation first
+                row_id = conn.execute(
+                    "SELECT id FROM reports "
+                    "WHERE sector = ? AND country = ? AND generated_at = ?",
+                    (report.sector, report.country, report.generated_at),
+                ).fetchone()[0]
+            return row_id
+
+    def _select(self, sql: str, params: tuple) -> List[StoredReport]:
+        with self._lock:
+            rows = self._connection().execute(sql, params).fetchall()
+        return [_row_to_report(row) for row in rows]
+
+    # -- public API ---------------------------------------------------------
+
+    async def save(
+        self,
+        sector: str,
+        country: str,
+        generated_at: float,
+        markdown: str,
+        degraded: bool = False,
+        payload: Optional[str] = None,
+    ) -> StoredReport:
+        report = StoredReport(
+            id=0,
+            sector=sector,
+            country=country,
+            generated_at=generated_at,
+            etag=make_etag(markdown),
+            degraded=degraded,
+            markdown=markdown,
+            payload=payload,
+        )
+        key = (sector, country, generated_at)
+        row_id = self._saved.get(key)
+        if row_id is None:
+            pending = self._inflight.get(key)
+            if pending is None:
+                pending = asyncio.ensure_future(asyncio.to_thread(self._insert, report))
+                self._inflight[key] = pending
+                try:
+                    row_id = await asyncio.shield(pending)
+                    self._saved[key] = row_id
+                    self.writes += 1
+                finally:
+                    self._inflight.pop(key, None)
+            else:
+                row_id = await asyncio.shield(pending)
+        report.id = row_id
+        return report
+
+    async def latest(self, sector: str, country: str) -> Optional[StoredReport]:
+        self.reads += 1
+        rows = await asyncio.to_thread(
+            self._select,
+            f"SELECT {_COLUMNS} FROM reports WHERE sector = ? AND country = ? "
+            "ORDER BY id DESC LIMIT 1",
+            (sector, country),
+        )
+        return rows[0] if rows else None
+
+    async def history(
+        self,
+        sector: str,
+        country: str,
+        limit: int = 20,
+        before_id: Optional[int] = None,
+    ) -> List[StoredReport]:
+        """
+        Newest-first page of reports. Keyset pagination: pass the last `id`
+        of the previous page as `before_id`.
+        """
+        self.reads += 1
+        if before_id is None:
+            sql = (
+                f"SELECT {_COLUMNS} FROM reports WHERE sector = ? AND country = ? "
+                "ORDER BY id DESC LIMIT ?"
+            )
+            params: tuple = (sector, country, limit)
+        else:
+            sql = (
+                f"SELECT {_COLUMNS} FROM reports WHERE sector = ? AND country = ? "
+                "AND id < ? ORDER BY id DESC LIMIT ?"
+            )
+            params = (sector, country, before_id, limit)
+        return await asyncio.to_thread(self._select, sql, params)
+
+    def close(self) -> None:
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+    def stats(self) -> dict:
+        return {"path": self.path, "writes": self.writes, "reads": self.reads}
+
+
+report_store = ReportStore(
+    settings.report_store_path, history_limit=settings.report_store_history_limit
+)
@@ -1,56 +1,156 @@
+import asyncio
+import json
+import time
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
-from typing import Optional, Dict
+from functools import lru_cache
+from pathlib import Path
+from types import MappingProxyType
+from typing import Any, Mapping, Optional, Dict, Tuple
 
+from cachetools import LRUCache
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer, OAuth2PasswordRequestForm
 from jose import JWTError, jwt
-from passlib.context import CryptContext
 
 from app.config import settings
-from app.schemas.auth import TokenData, User, UserInDB
+from app.schemas.auth import User, UserInDB
 
 # OAuth2 scheme – clients will hit /token to get JWT
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/token")
 
-# Password hashing context
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+
+DEFAULT_USERS_FILE = Path(__file__).resolve().parent.parent / "data" / "users.json"
+
+
+def _load_users(path: Path) -> Dict[str, Dict]:
+    """
+    Load the user store. Password hashes are precomputed in the file, so
+    nothing is hashed at import time (see `get_password_hash` to add users).
+    """
+    with open(path, encoding="utf-8") as fh:
+        return json.load(fh)
+
 
 # In-memory user store (demo)
-users_db: Dict[str, Dict] = {
-    "prabal": {
-        "username": "prabal",
-        "full_name": "prabal gupta",
-        "hashed_password": pwd_context.hash("prabal123"),
-        "disabled": False,
-    },
-    "guest": {
-        "username": "guest",
-        "full_name": "Guest User",
-        "hashed_password": pwd_context.hash("guest123"),
-        "disabled": False,
-    },
-}
+users_db: Dict[str, Dict] = _load_users(
+    Path(settings.users_file) if settings.users_file else DEFAULT_USERS_FILE
+)
+
+
+# Immutable username -> UserInDB index, built once; lookups allocate nothing
+_user_index: Mapping[str, UserInDB] = MappingProxyType(
+    {username: UserInDB(**record) for username, record in users_db.items()}
+)
+
+# key: raw JWT, value: (username, exp as unix timestamp).
+# Only tokens whose signature/claims were verified get in here.
+_verified_tokens: LRUCache = LRUCache(maxsize=settings.auth_token_cache_size)
+
+
+class PasswordVerifier:
+    """
+    Runs bcrypt checks on a small dedicated thread pool so logins never block
+    the event loop. At most `max_workers` checks run at once; up to
+    `max_queue` more wait their turn, beyond that logins get a 503.
+    """
+
+    def __init__(self, max_workers: int, max_queue: int):
+        self._executor = ThreadPoolExecutor(
+            max_workers=max_workers, thread_name_prefix="bcrypt"
+        )
+        self._slots = asyncio.Semaphore(max_workers)
+        self.max_workers = max_workers
+        self.max_queue = max_queue
+
+        self.active = 0
+        self.queued = 0
+        self.completed = 0
+        self.rejected = 0
+        self.total_wait_seconds = 0.0
+        self.max_wait_seconds = 0.0
+
+    async def verify(self, plain_password: str, hashed_password: str) -> bool:
+        if self.queued >= self.max_queue:
+            self.rejected += 1
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail="Too many concurrent logins. Please retry shortly.",
+                headers={"Retry-After": "1"},
+            )
+
+        enqueued_at = time.perf_counter()
+        self.queued += 1
+        try:
+            await self._slots.acquire()
+        finally:
+            self.queued -= 1
+
+        wait = time.perf_counter() - enqueued_at
+        self.total_wait_seconds += wait
+        self.max_wait_seconds = max(self.max_wait_seconds, wait)
+        self.active += 1
+        try:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(
+                self._executor, verify_password, plain_password, hashed_password
+            )
+        finally:
+            self.active -= 1
+            self.completed += 1
+            self._slots.release()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "max_workers": self.max_workers,
+            "max_queue": self.max_queue,
+            "active": self.active,
+            "queued": self.queued,
+            "completed": self.completed,
+            "rejected": self.rejected,
+            "avg_wait_ms": (
+                self.total_wait_seconds / self.completed * 1000 if self.completed else 0.0
+            ),
+            "max_wait_ms": self.max_wait_seconds * 1000,
+        }
+
+
+password_verifier = PasswordVerifier(
+    max_workers=settings.auth_hash_workers,
+    max_queue=settings.auth_hash_max_queue,
+)
+
+
+@lru_cache(maxsize=1)
+def _pwd_context():
+    """Password hashing context; passlib is imported on the first login."""
+    from passlib.context import CryptContext
+
+    return CryptContext(schemes=["bcrypt"], deprecated="auto")
+
+
+def preload() -> None:
+    """Import the password hashing backend now (call off the event loop)."""
+    _pwd_context()
 
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
-    return pwd_context.verify(plain_password, hashed_password)
+    return _pwd_context().verify(plain_password, hashed_password)
 
 
 def get_password_hash(password: str) -> str:
-    return pwd_context.hash(password)
+    return _pwd_context().hash(password)
 
 
-def get_user(db: Dict[str, Dict], username: str) -> Optional[UserInDB]:
-    if username in db:
-        return UserInDB(**db[username])
-    return None
+def get_user(username: str) -> Optional[UserInDB]:
+    return _user_index.get(username)
 
 
-def authenticate_user(username: str, password: str) -> Optional[UserInDB]:
-    user = get_user(users_db, username)
+async def authenticate_user(username: str, password: str) -> Optional[UserInDB]:
+    user = get_user(username)
     if not user:
         return None
-    if not verify_password(password, user.hashed_password):
+    if not await password_verifier.verify(password, user.hashed_password):
         return None
     return user
 
@@ -68,27 +168,80 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -
     return encoded_jwt
 
 
+def _verify_token(token: str) -> Optional[str]:
+    """
+    Return the username for a valid token, or None.
+    Verified tokens are cached until their `exp`, so repeat requests skip
+    the signature check.
+    """
+    now = time.time()
+    cached: Optional[Tuple[str, float]] = _verified_tokens.get(token)
+    if cached is not None:
+        username, exp = cached
+        if exp > now:
+            return username
+        _verified_tokens.pop(token, None)
+
+    try:
+        payload = jwt.decode(
+            token, settings.jwt_secret, algorithms=[settings.jwt_algorithm]
+        )
+    except JWTError:
+        return None
+
+    username = payload.get("sub")
+    if username is None:
+        return None
+    exp = payload.get("exp")
+    if exp is not None:
+        _verified_tokens[token] = (username, float(exp))
+    return username
+
+
 async def get_current_user(token: str = Depends(oauth2_scheme)) -> UserInDB:
+    """
+    FastAPI caches dependency results per request, so even though both
+    `with_rate_limit` and `rate_limiter_dependency` depend on this, the
+    token is verified once per request (and at most once per token lifetime
+    thanks to `_verified_tokens`).
+    """
     credentials_error = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
         headers={"WWW-Authenticate": "Bearer"},
     )
 
-    try:
-        payload = jwt.decode(
-            token, settings.jwt_secret, algorithms=[settings.jwt_algorithm]
-        )
-        username: str = payload.get("sub")
-        if username is None:
-            raise credentials_error
-        token_data = TokenData(username=username)
-    except JWTError:
+    username = _verify_token(token)
+    if username is None:
         raise credentials_error
 
-    user = get_user(users_db, username=token_data.username)  
+    user = get_user(username)
     if user is None:
         raise credentials_error
     if user.disabled:
         raise HTTPException(status_code=400, detail="Inactive user")
     return user
+
+
+async def get_admin_user(user: UserInDB = Depends(get_current_user)) -> UserInDB:
+    """The current user, if an admin (diagnostics endpoints); 403 otherwise."""
+    if not user.admin:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Admin access required.",
+        )
+    return user
+
+
+def is_admin_authorization(authorization: Optional[str]) -> bool:
+    """
+    Whether a raw `Authorization` header value carries a valid bearer token
+    of an active admin user. For code outside FastAPI's dependencies (the
+    profiling middleware runs before routing).
+    """
+    scheme, _, token = (authorization or "").partition(" ")
+    if scheme.lower() != "bearer" or not token.strip():
+        return False
+    username = _verify_token(token.strip())
+    user = get_user(username) if username is not None else None
+    return user is not None and not user.disabled and user.admin
@@ -1,19 +1,261 @@
-from typing import Dict, Any
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional
+import heapq
+import math
 import time
 
-# key: username (or session id), value: simple stats
-_session_store: Dict[str, Dict[str, Any]] = {}
+from app.config import settings, shared_state_dir
 
 
-def touch_session(user_id: str) -> Dict[str, Any]:
-    """Update or create a simple in-memory session record."""
+class SessionRecord:
+    """Per-user request stats; slots keep each record to a few dozen bytes."""
+
+    __slots__ = ("calls", "created_at", "last_call_at")
+
+    def __init__(self, calls: int, created_at: float, last_call_at: float):
+        self.calls = calls
+        self.created_at = created_at
+        self.last_call_at = last_call_at
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            "calls": self.calls,
+            "created_at": self.created_at,
+            "last_call_at": self.last_call_at,
+        }
+
+
+class SessionBackend:
+    """Session storage. `touch` counts a call and returns the updated record."""
+
+    async def touch(self, user_id: str) -> SessionRecord:
+        raise NotImplementedError
+
+    async def get(self, user_id: str) -> Optional[SessionRecord]:
+        raise NotImplementedError
+
+    async def stats(self) -> Dict[str, Any]:
+        return {}
+
+
+class InMemorySessionBackend(SessionBackend):
+    """
+    Process-local sessions in least-recently-active order. Idle sessions
+    are expired from the front of that order (at most once a second), and
+    the size never exceeds `max_sessions`.
+    """
+
+    def __init__(self, max_sessions: int, idle_seconds: float):
+        self.max_sessions = max_sessions
+        self.idle_seconds = idle_seconds
+        # key: username (or session id)
+        self._sessions: "OrderedDict[str, SessionRecord]" = OrderedDict()
+        self._last_expire = 0.0
+        self.expired = 0
+        self.evicted = 0
+
+    def _expire(self, now: float) -> None:
+        if now - self._last_expire < 1.0:
+            return
+        self._last_expire = now
+        sessions = self._sessions
+        while sessions:
+            oldest = next(iter(sessions.values()))
+            if now - oldest.last_call_at <= self.idle_seconds:
+                break
+            sessions.popitem(last=False)
+            self.expired += 1
+
+    def touch_at(self, user_id: str, now: float) -> SessionRecord:
+        self._expire(now)
+        record = self._sessions.get(user_id)
+        if record is None:
+            if len(self._sessions) >= self.max_sessions:
+                self._sessions.popitem(last=False)
+                self.evicted += 1
+            record = self._sessions[user_id] = SessionRecord(0, now, now)
+        else:
+            self._sessions.move_to_end(user_id)
+        record.calls += 1
+        record.last_call_at = now
+        return record
+
+    async def touch(self, user_id: str) -> SessionRecord:
+        return self.touch_at(user_id, time.time())
+
+    async def get(self, user_id: str) -> Optional[SessionRecord]:
+        record = self._sessions.get(user_id)
+        if record is None or time.time() - record.last_call_at > self.idle_seconds:
+            return None
+        return record
+
+    def __len__(self) -> int:
+        return len(self._sessions)
+
+    async def stats(self) -> Dict[str, Any]:
+        return {
+            "backend": "memory",
+            "sessions": len(self._sessions),
+            "max_sessions": self.max_sessions,
+            "expired": self.expired,
+            "evicted": self.evicted,
+        }
+
+
+class RedisSessionBackend(SessionBackend):
+    """
+    Sessions shared by every worker through Redis hashes. Idle sessions
+    expire via key TTL; the size bound is Redis' `maxmemory` policy.
+    Requires the `redis` package.
+    """
+
+    def __init__(self, url: str, idle_seconds: float, key_prefix: str = "session:"):
+        import redis.asyncio as redis_asyncio  # optional dependency
+
+        self._client = redis_asyncio.from_url(url)
+        self.idle_seconds = int(idle_seconds)
+        self.key_prefix = key_prefix
+
+    async def touch(self, user_id: str) -> SessionRecord:
+        key = self.key_prefix + user_id
+        now = time.time()
+        async with self._client.pipeline(transaction=True) as pipe:
+            pipe.hincrby(key, "calls", 1)
+            pipe.hsetnx(key, "created_at", now)
+            pipe.hset(key, "last_call_at", now)
+            pipe.expire(key, self.idle_seconds)
+            pipe.hget(key, "created_at")
+            calls, _, _, _, created_at = await pipe.execute()
+        return SessionRecord(int(calls), float(created_at), now)
+
+    async def get(self, user_id: str) -> Optional[SessionRecord]:
+        raw = await self._client.hgetall(self.key_prefix + user_id)
+        if not raw:
+            return None
+        values = {k.decode(): v.decode() for k, v in raw.items()}
+        return SessionRecord(
+            int(values["calls"]),
+            float(values["created_at"]),
+            float(values["last_call_at"]),
+        )
+
+    async def stats(self) -> Dict[str, Any]:
+        return {"backend": "redis", "idle_seconds": self.idle_seconds}
+
+
+class SharedMemorySessionBackend(SessionBackend):
+    """
+    Sessions in a memory-mapped table shared by every worker on the host
+    (`python -m app.serve`); each touch is one atomic row update. At most
+    `max_sessions` rows: the least recently active session in a full
+    stripe is replaced.
+    """
+
+    FIELDS = ("calls", "created_at", "last_call_at")
+
+    def __init__(self, directory: str, max_sessions: int, idle_seconds: float):
+        from app.core.shared_state import SharedTable, table_path
+
+        self.max_sessions = max_sessions
+        self._table = SharedTable(
+            table_path(directory, "sessions", self.FIELDS, max_sessions),
+            fields=self.FIELDS,
+            capacity=max_sessions,
+            touched_field="last_call_at",
+            idle_seconds=idle_seconds,
+        )
+
+    async def touch(self, user_id: str) -> SessionRecord:
+        now = time.time()
+
+        def count_call(row):
+            calls, created_at = (0.0, now) if row is None else row[:2]
+            return (calls + 1, created_at, now), SessionRecord(int(calls) + 1, created_at, now)
+
+        return self._table.update(user_id, now, count_call)
+
+    async def get(self, user_id: str) -> Optional[SessionRecord]:
+        row = self._table.get(user_id, time.time())
+        if row is None:
+            return None
+        calls, created_at, last_call_at = row
+        return SessionRecord(int(calls), created_at, last_call_at)
+
+    async def stats(self) -> Dict[str, Any]:
+        table = self._table.stats(time.time())
+        return {
+            "backend": "shm",
+            "sessions": table["rows"],
+            "max_sessions": self.max_sessions,
+            "evicted": table["evictions"],
+            "path": table["path"],
+        }
+
+
+def _build_backend() -> SessionBackend:
+    if settings.session_backend == "redis":
+        return RedisSessionBackend(settings.redis_url, settings.session_idle_seconds)
+    if settings.session_backend == "shm":
+        return SharedMemorySessionBackend(
+            shared_state_dir(),
+            max_sessions=settings.session_max_entries,
+            idle_seconds=settings.session_idle_seconds,
+        )
+    return InMemorySessionBackend(
+        max_sessions=settings.session_max_entries,
+        idle_seconds=settings.session_idle_seconds,
+    )
+
+
+_session_store: SessionBackend = _build_backend()
+
+# key: sector, value: [decayed request count, last update time]
+_sector_hits: Dict[str, List[float]] = {}
+
+
+async def touch_session(user_id: str) -> SessionRecord:
+    """Count a call for the user in the session store."""
+    return await _session_store.touch(user_id)
+
+
+async def get_session(user_id: str) -> Optional[SessionRecord]:
+    return await _session_store.get(user_id)
+
+
+async def session_stats() -> Dict[str, Any]:
+    return await _session_store.stats()
+
+
+def _decayed(score: float, last: float, now: float) -> float:
+    # exponential decay: a request counts half as much after one half-life
+    return score * math.pow(0.5, (now - last) / settings.prewarm_half_life_seconds)
+
+
+def record_sector_request(sector: str) -> None:
+    """Count a request for `sector` (used to pick sectors to pre-warm)."""
     now = time.time()
-    session = _session_store.get(user_id, {"calls": 0, "created_at": now})
-    session["calls"] = session.get("calls", 0) + 1
-    session["last_call_at"] = now
-    _session_store[user_id] = session
-    return session
+    hit = _sector_hits.get(sector)
+    if hit is None:
+        if len(_sector_hits) >= settings.prewarm_max_tracked_sectors:
+            _forget_coldest(now)
+        _sector_hits[sector] = [1.0, now]
+        return
+    hit[0] = _decayed(hit[0], hit[1], now) + 1.0
+    hit[1] = now
 
 
-# def get_session(user_id: str) -> Dict[str, Any] | None:
-#     return _session_store.get(user_id)
+def _forget_coldest(now: float) -> None:
+    # drop the colder half so a flood of one-off sectors can't grow memory
+    ranked = sorted(_sector_hits, key=lambda s: _decayed(*_sector_hits[s], now))
+    for sector in ranked[: len(ranked) // 2 + 1]:
+        del _sector_hits[sector]
+
+
+def hot_sectors(k: int, min_score: float = 0.0) -> List[str]:
+    """Top `k` sectors by decayed request count (at least `min_score`)."""
+    now = time.time()
+    scored = (
+        (_decayed(score, last, now), sector)
+        for sector, (score, last) in _sector_hits.items()
+    )
+    return [sector for score, sector in heapq.nlargest(k, scored) if score >= min_score]
@@ -0,0 +1,213 @@
+import hashlib
+import mmap
+import os
+import stat
+import struct
+import threading
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, Optional, Sequence, Tuple, TypeVar
+
+T = TypeVar("T")
+Row = Tuple[float, ...]
+
+_MAGIC = b"TRDSHM01"
+_HEADER = struct.Struct("<8sIII")  # magic, fields per row, capacity, stripe size
+_HEADER_SIZE = 64
+_DIGEST_SIZE = 16
+_EMPTY = bytes(_DIGEST_SIZE)
+
+
+def supported() -> bool:
+    """Whether this platform has the fcntl locks SharedTable needs (not on Windows)."""
+    try:
+        import fcntl  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+def _private_dir(directory: str) -> None:
+    """
+    Create `directory` (mode 0700), or check that an existing one is a real
+    directory owned by this user and not writable by group or others: the
+    default location is under the shared tmp dir, where another local user
+    could otherwise pre-create it and plant or swap the table files.
+    """
+    os.makedirs(directory, mode=0o700, exist_ok=True)
+    info = os.lstat(directory)
+    if (
+        not stat.S_ISDIR(info.st_mode)
+        or info.st_uid != os.getuid()
+        or info.st_mode & (stat.S_IWGRP | stat.S_IWOTH)
+    ):
+        raise RuntimeError(
+            f"{directory} must be a directory owned by this user and writable by "
+            "it alone; fix its permissions or set SHARED_STATE_DIR to another directory"
+        )
+
+
+class SharedTable:
+    """
+    Fixed-size hash table of float rows in a memory-mapped file, shared by
+    every process on the host that opens the same path (the uvicorn workers
+    started by `python -m app.serve`).
+
+    - a row is keyed by a 16-byte digest of its key and holds `fields` floats
+    - slots are grouped in stripes; a key lives in one stripe (linear probing
+      inside it), and `update` runs read-modify-write under an exclusive
+      fcntl byte-range lock on that stripe, so updates from different
+      processes are atomic without an external service
+    - rows whose `touched_field` is older than `idle_seconds` read as absent;
+      when a stripe is full the least recently touched row is replaced,
+      so memory stays at `capacity` rows
+    - the file layout is in its name, and nothing in a row is process-specific,
+      so state survives restarts; POSIX only (fcntl)
+    """
+
+    def __init__(
+        self,
+        path: str,
+        fields: Sequence[str],
+        capacity: int,
+        touched_field: str,
+        idle_seconds: float,
+        stripe_size: int = 64,
+    ):
+        try:
+            import fcntl  # POSIX only
+        except ImportError:
+            raise RuntimeError(
+                "The shm backends need POSIX fcntl locks, which this platform lacks; "
+                "use the redis backends (RATE_LIMIT_BACKEND=redis, SESSION_BACKEND=redis)"
+            ) from None
+
+        self._fcntl = fcntl
+        self.path = path
+        self.fields = tuple(fields)
+        self.stripe_size = stripe_size
+        self.stripes = max(1, -(-capacity // stripe_size))
+        self.capacity = self.stripes * stripe_size
+        self.idle_seconds = idle_seconds
+        self._touched = self.fields.index(touched_field)
+        self._row = struct.Struct(f"<{len(self.fields)}d")
+        self._slot_size = _DIGEST_SIZE + self._row.size
+        # fcntl locks exclude other processes only; this one serialises threads
+        self._thread_lock = threading.Lock()
+        self.evictions = 0
+
+        _private_dir(os.path.dirname(os.path.abspath(path)))
+        self._fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o600)
+        size = _HEADER_SIZE + self.capacity * self._slot_size
+        header = _HEADER.pack(_MAGIC, len(self.fields), self.capacity, stripe_size)
+        # byte 0 guards initialisation; byte 1 + i guards stripe i
+        fcntl.lockf(self._fd, fcntl.LOCK_EX, 1, 0)
+        try:
+            if os.fstat(self._fd).st_size == 0:
+                os.ftruncate(self._fd, size)
+                os.pwrite(self._fd, header, 0)
+            elif os.pread(self._fd, _HEADER.size, 0) != header:
+                raise RuntimeError(
+                    f"{path} holds a table with a different layout; remove it "
+                    "or set SHARED_STATE_DIR to another directory"
+                )
+        finally:
+            fcntl.lockf(self._fd, fcntl.LOCK_UN, 1, 0)
+        self._mm = mmap.mmap(self._fd, size)
+
+    @contextmanager
+    def _locked(self, stripe: int, exclusive: bool) -> Iterator[None]:
+        mode = self._fcntl.LOCK_EX if exclusive else self._fcntl.LOCK_SH
+        with self._thread_lock:
+            self._fcntl.lockf(self._fd, mode, 1, 1 + stripe)
+            try:
+                yield
+            finally:
+                self._fcntl.lockf(self._fd, self._fcntl.LOCK_UN, 1, 1 + stripe)
+
+    def _home(self, key: str) -> Tuple[bytes, int, int]:
+        digest = hashlib.blake2b(key.encode("utf-8"), digest_size=_DIGEST_SIZE).digest()
+        h = int.from_bytes(digest[:8], "little")
+        return digest, h % self.stripes, (h // self.stripes) % self.stripe_size
+
+    def _offset(self, stripe: int, index: int) -> int:
+        return _HEADER_SIZE + (stripe * self.stripe_size + index) * self._slot_size
+
+    def _probe(self, digest: bytes, stripe: int, start: int, now: float) -> Tuple[int, Optional[Row]]:
+        """
+        Offset of `digest`'s slot in the stripe (its row, or None when the key
+        is new or its row went idle), else of the first free slot, else of the
+        least recently touched one.
+        """
+        mm = self._mm
+        victim, victim_touched = -1, float("inf")
+        for i in range(self.stripe_size):
+            offset = self._offset(stripe, (start + i) % self.stripe_size)
+            found = mm[offset : offset + _DIGEST_SIZE]
+            if found == _EMPTY:
+                # keys are never removed, so none is stored past an empty slot
+                return offset, None
+            row = self._row.unpack_from(mm, offset + _DIGEST_SIZE)
+            if found == digest:
+                return offset, None if now - row[self._touched] > self.idle_seconds else row
+            if row[self._touched] < victim_touched:
+                victim, victim_touched = offset, row[self._touched]
+        self.evictions += 1
+        return victim, None
+
+    def update(self, key: str, now: float, fn: Callable[[Optional[Row]], Tuple[Row, T]]) -> T:
+        """
+        Atomically replace `key`'s row with `fn(row)[0]` (`row` is None for a
+        new or idle key) and return `fn(row)[1]`.
+        """
+        digest, stripe, start = self._home(key)
+        with self._locked(stripe, exclusive=True):
+            offset, row = self._probe(digest, stripe, start, now)
+            new_row, result = fn(row)
+            self._mm[offset : offset + _DIGEST_SIZE] = digest
+            self._row.pack_into(self._mm, offset + _DIGEST_SIZE, *new_row)
+        return result
+
+    def get(self, key: str, now: float) -> Optional[Row]:
+        digest, stripe, start = self._home(key)
+        with self._locked(stripe, exclusive=False):
+            mm = self._mm
+            for i in range(self.stripe_size):
+                offset = self._offset(stripe, (start + i) % self.stripe_size)
+                found = mm[offset : offset + _DIGEST_SIZE]
+                if found == _EMPTY:
+                    return None
+                if found == digest:
+                    row = self._row.unpack_from(mm, offset + _DIGEST_SIZE)
+                    return None if now - row[self._touched] > self.idle_seconds else row
+        return None
+
+    def count(self, now: float) -> int:
+        """Rows that aren't idle (scans the table without locking; approximate)."""
+        mm = self._mm
+        touched_at = _DIGEST_SIZE + self._touched * 8
+        rows = 0
+        for offset in range(_HEADER_SIZE, len(mm), self._slot_size):
+            if (
+                mm[offset : offset + _DIGEST_SIZE] != _EMPTY
+                and now - struct.unpack_from("<d", mm, offset + touched_at)[0] <= self.idle_seconds
+            ):
+                rows += 1
+        return rows
+
+    def close(self) -> None:
+        self._mm.close()
+        os.close(self._fd)
+
+    def stats(self, now: float) -> Dict[str, Any]:
+        return {
+            "path": self.path,
+            "capacity": self.capacity,
+            "rows": self.count(now),
+            # this process's evictions
+            "evictions": self.evictions,
+        }
+
+
+def table_path(directory: str, name: str, fields: Sequence[str], capacity: int) -> str:
+    """File for a table; the layout is part of the name, so a resized table gets a new file."""
+    return os.path.join(directory, f"{name}-{len(fields)}x{capacity}.shm")
@@ -1,33 +1,165 @@
+import asyncio
+from contextlib import asynccontextmanager
 from datetime import timedelta
 
-from fastapi import FastAPI, Depends, HTTPException, status
+from fastapi import FastAPI, Depends, HTTPException, Response, status
 from fastapi.security import OAuth2PasswordRequestForm
 
 from app.api.routes_analyze import router as analyze_router
+from app.api.routes_jobs import router as jobs_router
+from app.api.routes_reports import router as reports_router
 from app.config import settings
-from app.core.security import authenticate_user, create_access_token
-from app.schemas.auth import Token
+from app.core.admission import admission
+from app.core.cache import report_cache
+from app.core.http_client import start_http_client, close_http_client
+from app.core.metrics import MetricsMiddleware, render_prometheus
+from app.core.report_store import report_store
+from app.core.session import session_stats
+from app.core.security import (
+    authenticate_user,
+    create_access_token,
+    get_admin_user,
+    password_verifier,
+)
+from app.core import security
+from app.services import ai_client, collector, sector_index
+from app.schemas.auth import Token, UserInDB
+from app.services.incremental import refresh_stats
+from app.services.jobs import job_runner
+from app.services.llm_scheduler import gemini_scheduler
+from app.services.prewarm import prewarmer
+from app.services.prompt_compactor import prompt_stats
+
+
+def _preload() -> None:
+    # heavy dependencies are imported lazily; load them before traffic needs them
+    ai_client.preload()
+    collector.preload()
+    security.preload()
+    sector_index.preload()
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # startup: shared outbound HTTP connection pool
+    await start_http_client()
+    # not awaited: the worker starts serving while the imports finish
+    if settings.preload_on_startup:
+        asyncio.get_running_loop().run_in_executor(None, _preload)
+    # refresh hot sectors in the background before their cache entries expire
+    if settings.prewarm_enabled:
+        prewarmer.start()
+    # async job workers (unless dedicated `python -m app.worker` processes run them)
+    if settings.jobs_run_workers:
+        job_runner.start()
+    if settings.diagnostics_enabled:
+        from app.core.diagnostics import loop_monitor
+
+        loop_monitor.start()
+    yield
+    # shutdown
+    if settings.diagnostics_enabled:
+        await loop_monitor.stop()
+    await job_runner.stop()
+    await prewarmer.stop()
+    await close_http_client()
+    report_store.close()
+
 
 app = FastAPI(
     title="Trade Opportunities API",
     version="1.0.0",
     description="Analyzes Indian sectors and returns markdown trade opportunity reports.",
+    lifespan=lifespan,
 )
 
-# mount routers
+# request duration / status counters (+ optional Server-Timing header)
+app.add_middleware(MetricsMiddleware, server_timing=settings.metrics_server_timing)
+
+# opt-in diagnostics: nothing is imported, mounted or started unless enabled
+if settings.diagnostics_enabled:
+    from app.api.routes_debug import router as debug_router
+    from app.core.diagnostics import ProfilingMiddleware, profile_store, profiler
+
+    app.add_middleware(
+        ProfilingMiddleware,
+        profiler=profiler,
+        store=profile_store,
+        header=settings.diagnostics_profile_header,
+        authorize=security.is_admin_authorization,
+    )
+    app.include_router(debug_router)
+
+# mount routers (jobs first: /analyze/jobs must not match /analyze/{sector})
+app.include_router(jobs_router, prefix="")
 app.include_router(analyze_router, prefix="")
+app.include_router(reports_router, prefix="")
 
-# health check
+# health check; 503 while admission control is saturated so load balancers
+# send traffic to other instances
 @app.get("/health")
-async def health_check():
-    return {"status": "ok"}
+async def health_check(response: Response):
+    saturation = admission.health()
+    if not saturation["saturated"]:
+        return {"status": "ok", "admission": saturation}
+    if settings.admission_health_unavailable_when_saturated:
+        response.status_code = status.HTTP_503_SERVICE_UNAVAILABLE
+    return {"status": "saturated", "admission": saturation}
+
+
+@app.get("/admission/stats", tags=["ops"])
+async def admission_stats(current_user: UserInDB = Depends(get_admin_user)):
+    """Admission control: adaptive limit, in-flight and queued requests, rejections."""
+    return admission.stats()
+
+
+@app.get("/cache/stats", tags=["ops"])
+async def cache_stats(current_user: UserInDB = Depends(get_admin_user)):
+    """Report cache counters (hits, misses, coalesced, evictions, size) and store I/O."""
+    return {
+        **report_cache.stats(),
+        "store": report_store.stats(),
+        "prewarm": prewarmer.stats(),
+        "sectors": sector_index.sector_stats(),
+    }
+
+
+@app.get("/auth/stats", tags=["ops"])
+async def auth_stats(current_user: UserInDB = Depends(get_admin_user)):
+    """Password-verification pool counters (active, queued, wait times) and sessions."""
+    return {**password_verifier.stats(), "sessions": await session_stats()}
+
+
+@app.get("/llm/stats", tags=["ops"])
+async def llm_stats(current_user: UserInDB = Depends(get_admin_user)):
+    """Gemini scheduler counters, circuit-breaker state, prompt sizes and refresh modes."""
+    return {
+        **gemini_scheduler.stats(),
+        "prompt": prompt_stats.stats(),
+        "refresh": refresh_stats.stats(),
+    }
+
+
+@app.get("/jobs/stats", tags=["ops"])
+async def jobs_stats(current_user: UserInDB = Depends(get_admin_user)):
+    """Async job queue depth and worker counters."""
+    return await job_runner.stats()
+
+
+@app.get("/metrics", tags=["ops"], include_in_schema=False)
+async def metrics():
+    """Stage latency histograms and error counters (Prometheus text format)."""
+    return Response(
+        content=render_prometheus(),
+        media_type="text/plain; version=0.0.4; charset=utf-8",
+    )
 
 
 @app.post("/token", response_model=Token, tags=["auth"])
 async def login_for_access_token(
     form_data: OAuth2PasswordRequestForm = Depends(),
 ):
-    user = authenticate_user(form_data.username, form_data.password)
+    user = await authenticate_user(form_data.username, form_data.password)
     if not user:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
@@ -1,17 +1,22 @@
+from datetime import datetime
 from typing import List, Literal, Optional
 from pydantic import BaseModel, HttpUrl, Field
 
+# upstream an item came from; CollectedData uses "mixed" when items span sources
+SourceName = Literal["duckduckgo", "google_news", "fallback"]
+
 
 class MarketItem(BaseModel):
     title: str
     url: Optional[HttpUrl] = None
     snippet: str = ""
+    source: Optional[SourceName] = None
 
 
 class CollectedData(BaseModel):
     sector: str
     country: str = "India"
-    source: Literal["duckduckgo", "fallback"] = "duckduckgo"
+    source: Literal["duckduckgo", "google_news", "mixed", "fallback"] = "duckduckgo"
     items: List[MarketItem] = Field(default_factory=list)
 
 
@@ -21,9 +26,67 @@ class AIAnalysis(BaseModel):
     risks: List[str] = Field(default_factory=list)
     time_horizon: Optional[str] = None  # e.g., "short-term 3-6 months"
     evidence_points: List[str] = Field(default_factory=list)
+    # True when Gemini was unavailable and this was built from collected data only
+    degraded: bool = False
+    # how a refresh produced it: full prompt, delta prompt (new items + the
+    # previous analysis) or the previous analysis reused as is
+    refresh: Literal["full", "delta", "reused"] = "full"
+    # delta / reused: when the full analysis it builds on was generated
+    full_analysis_at: Optional[float] = None
+
+
+class ReportDocument(BaseModel):
+    """A report's content as structured data, for clients that render it themselves."""
+
+    title: str
+    sector: str
+    country: str
+    generated_at: datetime
+    degraded: bool = False
+    summary: str
+    time_horizon: Optional[str] = None
+    opportunities: List[str] = Field(default_factory=list)
+    risks: List[str] = Field(default_factory=list)
+    evidence_points: List[str] = Field(default_factory=list)
+    sources: List[MarketItem] = Field(default_factory=list)
 
 
 class AnalyzeResponse(BaseModel):
     sector: str
     markdown_report: str
     generated_by: str = "Trade Opportunities API"
+    # structured report (JSON representation); null for reports stored before it existed
+    report: Optional[ReportDocument] = None
+
+
+class BatchAnalyzeRequest(BaseModel):
+    sectors: List[str] = Field(..., min_length=1)
+    # pack several sectors into one Gemini prompt (fewer calls, lower cost)
+    pack_prompts: bool = False
+
+
+class BatchAnalyzeItem(BaseModel):
+    """One NDJSON line of the /analyze/batch response."""
+
+    sector: str
+    status: Literal["ok", "error"]
+    markdown_report: Optional[str] = None
+    detail: Optional[str] = None
+
+
+class AnalyzeJobRequest(BaseModel):
+    sector: str
+
+
+class AnalyzeJobStatus(BaseModel):
+    """State of an async analysis job; `markdown_report` is set once done."""
+
+    id: str
+    sector: str
+    status: Literal["queued", "running", "done", "failed"]
+    created_at: datetime
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+    report_id: Optional[int] = None
+    markdown_report: Optional[str] = None
+    detail: Optional[str] = None
@@ -1,4 +1,6 @@
-from pydantic import BaseModel
+from typing import Literal
+
+from pydantic import BaseModel, ConfigDict
 
 
 class Token(BaseModel):
@@ -11,9 +13,15 @@ class TokenData(BaseModel):
 
 
 class User(BaseModel):
+    model_config = ConfigDict(frozen=True)
+
     username: str
     full_name: str | None = None
     disabled: bool = False
+    # admission-control class: queued requests are served high > normal > low
+    priority: Literal["high", "normal", "low"] = "normal"
+    # may use the diagnostics endpoints and per-request profiling
+    admin: bool = False
 
 
 class UserInDB(User):
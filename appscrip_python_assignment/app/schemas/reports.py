@@ -0,0 +1,20 @@
+from datetime import datetime
+from typing import List, Optional
+
+from pydantic import BaseModel
+
+
+class StoredReportItem(BaseModel):
+    id: int
+    sector: str
+    generated_at: datetime
+    etag: str
+    degraded: bool = False
+    markdown_report: Optional[str] = None  # only with include_reports=true
+
+
+class ReportHistoryResponse(BaseModel):
+    sector: str
+    items: List[StoredReportItem]
+    # pass as `before` to fetch the next (older) page; null on the last page
+    next_before: Optional[int] = None
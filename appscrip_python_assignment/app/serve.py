@@ -0,0 +1,99 @@
+"""
+Multi-worker server: `python -m app.serve [--workers N] [--host H] [--port P]`.
+
+Runs uvicorn with one worker process per available CPU (or SERVER_WORKERS /
+--workers). With more than one worker, rate-limit buckets and sessions that
+would be per-process (`memory` backends) are switched to the shared-memory
+tables in SHARED_STATE_DIR, so limits and counters hold across workers
+without Redis. The report history (SQLite, WAL) and the sector index
+(memory-mapped) are already shared through files.
+
+The shared-memory tables need POSIX file locks: on Windows the default is
+one worker, and more workers need the redis backends.
+"""
+import argparse
+import logging
+import os
+from typing import List, Optional
+
+from app.config import settings, shared_state_dir
+from app.core import shared_state
+
+logger = logging.getLogger("app.serve")
+
+
+def available_cpus() -> int:
+    if hasattr(os, "sched_getaffinity"):
+        return len(os.sched_getaffinity(0))  # respects CPU pinning / cgroup cpusets
+    return os.cpu_count() or 1
+
+
+def default_workers() -> int:
+    if settings.server_workers:
+        return settings.server_workers
+    if not shared_state.supported():
+        # nothing to share per-process state through without Redis
+        return 1
+    return available_cpus()
+
+
+def configure_workers(workers: int) -> None:
+    """
+    Point per-process state at shared backends (workers inherit the
+    environment). Exits if a backend would need shm where it can't work.
+    """
+    if workers <= 1:
+        return
+    backends = (
+        ("RATE_LIMIT_BACKEND", settings.rate_limit_backend),
+        ("SESSION_BACKEND", settings.session_backend),
+    )
+    shm = [name for name, backend in backends if backend in ("memory", "shm")]
+    if shm and not shared_state.supported():
+        raise SystemExit(
+            f"{workers} workers need shared rate limits and sessions, and the "
+            "shared-memory backend needs POSIX file locks (not available on this "
+            f"platform): set {' and '.join(f'{name}=redis' for name in shm)} "
+            "(with REDIS_URL), or run a single worker (--workers 1)"
+        )
+    for name, backend in backends:
+        if backend == "memory":
+            os.environ[name] = "shm"
+    os.environ.setdefault("SHARED_STATE_DIR", shared_state_dir())
+    if settings.jobs_backend == "memory":
+        logger.warning(
+            "JOBS_BACKEND=memory keeps async jobs per worker: a job's status is "
+            "only visible to the worker that accepted it (use JOBS_BACKEND=redis)"
+        )
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    import uvicorn
+
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--app", default="app.main:app", help="ASGI app import string")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--workers", type=int, default=default_workers())
+    parser.add_argument("--log-level", default="info")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=args.log_level.upper())
+    configure_workers(args.workers)
+    logger.info(
+        "starting %d worker(s); rate limits: %s, sessions: %s",
+        args.workers,
+        os.environ.get("RATE_LIMIT_BACKEND", settings.rate_limit_backend),
+        os.environ.get("SESSION_BACKEND", settings.session_backend),
+    )
+    uvicorn.run(
+        args.app,
+        host=args.host,
+        port=args.port,
+        workers=args.workers,
+        log_level=args.log_level,
+    )
+
+
+if __name__ == "__main__":
+    main()
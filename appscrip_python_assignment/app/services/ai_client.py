@@ -1,123 +1,191 @@
-from typing import List
-import json
-import re
+from functools import lru_cache
+from typing import AsyncIterator, Collection, Dict, List, Optional, Tuple
 
-import google.generativeai as genai
-
-from app.config import settings
+from app.config import get_settings
+from app.core.metrics import JSON_PARSE_FAILURES, timed
 from app.schemas.analyze import CollectedData, AIAnalysis
-
-# Configure Gemini client using API key from config
-genai.configure(api_key=settings.gemini_api_key)
+from app.services.llm_scheduler import gemini_scheduler, within
+from app.services.prompt_compactor import compact_collected, estimate_tokens, items_tokens, prompt_stats
+from app.utils.text import JsonObjectStream, extract_json_object
 
 DEFAULT_MODEL_NAME = "gemini-2.5-flash"
 
+# top-level keys the model is asked to produce for one sector
+ANALYSIS_KEYS = ("summary", "opportunities", "risks", "time_horizon", "evidence_points")
+
+
+# Static instructions sent as the model's system instruction. Every request
+# shares this exact prefix, so it is built once and the model object reused.
+SYSTEM_INSTRUCTION = "\n".join(
+    [
+        "You are a financial markets analyst focused on Indian sectors.",
+        "You will be given recent web search results (titles, snippets, URLs) for one or more sectors. "
+        "Use them as noisy signals: do NOT quote them verbatim, but synthesize a clean overview.",
+        "",
+        "Your job: produce a structured assessment specifically for *trading opportunities* in each sector in India.",
+        "Please include:",
+        "1. A concise summary of the current situation and trend.",
+        "2. 4–6 concrete trade opportunity ideas (e.g., themes, catalysts, time horizons).",
+        "3. 3–5 key risks or uncertainties that traders should watch for (policy, macro, sector-specific).",
+        "4. A suggested time horizon classification (e.g., 'short-term 3-6 months' or 'medium-term 6-18 months').",
+        "5. 4–6 key evidence points in bullet form (you can loosely reference ideas from the snippets but do not copy sentences).",
+        "",
+        "Respond ONLY with JSON, no surrounding text, no explanation, no markdown fences.",
+        'The JSON object for a sector MUST have exactly these keys: "summary" (string), '
+        '"opportunities" (array of strings), '
+        '"risks" (array of strings), '
+        '"time_horizon" (string), '
+        '"evidence_points" (array of strings).',
+    ]
+)
+
 
-def _build_prompt(collected: CollectedData) -> str:
+@lru_cache(maxsize=1)
+def get_genai():
     """
-    Build a structured prompt for Gemini using collected web data.
+    google.generativeai, imported and configured on first use: it pulls in
+    gRPC, protobuf and google-api-core (most of a worker's import time).
     """
-    lines: List[str] = []
+    import google.generativeai as genai
 
-    lines.append(
-        f"You are a financial markets analyst focused on Indian sectors. Analyze the '{collected.sector}' sector in {collected.country}."
-    )
-    lines.append(
-        "I will provide you a list of recent web search results (titles, snippets, URLs). "
-        "Use them as noisy signals: do NOT quote them verbatim, but synthesize a clean overview."
+    genai.configure(api_key=get_settings().gemini_api_key)
+    return genai
+
+
+@lru_cache(maxsize=1)
+def _get_model():
+    return get_genai().GenerativeModel(
+        DEFAULT_MODEL_NAME, system_instruction=SYSTEM_INSTRUCTION
     )
-    lines.append("")
-    lines.append("Search Results:")
-    for idx, item in enumerate(collected.items, start=1):
+
+
+def preload() -> None:
+    """Import and configure the Gemini client now (call off the event loop)."""
+    _get_model()
+
+
+def _format_search_results(collected: CollectedData) -> List[str]:
+    return [
+        f"{idx}. Title: {item.title}\n   Snippet: {item.snippet}\n   URL: {item.url or 'N/A'}"
+        for idx, item in enumerate(collected.items, start=1)
+    ]
+
+
+def _format_previous_analysis(previous: AIAnalysis) -> List[str]:
+    lines = ["Previous Assessment:", f"Summary: {previous.summary}"]
+    if previous.time_horizon:
+        lines.append(f"Time horizon: {previous.time_horizon}")
+    lines.append("Opportunities:")
+    lines.extend(f"- {point}" for point in previous.opportunities)
+    lines.append("Risks:")
+    lines.extend(f"- {point}" for point in previous.risks)
+    return lines
+
+
+def _build_prompt(
+    collected: CollectedData,
+    compact: bool = True,
+    previous: Optional[AIAnalysis] = None,
+) -> str:
+    """
+    Build the per-request part of the prompt from collected web data
+    (the static instructions live in SYSTEM_INSTRUCTION). With `previous`,
+    `collected` holds only the items that are new since that analysis and
+    the model is asked to update it (delta prompt).
+    """
+    if compact:
+        collected = compact_collected(collected)
+
+    lines: List[str] = []
+
+    if previous is None:
+        lines.append(f"Analyze the '{collected.sector}' sector in {collected.country}.")
+        lines.append("")
+        lines.append("Search Results:")
+    else:
         lines.append(
-            f"{idx}. Title: {item.title}\n   Snippet: {item.snippet}\n   URL: {item.url or 'N/A'}"
+            f"Update the assessment of the '{collected.sector}' sector in {collected.country}: "
+            "the search results below are new since the previous assessment."
         )
+        lines.append("")
+        lines.extend(_format_previous_analysis(previous))
+        lines.append("")
+        lines.append("New Search Results:")
+    lines.extend(_format_search_results(collected))
     lines.append("")
-    lines.append(
-        "Your job: produce a structured assessment specifically for *trading opportunities* in this sector in India."
-    )
-    lines.append("Please include:")
-    lines.append("1. A concise summary of the current situation and trend.")
-    lines.append(
-        "2. 4–6 concrete trade opportunity ideas (e.g., themes, catalysts, time horizons)."
-    )
-    lines.append(
-        "3. 3–5 key risks or uncertainties that traders should watch for (policy, macro, sector-specific)."
-    )
-    lines.append(
-        "4. A suggested time horizon classification (e.g., 'short-term 3-6 months' or 'medium-term 6-18 months')."
-    )
-    lines.append(
-        "5. 4–6 key evidence points in bullet form (you can loosely reference ideas from the snippets but do not copy sentences)."
-    )
+    if previous is None:
+        lines.append("Respond with a single JSON object for this sector.")
+    else:
+        lines.append(
+            "Respond with a single JSON object for this sector: the complete revised assessment, "
+            "keeping what the new results don't change."
+        )
+
+    return "\n".join(lines)
+
+
+def _build_batch_prompt(
+    collected_list: List[CollectedData], compact: bool = True
+) -> str:
+    """
+    Build one prompt covering several sectors; the model answers with one
+    JSON object per sector, keyed by sector name.
+    """
+    if compact:
+        collected_list = [compact_collected(c) for c in collected_list]
+
+    sector_names = ", ".join(f'"{c.sector}"' for c in collected_list)
+    lines: List[str] = []
+
+    lines.append(f"Analyze each of the following sectors independently: {sector_names}.")
     lines.append("")
+    for collected in collected_list:
+        lines.append(f"=== Sector: {collected.sector} ({collected.country}) ===")
+        lines.append("Search Results:")
+        lines.extend(_format_search_results(collected))
+        lines.append("")
     lines.append(
-        "Respond ONLY with a single JSON object, no surrounding text, no explanation, no markdown fences."
-    )
-    lines.append(
-        'The JSON keys MUST be exactly: "summary" (string), '
-        '"opportunities" (array of strings), '
-        '"risks" (array of strings), '
-        '"time_horizon" (string), '
-        '"evidence_points" (array of strings).'
+        f"Respond with a single JSON object whose keys are the sector names exactly as given ({sector_names}) "
+        "and whose values are the JSON objects for those sectors."
     )
 
     return "\n".join(lines)
 
 
-def _extract_json(text: str) -> dict:
+def _compacted(collected: CollectedData) -> Tuple[CollectedData, int]:
     """
-    Try to robustly extract a JSON object from the model output.
-    Handles cases like:
-    - plain JSON
-    - wrapped in ```json ... ```
-    - some text before/after JSON
+    `collected` with prompt-ready items, and the tokens that saved (estimated
+    from the items alone: the rest of the prompt is the same either way).
     """
+    compacted = compact_collected(collected)
+    return compacted, items_tokens(collected.items) - items_tokens(compacted.items)
 
-    text = text.strip()
 
-    # 1. Try plain JSON first
-    try:
-        return json.loads(text)
-    except json.JSONDecodeError:
-        pass
-
-    # 2. Try to extract content inside ```json ... ``` or ``` ... ```
-    fence_match = re.search(r"```json(.*)```", text, re.DOTALL | re.IGNORECASE)
-    if not fence_match:
-        fence_match = re.search(r"```(.*)```", text, re.DOTALL)
-    if fence_match:
-        inner = fence_match.group(1).strip()
-        try:
-            return json.loads(inner)
-        except json.JSONDecodeError:
-            # fall through
-            pass
-
-    # 3. Try to find the first '{' and last '}' and parse that substring
-    start = text.find("{")
-    end = text.rfind("}")
-    if start != -1 and end != -1 and end > start:
-        candidate = text[start : end + 1]
-        try:
-            return json.loads(candidate)
-        except json.JSONDecodeError:
-            pass
+def _record_prompt_size(prompt: str, tokens_saved: int) -> None:
+    estimated = estimate_tokens(SYSTEM_INSTRUCTION) + estimate_tokens(prompt)
+    prompt_stats.record(estimated, estimated + tokens_saved)
+
 
-    # If all attempts fail, raise explicit error
-    raise RuntimeError("Gemini response was not valid JSON")
+def _record_usage(response) -> None:
+    usage = getattr(response, "usage_metadata", None)
+    prompt_stats.record_actual(getattr(usage, "prompt_token_count", None))
 
 
-async def analyze_with_gemini(collected: CollectedData) -> AIAnalysis:
+def _extract_json(text: str, expected_keys: Optional[Collection[str]] = None) -> dict:
     """
-    Call Gemini to analyze the collected data and return structured AIAnalysis.
+    Extract the JSON object from the model output in a single linear pass.
+    Handles plain JSON, ```json fences, prose before/after the object and
+    truncated output (members that completed are kept).
     """
+    try:
+        with timed("gemini.extract_json"):
+            return extract_json_object(text, expected_keys)
+    except ValueError:
+        JSON_PARSE_FAILURES.inc()
+        raise RuntimeError("Gemini response was not valid JSON")
 
-    prompt = _build_prompt(collected)
-
-    model = genai.GenerativeModel(DEFAULT_MODEL_NAME)
-    response = await model.generate_content_async(prompt)
 
+def _response_text(response) -> str:
     if not response or not response.candidates:
         raise RuntimeError("Empty response from Gemini")
 
@@ -126,10 +194,21 @@ async def analyze_with_gemini(collected: CollectedData) -> AIAnalysis:
     for part in response.candidates[0].content.parts:
         if hasattr(part, "text") and part.text:
             texts.append(part.text)
-    full_text = "\n".join(texts).strip()
+    return "\n".join(texts).strip()
+
+
+def _chunk_text(chunk) -> str:
+    # streamed chunks may carry no candidates/parts (e.g. safety metadata only)
+    if not chunk or not chunk.candidates:
+        return ""
+    return "".join(
+        part.text
+        for part in chunk.candidates[0].content.parts
+        if hasattr(part, "text") and part.text
+    )
 
-    data = _extract_json(full_text)
 
+def _to_analysis(data: dict) -> AIAnalysis:
     return AIAnalysis(
         summary=data.get("summary", "").strip(),
         opportunities=data.get("opportunities", []) or [],
@@ -137,3 +216,105 @@ async def analyze_with_gemini(collected: CollectedData) -> AIAnalysis:
         time_horizon=data.get("time_horizon"),
         evidence_points=data.get("evidence_points", []) or [],
     )
+
+
+async def analyze_with_gemini(
+    collected: CollectedData, previous: Optional[AIAnalysis] = None
+) -> AIAnalysis:
+    """
+    Call Gemini to analyze the collected data and return structured AIAnalysis.
+    With `previous`, update that analysis from the (new) items in `collected`.
+    """
+
+    with timed("gemini.prompt"):
+        compacted, saved = _compacted(collected)
+        prompt = _build_prompt(compacted, compact=False, previous=previous)
+        _record_prompt_size(prompt, saved)
+
+    model = _get_model()
+    # concurrency cap, deadline, retries/hedging and circuit breaker
+    with timed("gemini.call"):
+        response = await gemini_scheduler.run(
+            lambda: model.generate_content_async(prompt)
+        )
+    _record_usage(response)
+
+    data = _extract_json(_response_text(response), ANALYSIS_KEYS)
+
+    return _to_analysis(data)
+
+
+async def stream_analysis_with_gemini(
+    collected: CollectedData, previous: Optional[AIAnalysis] = None
+) -> AsyncIterator[Tuple[str, AIAnalysis]]:
+    """
+    Stream a Gemini analysis. Yields (field, analysis_so_far) each time a
+    top-level JSON field of the model output is complete.
+    `previous` as for `analyze_with_gemini`.
+    """
+
+    with timed("gemini.prompt"):
+        compacted, saved = _compacted(collected)
+        prompt = _build_prompt(compacted, compact=False, previous=previous)
+        _record_prompt_size(prompt, saved)
+
+    model = _get_model()
+
+    parser = JsonObjectStream(ANALYSIS_KEYS)
+    data: dict = {}
+    # a started stream can't be retried transparently: cap + breaker only
+    with timed("gemini.stream"):
+        async with gemini_scheduler.guard() as deadline:
+            response = await within(deadline, model.generate_content_async(prompt, stream=True))
+            chunks = response.__aiter__()
+            while True:
+                try:
+                    chunk = await within(deadline, chunks.__anext__())
+                except StopAsyncIteration:
+                    break
+                for key, value in parser.feed(_chunk_text(chunk)):
+                    data[key] = value
+                    yield key, _to_analysis(data)
+
+    if not data:
+        JSON_PARSE_FAILURES.inc()
+        raise RuntimeError("Gemini response was not valid JSON")
+
+
+async def analyze_many_with_gemini(
+    collected_list: List[CollectedData],
+) -> Dict[str, AIAnalysis]:
+    """
+    Analyze several sectors with a single Gemini call.
+    Returns analyses keyed by sector; sectors the model left out (or sent
+    malformed) are missing.
+    """
+
+    with timed("gemini.prompt"):
+        compacted = [_compacted(collected) for collected in collected_list]
+        prompt = _build_batch_prompt([c for c, _ in compacted], compact=False)
+        _record_prompt_size(prompt, sum(saved for _, saved in compacted))
+
+    model = _get_model()
+    # concurrency cap, deadline, retries/hedging and circuit breaker
+    with timed("gemini.call_batch"):
+        response = await gemini_scheduler.run(
+            lambda: model.generate_content_async(prompt)
+        )
+    _record_usage(response)
+
+    data = _extract_json(
+        _response_text(response), [c.sector for c in collected_list]
+    )
+
+    results: Dict[str, AIAnalysis] = {}
+    for collected in collected_list:
+        sector_data = data.get(collected.sector)
+        if not isinstance(sector_data, dict):
+            continue
+        try:
+            results[collected.sector] = _to_analysis(sector_data)
+        except (AttributeError, TypeError, ValueError):
+            # one malformed sector fails on its own, not the whole pack
+            JSON_PARSE_FAILURES.inc()
+    return results
@@ -0,0 +1,163 @@
+import asyncio
+import math
+from functools import partial
+from typing import AsyncIterator, Dict, List, Optional, Tuple
+
+from app.config import settings
+from app.core.cache import CacheEntry, report_cache
+from app.schemas.analyze import AIAnalysis, BatchAnalyzeItem, CollectedData
+from app.services.ai_client import analyze_many_with_gemini
+from app.services.collector import collect_sector_info
+from app.services.incremental import FULL, REUSED, RefreshPlan
+from app.services.llm_scheduler import CircuitOpenError
+from app.services.pipeline import (
+    collector_only_analysis,
+    plan_analysis,
+    publish_report,
+    run_analysis_pipeline,
+)
+
+COUNTRY = "India"
+
+
+async def _ok(sector: str, entry: CacheEntry) -> BatchAnalyzeItem:
+    try:
+        report = await publish_report(entry)
+    except Exception as exc:
+        return _error(sector, f"Failed to store report: {exc}")
+    return BatchAnalyzeItem(sector=sector, status="ok", markdown_report=report.markdown)
+
+
+def _error(sector: str, detail: str) -> BatchAnalyzeItem:
+    return BatchAnalyzeItem(sector=sector, status="error", detail=detail)
+
+
+def _cached(sectors: List[str]) -> Dict[str, Optional[CacheEntry]]:
+    return {s: report_cache.peek(s, COUNTRY) for s in sectors}
+
+
+def batch_cost(sectors: List[str], pack_prompts: bool) -> int:
+    """
+    Rate-limit cost of a batch = number of Gemini calls it will make.
+    Sectors already in the report cache are free.
+    """
+    misses = sum(1 for entry in _cached(sectors).values() if entry is None)
+    if pack_prompts:
+        return math.ceil(misses / settings.batch_pack_size)
+    return misses
+
+
+async def _run_single(sector: str, sem: asyncio.Semaphore) -> List[BatchAnalyzeItem]:
+    async with sem:
+        try:
+            entry = await report_cache.get_or_load(
+                sector, COUNTRY, partial(run_analysis_pipeline, sector, country=COUNTRY)
+            )
+            return [await _ok(sector, entry)]
+        except Exception as exc:
+            return [_error(sector, f"Failed to generate analysis: {exc}")]
+
+
+async def _analyze_pack(
+    sectors: List[str], sem: asyncio.Semaphore
+) -> Dict[str, Tuple[CollectedData, AIAnalysis]]:
+    """Collect each sector concurrently, then analyze them all in one prompt."""
+
+    async def _collect(sector: str) -> CollectedData:
+        async with sem:
+            return await collect_sector_info(sector, country=COUNTRY)
+
+    collected_list = await asyncio.gather(*(_collect(s) for s in sectors))
+    plans = await asyncio.gather(*(plan_analysis(c) for c in collected_list))
+    # sectors that barely changed keep their last analysis; the rest are
+    # packed into one prompt in full (delta prompts aren't packed)
+    analyses = {
+        c.sector: plan.finish(plan.baseline.analysis)
+        for c, plan in zip(collected_list, plans)
+        if plan.mode == REUSED
+    }
+    to_analyze = [c for c in collected_list if c.sector not in analyses]
+    if to_analyze:
+        try:
+            fresh = await analyze_many_with_gemini(to_analyze)
+        except CircuitOpenError:
+            # as for a single sector: collector-only until Gemini is back
+            analyses.update((c.sector, collector_only_analysis(c)) for c in to_analyze)
+        else:
+            for sector, analysis in fresh.items():
+                analyses[sector] = RefreshPlan(FULL).finish(analysis)
+    return {
+        c.sector: (c, analyses[c.sector]) for c in collected_list if c.sector in analyses
+    }
+
+
+async def _from_pack(
+    pack: "asyncio.Future[Dict[str, Tuple[CollectedData, AIAnalysis]]]", sector: str
+) -> Tuple[CollectedData, AIAnalysis]:
+    results = await pack
+    if sector not in results:
+        raise RuntimeError("Sector missing from Gemini response")
+    return results[sector]
+
+
+async def _run_packed(
+    sectors: List[str], sem: asyncio.Semaphore
+) -> List[BatchAnalyzeItem]:
+    """
+    Analyze `sectors` in one Gemini call. Each sector's share of the pack is
+    registered as its in-flight load in the report cache, so a concurrent
+    `/analyze/{sector}` joins it; sectors already loading are joined instead.
+    """
+    loads = {s: report_cache.join(s, COUNTRY) for s in sectors}
+    own = [s for s, task in loads.items() if task is None]
+    if own:
+        pack = asyncio.ensure_future(_analyze_pack(own, sem))
+        for sector in own:
+            loads[sector] = report_cache.start(sector, COUNTRY, partial(_from_pack, pack, sector))
+
+    items: List[BatchAnalyzeItem] = []
+    for sector, task in loads.items():
+        try:
+            # shield: the load is shared with other callers
+            entry = await asyncio.shield(task)
+        except Exception as exc:
+            items.append(_error(sector, f"Failed to generate analysis: {exc}"))
+            continue
+        items.append(await _ok(sector, entry))
+    return items
+
+
+async def run_batch(
+    sectors: List[str], pack_prompts: bool = False
+) -> AsyncIterator[BatchAnalyzeItem]:
+    """
+    Analyze many sectors, yielding each result as soon as it is ready.
+    Collection runs under a bounded semaphore; with `pack_prompts`, uncached
+    sectors are analyzed `batch_pack_size` at a time in a single Gemini call.
+    """
+    sem = asyncio.Semaphore(settings.batch_concurrency)
+
+    if pack_prompts:
+        # one lookup: entries seen here are used as is, even if they expire
+        # or are evicted while the packs run
+        cached = _cached(sectors)
+        pending = [sector for sector, entry in cached.items() if entry is None]
+        for sector, entry in cached.items():
+            if entry is not None:
+                yield await _ok(sector, entry)
+        size = settings.batch_pack_size
+        tasks = [
+            asyncio.ensure_future(_run_packed(pending[i : i + size], sem))
+            for i in range(0, len(pending), size)
+        ]
+    else:
+        tasks = [asyncio.ensure_future(_run_single(s, sem)) for s in sectors]
+
+    try:
+        for next_done in asyncio.as_completed(tasks):
+            for item in await next_done:
+                yield item
+    finally:
+        # client went away mid-stream: stop remaining work
+        for task in tasks:
+            task.cancel()
@@ -1,31 +1,95 @@
+import asyncio
+import hashlib
+import html as html_lib
+import re
 import urllib.parse
-from typing import List
-
-import httpx
-from bs4 import BeautifulSoup
+import xml.etree.ElementTree as ET
+from functools import lru_cache
+from io import BytesIO
+from typing import Dict, List, Optional, Sequence, Tuple
 
 from app.schemas.analyze import CollectedData, MarketItem
 from app.config import settings
+from app.core.http_client import get_http_client, host_slot
+from app.core.metrics import COLLECTOR_FALLBACKS, timed
 
 SEARCH_URL = "https://duckduckgo.com/html"
+GOOGLE_NEWS_RSS_URL = "https://news.google.com/rss/search"
+
+_HEADERS = {
+    "User-Agent": "trade-opportunities-bot/1.0 (+https://example.com)",
+    "Accept-Language": "en-IN,en;q=0.9",
+}
+
+_TAG_RE = re.compile(r"<[^>]+>")
+_SPACE_RE = re.compile(r"\s+")
+
+
+@lru_cache(maxsize=1)
+def _lxml():
+    """
+    lxml.etree plus the precompiled equivalents of the CSS selectors
+    "a.result__a" / ".result__snippet"; imported on the first parse.
+    """
+    from lxml import etree
+
+    title_xpath = etree.XPath(
+        ".//a[contains(concat(' ', normalize-space(@class), ' '), ' result__a ')]"
+    )
+    snippet_xpath = etree.XPath(
+        ".//*[contains(concat(' ', normalize-space(@class), ' '), ' result__snippet ')]"
+    )
+    return etree, title_xpath, snippet_xpath
+
+
+def preload() -> None:
+    """Import the HTML parser now (call off the event loop)."""
+    _lxml()
+
+
+async def _fetch_text(url: str) -> str | None:
+    client = get_http_client()
+    async with host_slot(url):
+        resp = await client.get(url, headers=_HEADERS)
+    if resp.status_code != 200:
+        return None
+    return resp.text
 
 
 async def _fetch_duckduckgo_html(query: str) -> str | None:
     params = {"q": query}
     url = f"{SEARCH_URL}?{urllib.parse.urlencode(params)}"
-    headers = {
-        "User-Agent": "trade-opportunities-bot/1.0 (+https://example.com)",
-        "Accept-Language": "en-IN,en;q=0.9",
-    }
+    return await _fetch_text(url)
+
 
-    async with httpx.AsyncClient(timeout=10.0) as client:
-        resp = await client.get(url, headers=headers)
-        if resp.status_code != 200:
-            return None
-        return resp.text
+def _clean_result_url(href: str | None) -> str | None:
+    """
+    Turn a DuckDuckGo result href into the target URL.
+    Result links look like //duckduckgo.com/l/?uddg=<encoded target>&rut=...
+    """
+    if not href:
+        return None
+    if href.startswith("//"):
+        href = "https:" + href
+    parts = urllib.parse.urlsplit(href)
+    if parts.path.startswith("/l/"):
+        target = urllib.parse.parse_qs(parts.query).get("uddg")
+        if target:
+            href = target[0]
+            parts = urllib.parse.urlsplit(href)
+    if parts.scheme not in ("http", "https") or not parts.netloc:
+        return None
+    return href
 
 
 def _parse_duckduckgo_html(html: str, max_items: int = 8) -> List[MarketItem]:
+    """
+    Reference BeautifulSoup parser (builds the full tree).
+    The request path uses `_extract_duckduckgo_results`; this is kept as the
+    behavioural baseline it is checked against in benchmarks/.
+    """
+    from bs4 import BeautifulSoup  # reference parser only; slow to import
+
     soup = BeautifulSoup(html, "lxml")
     items: List[MarketItem] = []
 
@@ -37,7 +101,7 @@ def _parse_duckduckgo_html(html: str, max_items: int = 8) -> List[MarketItem]:
             continue
 
         title = title_tag.get_text(strip=True)
-        href = title_tag.get("href")
+        href = _clean_result_url(title_tag.get("href"))
         snippet = snippet_tag.get_text(strip=True) if snippet_tag else ""
 
         items.append(
@@ -45,36 +109,229 @@ def _parse_duckduckgo_html(html: str, max_items: int = 8) -> List[MarketItem]:
                 title=title,
                 url=href,
                 snippet=snippet,
+                source="duckduckgo",
             )
         )
 
     return items
 
 
-async def collect_sector_info(sector: str, country: str = "India") -> CollectedData:
+def _element_text(el) -> str:
+    # same result as BeautifulSoup's get_text(strip=True)
+    return "".join(part.strip() for part in el.itertext() if part.strip())
+
+
+def _extract_duckduckgo_results(html: str, max_items: int = 8) -> List[MarketItem]:
     """
-    Fetch current-ish web information for the given sector.
-    Uses DuckDuckGo HTML search and parses top results.
+    Streaming extractor for DuckDuckGo result pages.
+    Feeds the page to lxml's incremental HTML parser and stops as soon as
+    `max_items` result bodies have been seen, instead of building the whole
+    tree. Produces the same items as `_parse_duckduckgo_html`.
+    CPU-bound: call it through `asyncio.to_thread` from async code.
     """
+    etree, title_xpath, snippet_xpath = _lxml()
+    items: List[MarketItem] = []
+    seen = 0
 
-    query = f"{sector} sector stock market news {country}"
-    html = await _fetch_duckduckgo_html(query)
-    if html:
-        items = _parse_duckduckgo_html(html)
-        if items:
-            return CollectedData(
-                sector=sector,
-                country=country,
-                source="duckduckgo",
-                items=items,
+    events = etree.iterparse(
+        BytesIO(html.encode("utf-8")),
+        events=("end",),
+        tag="div",
+        html=True,
+        recover=True,
+        encoding="utf-8",
+    )
+    for _event, result in events:
+        if "result__body" not in (result.get("class") or "").split():
+            continue
+        seen += 1
+
+        title_tags = title_xpath(result)
+        if title_tags:
+            title_tag = title_tags[0]
+            snippet_tags = snippet_xpath(result)
+            items.append(
+                MarketItem(
+                    title=_element_text(title_tag),
+                    url=_clean_result_url(title_tag.get("href")),
+                    snippet=_element_text(snippet_tags[0]) if snippet_tags else "",
+                    source="duckduckgo",
+                )
             )
 
+        result.clear()
+        if seen >= max_items:
+            break
+
+    return items
+
+
+def _parse_google_news_rss(xml_text: str, max_items: int = 8) -> List[MarketItem]:
+    try:
+        root = ET.fromstring(xml_text)
+    except ET.ParseError:
+        return []
+
+    items: List[MarketItem] = []
+    for node in root.iter("item"):
+        title = (node.findtext("title") or "").strip()
+        if not title:
+            continue
+        link = _clean_result_url((node.findtext("link") or "").strip())
+        # description is an escaped HTML fragment (headline + publisher)
+        description = html_lib.unescape(node.findtext("description") or "")
+        snippet = _SPACE_RE.sub(" ", _TAG_RE.sub(" ", description)).strip()
+        publisher = (node.findtext("source") or "").strip()
+        if publisher and publisher not in snippet:
+            snippet = f"{snippet} ({publisher})" if snippet else publisher
+
+        items.append(
+            MarketItem(title=title, url=link, snippet=snippet, source="google_news")
+        )
+        if len(items) >= max_items:
+            break
+
+    return items
+
+
+class SourceAdapter:
+    """
+    A single upstream the collector can fan out to.
+    Subclasses implement `fetch` and return parsed items (best first).
+    """
+
+    name: str = ""
+
+    async def fetch(self, sector: str, country: str) -> List[MarketItem]:
+        raise NotImplementedError
+
+
+class DuckDuckGoSource(SourceAdapter):
+    name = "duckduckgo"
+
+    def __init__(self, query_template: str):
+        self.query_template = query_template
+
+    async def fetch(self, sector: str, country: str) -> List[MarketItem]:
+        query = self.query_template.format(sector=sector, country=country)
+        with timed("collect.fetch.duckduckgo"):
+            html = await _fetch_duckduckgo_html(query)
+        if not html:
+            return []
+        # parse off the event loop so other requests keep being served
+        with timed("collect.parse.duckduckgo"):
+            return await asyncio.to_thread(_extract_duckduckgo_results, html)
+
+
+class GoogleNewsRssSource(SourceAdapter):
+    name = "google_news"
+
+    def __init__(self, query_template: str = "{sector} sector {country}"):
+        self.query_template = query_template
+
+    async def fetch(self, sector: str, country: str) -> List[MarketItem]:
+        params = {
+            "q": self.query_template.format(sector=sector, country=country),
+            "hl": "en-IN",
+            "gl": "IN",
+            "ceid": "IN:en",
+        }
+        with timed("collect.fetch.google_news"):
+            xml_text = await _fetch_text(
+                f"{GOOGLE_NEWS_RSS_URL}?{urllib.parse.urlencode(params)}"
+            )
+        if not xml_text:
+            return []
+        with timed("collect.parse.google_news"):
+            return await asyncio.to_thread(_parse_google_news_rss, xml_text)
+
+
+def default_sources() -> List[SourceAdapter]:
+    sources: List[SourceAdapter] = [
+        DuckDuckGoSource("{sector} sector stock market news {country}"),
+        DuckDuckGoSource("{sector} news {country}"),
+        DuckDuckGoSource("{sector} NSE stocks"),
+    ]
+    if settings.collector_rss_enabled:
+        sources.append(GoogleNewsRssSource())
+    return sources
+
+
+async def _gather_within_deadline(
+    sources: Sequence[SourceAdapter], sector: str, country: str, deadline: float
+) -> List[List[MarketItem]]:
+    """
+    Run all sources concurrently and keep whatever finished before the deadline.
+    Failed or late sources simply contribute nothing.
+    """
+    tasks = [asyncio.ensure_future(src.fetch(sector, country)) for src in sources]
+    done, pending = await asyncio.wait(tasks, timeout=deadline)
+    for task in pending:
+        task.cancel()
+    if pending:
+        # let late sources unwind (close responses, release pool slots)
+        await asyncio.gather(*pending, return_exceptions=True)
+
+    results: List[List[MarketItem]] = []
+    for task in tasks:
+        if task in done and not task.cancelled() and task.exception() is None:
+            results.append(task.result())
+    return results
+
+
+def _dedupe_key(item: MarketItem) -> str:
+    if item.url:
+        parts = urllib.parse.urlsplit(str(item.url))
+        host = parts.netloc.lower().removeprefix("www.")
+        return f"{host}{parts.path.rstrip('/')}"
+    return _SPACE_RE.sub(" ", item.title.lower()).strip()
+
+
+def item_fingerprint(item: MarketItem) -> str:
+    """
+    Identity of an item across collections: its URL (or title) plus the
+    snippet text, so an article whose snippet changed counts as new.
+    """
+    snippet = _SPACE_RE.sub(" ", item.snippet.lower()).strip()
+    key = f"{_dedupe_key(item)}\n{snippet}".encode("utf-8")
+    return hashlib.blake2b(key, digest_size=8).hexdigest()
+
+
+def _merge_and_rank(
+    result_lists: Sequence[List[MarketItem]], max_items: int
+) -> List[MarketItem]:
+    """
+    Merge per-source result lists, dedupe by URL (or title), and rank by
+    reciprocal rank summed across sources; items several sources agree on
+    float to the top.
+    """
+    scores: Dict[str, float] = {}
+    best: Dict[str, MarketItem] = {}
+    first_seen: Dict[str, Tuple[int, int]] = {}
+
+    for list_idx, items in enumerate(result_lists):
+        for rank, item in enumerate(items):
+            key = _dedupe_key(item)
+            scores[key] = scores.get(key, 0.0) + 1.0 / (rank + 1)
+            current = best.get(key)
+            if current is None:
+                best[key] = item
+                first_seen[key] = (rank, list_idx)
+            elif len(item.snippet) > len(current.snippet):
+                best[key] = item
+
+    ordered = sorted(scores, key=lambda k: (-scores[k], first_seen[k]))
+    return [best[key] for key in ordered[:max_items]]
+
+
+def _fallback_data(sector: str, country: str) -> CollectedData:
     # Fallback data to keep API functional even if search fails.
     fallback_items = [
         MarketItem(
             title=f"{sector.title()} sector overview in {country}",
             url=None,
             snippet=f"Fallback generated summary. Could not fetch live data, but this indicates the {sector} sector is important in {country}.",
+            source="fallback",
         )
     ]
     return CollectedData(
@@ -83,3 +340,35 @@ async def collect_sector_info(sector: str, country: str = "India") -> CollectedD
         source="fallback",
         items=fallback_items,
     )
+
+
+async def collect_sector_info(
+    sector: str,
+    country: str = "India",
+    sources: Optional[Sequence[SourceAdapter]] = None,
+) -> CollectedData:
+    """
+    Fetch current-ish web information for the given sector.
+    Fans out to several query variants / sources under one deadline, then
+    merges, dedupes and ranks whatever came back in time.
+    """
+
+    if sources is None:
+        sources = default_sources()
+
+    with timed("collect.total"):
+        result_lists = await _gather_within_deadline(
+            sources, sector, country, settings.collector_deadline_seconds
+        )
+        items = _merge_and_rank(result_lists, settings.collector_max_items)
+    if not items:
+        COLLECTOR_FALLBACKS.inc()
+        return _fallback_data(sector, country)
+
+    names = {item.source for item in items}
+    return CollectedData(
+        sector=sector,
+        country=country,
+        source=names.pop() if len(names) == 1 else "mixed",
+        items=items,
+    )
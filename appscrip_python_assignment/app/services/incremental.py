@@ -0,0 +1,100 @@
+import time
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Tuple
+
+from app.config import settings
+from app.core.metrics import ANALYSIS_REFRESHES
+from app.schemas.analyze import AIAnalysis, CollectedData, MarketItem
+from app.services.collector import item_fingerprint
+
+FULL = "full"
+DELTA = "delta"
+REUSED = "reused"
+
+
+@dataclass
+class Baseline:
+    """The last stored (non-degraded) analysis of a sector and what it was built from."""
+
+    collected: CollectedData
+    analysis: AIAnalysis
+    generated_at: float  # unix timestamp of the stored report
+
+    @property
+    def full_analysis_at(self) -> float:
+        # a full analysis is its own base; delta / reused ones carry theirs
+        return self.analysis.full_analysis_at or self.generated_at
+
+
+@dataclass
+class RefreshPlan:
+    mode: str  # full | delta | reused
+    baseline: Optional[Baseline] = None
+    # collected items not in the baseline (what a delta prompt sends)
+    new_items: List[MarketItem] = field(default_factory=list)
+    # collected items Gemini doesn't get to see again
+    items_skipped: int = 0
+
+    def prompt_input(self, collected: CollectedData) -> Tuple[CollectedData, Optional[AIAnalysis]]:
+        """What to send Gemini: all items, or only the new ones plus the previous analysis."""
+        if self.mode == DELTA:
+            return collected.model_copy(update={"items": self.new_items}), self.baseline.analysis
+        return collected, None
+
+    def finish(self, analysis: AIAnalysis) -> AIAnalysis:
+        """Stamp the analysis a refresh produced with how it was produced."""
+        ANALYSIS_REFRESHES.inc(self.mode)
+        refresh_stats.record(self)
+        if self.mode == FULL or analysis.degraded:
+            return analysis
+        return analysis.model_copy(
+            update={"refresh": self.mode, "full_analysis_at": self.baseline.full_analysis_at}
+        )
+
+
+def plan_refresh(
+    collected: CollectedData, baseline: Optional[Baseline], now: Optional[float] = None
+) -> RefreshPlan:
+    """
+    Decide how to analyze freshly collected data given the last analysis:
+    - `reused`: at most `incremental_reuse_threshold` of the items are new
+    - `delta`: at most `incremental_delta_threshold` are new; Gemini gets
+      only those plus the previous analysis
+    - `full`: anything else, no usable baseline, or the full analysis the
+      baseline builds on is older than `incremental_max_age_seconds`
+    """
+    if (
+        baseline is None
+        or not collected.items
+        or (now or time.time()) - baseline.full_analysis_at > settings.incremental_max_age_seconds
+    ):
+        return RefreshPlan(FULL)
+
+    seen = {item_fingerprint(item) for item in baseline.collected.items}
+    new_items = [item for item in collected.items if item_fingerprint(item) not in seen]
+    changed = len(new_items) / len(collected.items)
+    if changed <= settings.incremental_reuse_threshold:
+        return RefreshPlan(REUSED, baseline, items_skipped=len(collected.items))
+    if changed <= settings.incremental_delta_threshold:
+        return RefreshPlan(
+            DELTA, baseline, new_items, items_skipped=len(collected.items) - len(new_items)
+        )
+    return RefreshPlan(FULL, baseline, new_items)
+
+
+class RefreshStats:
+    """How pipeline analyses were produced, and how many items prompts skipped."""
+
+    def __init__(self) -> None:
+        self.modes: Dict[str, int] = {FULL: 0, DELTA: 0, REUSED: 0}
+        self.items_skipped = 0
+
+    def record(self, plan: RefreshPlan) -> None:
+        self.modes[plan.mode] += 1
+        self.items_skipped += plan.items_skipped
+
+    def stats(self) -> Dict[str, Any]:
+        return {**self.modes, "items_skipped": self.items_skipped}
+
+
+refresh_stats = RefreshStats()
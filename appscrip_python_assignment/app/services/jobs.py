@@ -0,0 +1,417 @@
+import asyncio
+import json
+import os
+import socket
+import time
+import uuid
+from dataclasses import asdict, dataclass
+from functools import partial
+from typing import Any, Dict, List, Optional
+
+from app.config import settings
+from app.core.cache import report_cache
+from app.services.pipeline import publish_report, run_analysis_pipeline
+
+COUNTRY = "India"
+
+
+class QueueFullError(RuntimeError):
+    """Raised by `submit` when the job queue has no room (maps to 429)."""
+
+
+@dataclass
+class JobRecord:
+    id: str
+    sector: str
+    country: str
+    status: str  # queued | running | done | failed
+    created_at: float
+    username: Optional[str] = None  # who submitted it; only they can read it
+    started_at: Optional[float] = None
+    finished_at: Optional[float] = None
+    report_id: Optional[int] = None
+    markdown: Optional[str] = None
+    error: Optional[str] = None
+
+    @property
+    def dedupe_key(self) -> str:
+        # per user: a job is only visible to its submitter; the pipeline run
+        # itself is still shared through the report cache
+        return f"{self.username or ''}|{report_cache.make_key(self.sector, self.country)}"
+
+    @property
+    def finished(self) -> bool:
+        return self.status in ("done", "failed")
+
+
+def new_job(sector: str, country: str = COUNTRY, username: Optional[str] = None) -> JobRecord:
+    return JobRecord(
+        id=uuid.uuid4().hex,
+        sector=sector,
+        country=country,
+        status="queued",
+        created_at=time.time(),
+        username=username,
+    )
+
+
+class JobQueueBackend:
+    """
+    Job storage + queue. API processes call `submit`/`get`; workers (in the
+    API process or a separate `python -m app.worker`) call `next_job`/`save`.
+    """
+
+    async def submit(self, job: JobRecord) -> JobRecord:
+        """
+        Enqueue `job`, or return the already pending job for the same sector.
+        Raises QueueFullError when the queue is at capacity.
+        """
+        raise NotImplementedError
+
+    async def get(self, job_id: str) -> Optional[JobRecord]:
+        raise NotImplementedError
+
+    async def next_job(self) -> Optional[JobRecord]:
+        """Wait for the next queued job (None if nothing arrived in a while)."""
+        raise NotImplementedError
+
+    async def save(self, job: JobRecord) -> None:
+        """Persist a status change; finished jobs stop deduplicating."""
+        raise NotImplementedError
+
+    async def close(self) -> None:
+        """Workers stopped: hand back jobs taken but not finished."""
+
+    async def stats(self) -> Dict[str, Any]:
+        return {}
+
+
+class InMemoryJobBackend(JobQueueBackend):
+    """
+    Process-local queue: workers must run in the API process.
+    Finished jobs are kept for `result_ttl_seconds`, then swept.
+    """
+
+    def __init__(self, max_queue: int, result_ttl_seconds: float):
+        self.max_queue = max_queue
+        self.result_ttl_seconds = result_ttl_seconds
+        self._queue: asyncio.Queue = asyncio.Queue(maxsize=max_queue)
+        self._jobs: Dict[str, JobRecord] = {}
+        # dedupe key -> id of the queued/running job for it
+        self._pending: Dict[str, str] = {}
+        self._last_sweep = time.time()
+
+    def _sweep(self, now: float) -> None:
+        if now - self._last_sweep < 60:
+            return
+        self._last_sweep = now
+        expired = [
+            job_id
+            for job_id, job in self._jobs.items()
+            if job.finished and now - job.finished_at > self.result_ttl_seconds
+        ]
+        for job_id in expired:
+            del self._jobs[job_id]
+
+    async def submit(self, job: JobRecord) -> JobRecord:
+        self._sweep(job.created_at)
+        existing = self._pending.get(job.dedupe_key)
+        if existing is not None:
+            return self._jobs[existing]
+        try:
+            self._queue.put_nowait(job.id)
+        except asyncio.QueueFull:
+            raise QueueFullError("Job queue is full") from None
+        self._jobs[job.id] = job
+        self._pending[job.dedupe_key] = job.id
+        return job
+
+    async def get(self, job_id: str) -> Optional[JobRecord]:
+        return self._jobs.get(job_id)
+
+    async def next_job(self) -> Optional[JobRecord]:
+        job_id = await self._queue.get()
+        return self._jobs.get(job_id)
+
+    async def save(self, job: JobRecord) -> None:
+        self._jobs[job.id] = job
+        if job.finished and self._pending.get(job.dedupe_key) == job.id:
+            del self._pending[job.dedupe_key]
+
+    async def stats(self) -> Dict[str, Any]:
+        return {
+            "backend": "memory",
+            "queued": self._queue.qsize(),
+            "max_queue": self.max_queue,
+            "pending": len(self._pending),
+            "jobs": len(self._jobs),
+        }
+
+
+# Dedupe + capacity check + enqueue in one step.
+# KEYS: queue list, pending key, job key. ARGV: job id, max queue, ttl, job json.
+# Returns {1, id} when queued, {0, existing id} when deduplicated, {-1, ""} when full.
+_SUBMIT_LUA = """
+local existing = redis.call('GET', KEYS[2])
+if existing then
+  return {0, existing}
+end
+if redis.call('LLEN', KEYS[1]) >= tonumber(ARGV[2]) then
+  return {-1, ''}
+end
+redis.call('SET', KEYS[3], ARGV[4], 'EX', ARGV[3])
+redis.call('SET', KEYS[2], ARGV[1], 'EX', ARGV[3])
+redis.call('LPUSH', KEYS[1], ARGV[1])
+return {1, ARGV[1]}
+"""
+
+
+# Requeue the jobs taken by consumers whose heartbeat key has expired, at
+# the front of the queue (oldest first), and forget those consumers.
+# KEYS: consumers set, queue list. ARGV: key prefix.
+# Returns the number of jobs requeued.
+_REAP_LUA = """
+local requeued = 0
+for _, consumer in ipairs(redis.call('SMEMBERS', KEYS[1])) do
+  if redis.call('EXISTS', ARGV[1] .. 'alive:' .. consumer) == 0 then
+    local processing = ARGV[1] .. 'processing:' .. consumer
+    while redis.call('LMOVE', processing, KEYS[2], 'LEFT', 'RIGHT') do
+      requeued = requeued + 1
+    end
+    redis.call('SREM', KEYS[1], consumer)
+  end
+end
+return requeued
+"""
+
+
+class RedisJobBackend(JobQueueBackend):
+    """
+    Queue shared through Redis, so workers can run in their own processes
+    (`python -m app.worker`) and scale separately from the API.
+    Requires the `redis` package.
+
+    A job is moved atomically from the queue to this consumer's processing
+    list (BLMOVE) and only leaves it once finished. While the consumer lives
+    it refreshes a heartbeat key every `lease_seconds / 3`; any consumer
+    finding another's heartbeat expired puts that one's unfinished jobs back
+    at the front of the queue, so a crashed worker delays its jobs by about
+    `lease_seconds` instead of losing them (their dedupe keys stay valid).
+    `client`: an existing redis.asyncio client to use instead of `url`.
+    """
+
+    def __init__(
+        self,
+        url: str,
+        max_queue: int,
+        result_ttl_seconds: float,
+        lease_seconds: int = 30,
+        key_prefix: str = "jobs:",
+        poll_seconds: int = 5,
+        client=None,
+    ):
+        if client is None:
+            import redis.asyncio as redis_asyncio  # optional dependency
+
+            client = redis_asyncio.from_url(url)
+        self._client = client
+        self._submit = self._client.register_script(_SUBMIT_LUA)
+        self._reap = self._client.register_script(_REAP_LUA)
+        self.max_queue = max_queue
+        self.result_ttl_seconds = int(result_ttl_seconds)
+        self.lease_seconds = lease_seconds
+        self.key_prefix = key_prefix
+        self.poll_seconds = poll_seconds
+
+        self.consumer = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self._heartbeat: Optional[asyncio.Task] = None
+        self._last_reap = 0.0
+        self.requeued = 0
+
+    def _key(self, *parts: str) -> str:
+        return self.key_prefix + ":".join(parts)
+
+    async def submit(self, job: JobRecord) -> JobRecord:
+        code, job_id = await self._submit(
+            keys=[
+                self._key("queue"),
+                self._key("pending", job.dedupe_key),
+                self._key("job", job.id),
+            ],
+            args=[job.id, self.max_queue, self.result_ttl_seconds, json.dumps(asdict(job))],
+        )
+        if int(code) == -1:
+            raise QueueFullError("Job queue is full")
+        if int(code) == 0:
+            existing = await self.get(job_id.decode() if isinstance(job_id, bytes) else job_id)
+            if existing is not None:
+                return existing
+        return job
+
+    async def get(self, job_id: str) -> Optional[JobRecord]:
+        raw = await self._client.get(self._key("job", job_id))
+        return JobRecord(**json.loads(raw)) if raw else None
+
+    async def _beat(self) -> None:
+        while True:
+            try:
+                await self._client.set(self._key("alive", self.consumer), 1, ex=self.lease_seconds)
+            except Exception:
+                pass  # Redis reconnecting; the next beat may still be in time
+            await asyncio.sleep(self.lease_seconds / 3)
+
+    async def _register(self) -> None:
+        if self._heartbeat is None:
+            await self._client.set(self._key("alive", self.consumer), 1, ex=self.lease_seconds)
+            await self._client.sadd(self._key("consumers"), self.consumer)
+            self._heartbeat = asyncio.ensure_future(self._beat())
+
+    async def reap(self) -> int:
+        """Requeue the jobs of consumers that stopped heartbeating; returns how many."""
+        requeued = int(
+            await self._reap(keys=[self._key("consumers"), self._key("queue")], args=[self.key_prefix])
+        )
+        self.requeued += requeued
+        return requeued
+
+    async def next_job(self) -> Optional[JobRecord]:
+        await self._register()
+        now = time.monotonic()
+        if now - self._last_reap > self.lease_seconds:
+            self._last_reap = now
+            await self.reap()
+
+        job_id = await self._client.blmove(
+            self._key("queue"),
+            self._key("processing", self.consumer),
+            self.poll_seconds,
+            src="RIGHT",
+            dest="LEFT",
+        )
+        if job_id is None:
+            return None
+        job_id = job_id.decode() if isinstance(job_id, bytes) else job_id
+        job = await self.get(job_id)
+        if job is None:
+            # expired while queued (with its dedupe key): nothing left to run
+            await self._client.lrem(self._key("processing", self.consumer), 0, job_id)
+        return job
+
+    async def save(self, job: JobRecord) -> None:
+        async with self._client.pipeline(transaction=True) as pipe:
+            pipe.set(
+                self._key("job", job.id),
+                json.dumps(asdict(job)),
+                ex=self.result_ttl_seconds,
+            )
+            if job.finished:
+                pipe.delete(self._key("pending", job.dedupe_key))
+                pipe.lrem(self._key("processing", self.consumer), 0, job.id)
+            await pipe.execute()
+
+    async def close(self) -> None:
+        if self._heartbeat is None:
+            return
+        self._heartbeat.cancel()
+        self._heartbeat = None
+        # presume ourselves dead: unfinished jobs go back to the queue now
+        await self._client.delete(self._key("alive", self.consumer))
+        await self.reap()
+
+    async def stats(self) -> Dict[str, Any]:
+        return {
+            "backend": "redis",
+            "queued": await self._client.llen(self._key("queue")),
+            "max_queue": self.max_queue,
+            "processing": await self._client.llen(self._key("processing", self.consumer)),
+            "consumers": await self._client.scard(self._key("consumers")),
+            "requeued": self.requeued,
+        }
+
+
+class JobRunner:
+    """Pool of worker tasks that take jobs from a backend and run the pipeline."""
+
+    def __init__(self, backend: JobQueueBackend, workers: int):
+        self.backend = backend
+        self.workers = workers
+        self._tasks: List[asyncio.Task] = []
+        self.running = 0
+        self.completed = 0
+        self.failed = 0
+
+    async def _run(self, job: JobRecord) -> None:
+        job.status = "running"
+        job.started_at = time.time()
+        await self.backend.save(job)
+        self.running += 1
+        try:
+            entry = await report_cache.get_or_load(
+                job.sector,
+                job.country,
+                partial(run_analysis_pipeline, job.sector, country=job.country),
+            )
+            report = await publish_report(entry)
+        except Exception as exc:
+            job.status = "failed"
+            job.error = f"Failed to generate analysis: {exc}"
+            self.failed += 1
+        else:
+            job.status = "done"
+            job.report_id = report.id
+            job.markdown = report.markdown
+            self.completed += 1
+        finally:
+            self.running -= 1
+        job.finished_at = time.time()
+        await self.backend.save(job)
+
+    async def _work(self) -> None:
+        while True:
+            try:
+                job = await self.backend.next_job()
+                if job is not None:
+                    await self._run(job)
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                # backend hiccup (e.g. Redis reconnecting); don't lose the worker
+                await asyncio.sleep(1)
+
+    def start(self) -> None:
+        if not self._tasks:
+            self._tasks = [asyncio.ensure_future(self._work()) for _ in range(self.workers)]
+
+    async def stop(self) -> None:
+        tasks, self._tasks = self._tasks, []
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        await self.backend.close()
+
+    async def stats(self) -> Dict[str, Any]:
+        return {
+            **await self.backend.stats(),
+            "workers": len(self._tasks),
+            "running": self.running,
+            "completed": self.completed,
+            "failed": self.failed,
+        }
+
+
+def _build_backend() -> JobQueueBackend:
+    if settings.jobs_backend == "redis":
+        return RedisJobBackend(
+            settings.redis_url,
+            max_queue=settings.jobs_max_queue,
+            result_ttl_seconds=settings.jobs_result_ttl_seconds,
+            lease_seconds=settings.jobs_lease_seconds,
+        )
+    return InMemoryJobBackend(
+        max_queue=settings.jobs_max_queue,
+        result_ttl_seconds=settings.jobs_result_ttl_seconds,
+    )
+
+
+job_backend: JobQueueBackend = _build_backend()
+job_runner = JobRunner(job_backend, workers=settings.jobs_workers)
@@ -0,0 +1,293 @@
+import asyncio
+import random
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+from functools import lru_cache
+from typing import Any, AsyncIterator, Awaitable, Callable, Deque, Dict, Optional, TypeVar
+
+from app.config import settings
+
+T = TypeVar("T")
+
+
+@lru_cache(maxsize=1)
+def retryable_errors() -> tuple:
+    """
+    429 / 5xx from the Gemini API, plus our own per-attempt deadline.
+    A function so google-api-core is only imported once a call has failed
+    (`except` evaluates it lazily).
+    """
+    from google.api_core import exceptions as google_exceptions
+
+    return (
+        google_exceptions.TooManyRequests,
+        google_exceptions.ServerError,
+        asyncio.TimeoutError,
+    )
+
+
+class CircuitOpenError(RuntimeError):
+    """Raised instead of calling the model while the circuit breaker is open."""
+
+
+class DeadlineExceeded(asyncio.TimeoutError):
+    """
+    The request's overall deadline passed: waiting for a slot, or an attempt
+    cut short by it. Our own budget, so never counted against the upstream.
+    """
+
+
+async def within(deadline: float, awaitable: Awaitable[T]) -> T:
+    """
+    Await `awaitable`, raising DeadlineExceeded (not a plain, retryable
+    TimeoutError) if `deadline` (a `time.monotonic()` value) passes first.
+    """
+    try:
+        return await asyncio.wait_for(awaitable, timeout=max(0.0, deadline - time.monotonic()))
+    except asyncio.TimeoutError:
+        raise DeadlineExceeded("Gemini request deadline exceeded") from None
+
+
+class LLMScheduler:
+    """
+    Front door for model calls:
+    - global concurrency cap and per-attempt deadline
+    - one overall deadline per request (`request_deadline_seconds`) covering
+      the wait for a slot, every attempt and the backoff sleeps
+    - retries on 429/5xx/timeouts with jittered exponential backoff, as long
+      as the request deadline allows
+    - optional hedging: a second attempt starts if the first is slower than
+      the recent p95 latency; whichever finishes first wins
+    - circuit breaker: after `breaker_failure_threshold` consecutive upstream
+      failures, calls fail fast with CircuitOpenError for `breaker_reset_seconds`,
+      then a single trial call decides whether to close it again
+    """
+
+    def __init__(
+        self,
+        max_concurrency: int,
+        timeout_seconds: float,
+        max_retries: int,
+        backoff_base_seconds: float,
+        backoff_max_seconds: float,
+        hedge_enabled: bool,
+        breaker_failure_threshold: int,
+        breaker_reset_seconds: float,
+        request_deadline_seconds: float,
+        hedge_min_samples: int = 20,
+    ):
+        self._slots = asyncio.Semaphore(max_concurrency)
+        self.max_concurrency = max_concurrency
+        self.timeout_seconds = timeout_seconds
+        self.max_retries = max_retries
+        self.backoff_base_seconds = backoff_base_seconds
+        self.backoff_max_seconds = backoff_max_seconds
+        self.hedge_enabled = hedge_enabled
+        self.hedge_min_samples = hedge_min_samples
+        self.breaker_failure_threshold = breaker_failure_threshold
+        self.breaker_reset_seconds = breaker_reset_seconds
+        self.request_deadline_seconds = request_deadline_seconds
+
+        self._latencies: Deque[float] = deque(maxlen=200)
+        self._consecutive_failures = 0
+        self._opened_at: Optional[float] = None
+        self._trial_in_flight = False
+
+        self.calls = 0
+        self.retries = 0
+        self.hedged = 0
+        self.failures = 0
+        self.rejected = 0
+        self.deadline_exceeded = 0
+
+    # -- circuit breaker ---------------------------------------------------
+
+    @property
+    def state(self) -> str:
+        if self._opened_at is None:
+            return "closed"
+        if time.monotonic() - self._opened_at < self.breaker_reset_seconds:
+            return "open"
+        return "half_open"
+
+    def _before_call(self) -> bool:
+        """Fail fast while open; True if this call is the half-open trial."""
+        state = self.state
+        if state == "open" or (state == "half_open" and self._trial_in_flight):
+            self.rejected += 1
+            raise CircuitOpenError("Gemini temporarily unavailable (circuit open)")
+        if state == "half_open":
+            self._trial_in_flight = True
+            return True
+        return False
+
+    def _abandon(self, trial: bool) -> None:
+        """
+        The call ended without saying anything about the upstream (bad
+        request, cancellation, our own deadline): release a half-open trial
+        it held, without judging.
+        """
+        if trial:
+            self._trial_in_flight = False
+
+    def _record_success(self) -> None:
+        self._consecutive_failures = 0
+        self._opened_at = None
+        self._trial_in_flight = False
+
+    def _record_failure(self) -> None:
+        self.failures += 1
+        self._consecutive_failures += 1
+        self._trial_in_flight = False
+        if (
+            self._opened_at is not None
+            or self._consecutive_failures >= self.breaker_failure_threshold
+        ):
+            self._opened_at = time.monotonic()
+
+    # -- attempts ----------------------------------------------------------
+
+    def _backoff(self, attempt: int) -> float:
+        # "full jitter": uniform in [0, capped exponential]
+        cap = min(self.backoff_max_seconds, self.backoff_base_seconds * 2 ** (attempt - 1))
+        return random.uniform(0, cap)
+
+    def _hedge_delay(self) -> Optional[float]:
+        if not self.hedge_enabled or len(self._latencies) < self.hedge_min_samples:
+            return None
+        ordered = sorted(self._latencies)
+        return ordered[int(len(ordered) * 0.95) - 1]
+
+    @asynccontextmanager
+    async def _slot(self, deadline: float) -> AsyncIterator[None]:
+        await within(deadline, self._slots.acquire())
+        try:
+            yield
+        finally:
+            self._slots.release()
+
+    async def _attempt(self, call: Callable[[], Awaitable[T]], deadline: float) -> T:
+        async with self._slot(deadline):
+            start = time.monotonic()
+            if start + self.timeout_seconds < deadline:
+                # an attempt timing out is a slow upstream: retryable
+                result = await asyncio.wait_for(call(), timeout=self.timeout_seconds)
+            else:
+                # cut short by our own deadline: says nothing about the upstream
+                result = await within(deadline, call())
+            self._latencies.append(time.monotonic() - start)
+            return result
+
+    async def _hedged_attempt(self, call: Callable[[], Awaitable[T]], deadline: float) -> T:
+        delay = self._hedge_delay()
+        if delay is None:
+            return await self._attempt(call, deadline)
+
+        first = asyncio.ensure_future(self._attempt(call, deadline))
+        tasks = {first}
+        try:
+            done, _ = await asyncio.wait(tasks, timeout=delay)
+            if not done:
+                self.hedged += 1
+                tasks.add(asyncio.ensure_future(self._attempt(call, deadline)))
+
+            error: Optional[BaseException] = None
+            while tasks:
+                done, tasks = await asyncio.wait(
+                    tasks, return_when=asyncio.FIRST_COMPLETED
+                )
+                for task in done:
+                    if task.exception() is None:
+                        return task.result()
+                    error = task.exception()
+            raise error
+        finally:
+            for task in tasks:
+                task.cancel()
+
+    async def run(self, call: Callable[[], Awaitable[T]]) -> T:
+        """
+        Run `call` (a zero-arg coroutine factory; it may be invoked several
+        times) under the scheduler's limits. Raises DeadlineExceeded if the
+        request deadline passes waiting for a slot or during the last attempt.
+        """
+        deadline = time.monotonic() + self.request_deadline_seconds
+        trial = self._before_call()
+        self.calls += 1
+        attempt = 0
+        while True:
+            try:
+                result = await self._hedged_attempt(call, deadline)
+            except DeadlineExceeded:
+                self.deadline_exceeded += 1
+                self._abandon(trial)
+                raise
+            except retryable_errors():
+                backoff = self._backoff(attempt + 1)
+                if attempt >= self.max_retries or time.monotonic() + backoff >= deadline:
+                    self._record_failure()
+                    raise
+                attempt += 1
+                self.retries += 1
+                await asyncio.sleep(backoff)
+            except BaseException:
+                self._abandon(trial)
+                raise
+            else:
+                self._record_success()
+                return result
+
+    @asynccontextmanager
+    async def guard(self) -> AsyncIterator[float]:
+        """
+        Concurrency cap + circuit breaker for calls that can't be retried
+        transparently (streaming responses). Yields the request deadline (a
+        `time.monotonic()` value): the block bounds its own awaits with
+        `within(deadline, ...)`.
+        """
+        deadline = time.monotonic() + self.request_deadline_seconds
+        trial = self._before_call()
+        self.calls += 1
+        try:
+            async with self._slot(deadline):
+                yield deadline
+        except DeadlineExceeded:
+            self.deadline_exceeded += 1
+            self._abandon(trial)
+            raise
+        except retryable_errors():
+            self._record_failure()
+            raise
+        except BaseException:
+            self._abandon(trial)
+            raise
+        else:
+            self._record_success()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "state": self.state,
+            "max_concurrency": self.max_concurrency,
+            "calls": self.calls,
+            "retries": self.retries,
+            "hedged": self.hedged,
+            "failures": self.failures,
+            "rejected": self.rejected,
+            "deadline_exceeded": self.deadline_exceeded,
+            "consecutive_failures": self._consecutive_failures,
+            "hedge_delay_seconds": self._hedge_delay(),
+        }
+
+
+gemini_scheduler = LLMScheduler(
+    max_concurrency=settings.llm_max_concurrency,
+    timeout_seconds=settings.llm_timeout_seconds,
+    max_retries=settings.llm_max_retries,
+    backoff_base_seconds=settings.llm_backoff_base_seconds,
+    backoff_max_seconds=settings.llm_backoff_max_seconds,
+    hedge_enabled=settings.llm_hedge_enabled,
+    breaker_failure_threshold=settings.llm_breaker_failure_threshold,
+    breaker_reset_seconds=settings.llm_breaker_reset_seconds,
+    request_deadline_seconds=settings.llm_request_deadline_seconds,
+)
@@ -0,0 +1,196 @@
+import asyncio
+import json
+from datetime import datetime, timezone
+from typing import AsyncIterator, List, Optional, Tuple
+
+from app.config import settings
+from app.core.cache import CacheEntry
+from app.core.report_store import StoredReport, report_store
+from app.schemas.analyze import AIAnalysis, CollectedData
+from app.services.ai_client import analyze_with_gemini, stream_analysis_with_gemini
+from app.services.collector import collect_sector_info
+from app.services.incremental import FULL, REUSED, Baseline, RefreshPlan, plan_refresh
+from app.services.llm_scheduler import CircuitOpenError
+from app.services.report_builder import (
+    ANALYSIS_SECTIONS,
+    build_markdown_report,
+    render_header,
+    render_sources,
+)
+
+# a rendered report section: (name, markdown lines)
+Section = Tuple[str, List[str]]
+
+
+def collector_only_analysis(collected: CollectedData) -> AIAnalysis:
+    """
+    Minimal analysis used while Gemini is unavailable: surfaces the collected
+    headlines so the report is still useful.
+    """
+    return AIAnalysis(
+        summary=(
+            f"AI analysis for the {collected.sector} sector is temporarily unavailable. "
+            "The points below are the latest collected headlines; please retry later for a full assessment."
+        ),
+        evidence_points=[item.title for item in collected.items[:6]],
+        degraded=True,
+    )
+
+
+async def run_analysis_pipeline(
+    sector: str, country: str = "India"
+) -> Tuple[CollectedData, AIAnalysis]:
+    """
+    Collect web data for a sector and analyze it with Gemini (in full, as a
+    delta over the last stored analysis, or not at all if little changed).
+    Degrades to a collector-only analysis while Gemini's circuit is open.
+    """
+    collected = await collect_sector_info(sector, country=country)
+    plan = await plan_analysis(collected)
+    if plan.mode == REUSED:
+        return collected, plan.finish(plan.baseline.analysis)
+    try:
+        analysis = plan.finish(await analyze_with_gemini(*plan.prompt_input(collected)))
+    except CircuitOpenError:
+        analysis = collector_only_analysis(collected)
+    return collected, analysis
+
+
+class SectionFeed:
+    """
+    Report sections of one streamed pipeline run, published as they are
+    ready. Any number of followers get the sections sent so far, then the
+    rest live, so one run (one Gemini stream) serves every streaming client.
+    """
+
+    def __init__(self):
+        self.sections: List[Section] = []
+        self.closed = False
+        self._changed = asyncio.Event()
+
+    def publish(self, name: str, lines: List[str]) -> None:
+        self.sections.append((name, lines))
+        self._wake()
+
+    def close(self) -> None:
+        self.closed = True
+        self._wake()
+
+    def _wake(self) -> None:
+        self._changed.set()
+        self._changed = asyncio.Event()
+
+    async def follow(self) -> AsyncIterator[Section]:
+        sent = 0
+        while True:
+            while sent < len(self.sections):
+                yield self.sections[sent]
+                sent += 1
+            if self.closed:
+                return
+            await self._changed.wait()
+
+
+async def stream_analysis_pipeline(
+    sector: str, country: str, feed: SectionFeed
+) -> Tuple[CollectedData, AIAnalysis]:
+    """
+    `run_analysis_pipeline`, publishing each report section to `feed` as
+    soon as it is ready: header and sources after collection, analysis
+    sections while Gemini streams them.
+    """
+    try:
+        collected = await collect_sector_info(sector, country=country)
+        feed.publish("header", render_header(collected))
+        feed.publish("sources", render_sources(collected))
+
+        plan = await plan_analysis(collected)
+        analysis = None
+        streamed = False
+        try:
+            if plan.mode == REUSED:
+                # little changed since the last analysis: no Gemini call
+                analysis = plan.finish(plan.baseline.analysis)
+            else:
+                async for field, analysis in stream_analysis_with_gemini(
+                    *plan.prompt_input(collected)
+                ):
+                    if field in ANALYSIS_SECTIONS:
+                        feed.publish(field, ANALYSIS_SECTIONS[field](analysis))
+                streamed = True
+                if analysis is not None:
+                    analysis = plan.finish(analysis)
+        except CircuitOpenError:
+            # Gemini known to be down: a collector-only analysis
+            analysis = collector_only_analysis(collected)
+        if analysis is None:
+            raise RuntimeError("Empty response from Gemini")
+        if not streamed:
+            for field, render in ANALYSIS_SECTIONS.items():
+                feed.publish(field, render(analysis))
+        return collected, analysis
+    finally:
+        feed.close()
+
+
+async def load_baseline(sector: str, country: str) -> Optional[Baseline]:
+    """The last stored good analysis of a sector, if its report kept the sources."""
+    report = await report_store.latest(sector, country)
+    if report is None or report.degraded:
+        return None
+    sources = report_sources(report)
+    if sources is None:
+        return None
+    return Baseline(*sources, generated_at=report.generated_at)
+
+
+async def plan_analysis(collected: CollectedData) -> RefreshPlan:
+    """How to analyze `collected`: compare it with the last stored analysis."""
+    if not settings.incremental_enabled:
+        return RefreshPlan(FULL)
+    baseline = await load_baseline(collected.sector, collected.country)
+    return plan_refresh(collected, baseline)
+
+
+def _payload(entry: CacheEntry) -> str:
+    return json.dumps(
+        {
+            "collected": entry.collected.model_dump(mode="json"),
+            "analysis": entry.analysis.model_dump(mode="json"),
+        }
+    )
+
+
+def report_sources(report: StoredReport) -> Optional[Tuple[CollectedData, AIAnalysis]]:
+    """The collected data and analysis a stored report was rendered from."""
+    if not report.payload:
+        return None
+    payload = json.loads(report.payload)
+    return (
+        CollectedData.model_validate(payload["collected"]),
+        AIAnalysis.model_validate(payload["analysis"]),
+    )
+
+
+async def publish_report(entry: CacheEntry) -> StoredReport:
+    """
+    Render a cached pipeline result and record it in the report store.
+    The report is stamped with the entry's creation time, so every render
+    of the same entry has the same text (and ETag); it is rendered once and
+    kept on the entry.
+    """
+    if entry.report is not None:
+        return entry.report
+    generated_at = datetime.fromtimestamp(entry.created_at, tz=timezone.utc)
+    markdown = build_markdown_report(
+        entry.collected, entry.analysis, generated_at=generated_at
+    )
+    entry.report = await report_store.save(
+        entry.collected.sector,
+        entry.collected.country,
+        generated_at=entry.created_at,
+        markdown=markdown,
+        degraded=entry.degraded,
+        payload=_payload(entry),
+    )
+    return entry.report
@@ -0,0 +1,143 @@
+import asyncio
+import random
+from functools import partial
+from typing import Any, Dict, List, Optional
+
+from app.config import settings
+from app.core.cache import report_cache
+from app.core.rate_limiter import InMemoryBackend
+from app.core.session import hot_sectors
+from app.services.llm_scheduler import gemini_scheduler
+from app.services.pipeline import publish_report, run_analysis_pipeline
+
+COUNTRY = "India"
+
+
+class Prewarmer:
+    """
+    Background loop that refreshes the most requested sectors shortly before
+    their cached analysis expires, so those requests stay cache reads.
+
+    - runs every `interval_seconds` (± `jitter`), refreshes sectors among the
+      top `top_k` whose entry is missing or expires within `lead_seconds`
+      (lead also jittered, so refreshes of sectors cached together spread out)
+    - spends at most `max_calls_per_minute` Gemini calls (token bucket) and
+      pauses while the Gemini circuit breaker is not closed
+    """
+
+    def __init__(
+        self,
+        top_k: int,
+        min_requests: float,
+        interval_seconds: float,
+        lead_seconds: float,
+        jitter: float,
+        max_calls_per_minute: int,
+    ):
+        self.top_k = top_k
+        self.min_requests = min_requests
+        self.interval_seconds = interval_seconds
+        self.lead_seconds = lead_seconds
+        self.jitter = jitter
+        self.max_calls_per_minute = max_calls_per_minute
+        self._budget = InMemoryBackend(sweep_interval_seconds=3600, idle_seconds=3600)
+        self._task: Optional[asyncio.Task] = None
+        self._refreshing: Dict[str, asyncio.Task] = {}
+
+        self.runs = 0
+        self.refreshed = 0
+        self.errors = 0
+        self.skipped_budget = 0
+        self.skipped_breaker = 0
+
+    def _jittered(self, seconds: float) -> float:
+        return seconds * random.uniform(1 - self.jitter, 1 + self.jitter)
+
+    def due_sectors(self) -> List[str]:
+        due = []
+        for sector in hot_sectors(self.top_k, self.min_requests):
+            if sector in self._refreshing:
+                continue
+            remaining = report_cache.expires_in(sector, COUNTRY)
+            if remaining is None or remaining < self._jittered(self.lead_seconds):
+                due.append(sector)
+        return due
+
+    async def run_once(self) -> int:
+        """One scheduling pass; returns the number of refreshes started."""
+        self.runs += 1
+        if gemini_scheduler.state != "closed":
+            self.skipped_breaker += 1
+            return 0
+
+        started = 0
+        due = self.due_sectors()
+        for idx, sector in enumerate(due):
+            result = await self._budget.consume(
+                "prewarm",
+                1,
+                capacity=float(self.max_calls_per_minute),
+                refill_per_second=self.max_calls_per_minute / 60,
+            )
+            if not result.allowed:
+                self.skipped_budget += len(due) - idx
+                break
+            task = asyncio.ensure_future(self._refresh(sector))
+            self._refreshing[sector] = task
+            task.add_done_callback(lambda _t, s=sector: self._refreshing.pop(s, None))
+            started += 1
+        return started
+
+    async def _refresh(self, sector: str) -> None:
+        try:
+            entry = await report_cache.refresh(
+                sector, COUNTRY, partial(run_analysis_pipeline, sector, country=COUNTRY)
+            )
+            await publish_report(entry)
+            self.refreshed += 1
+        except Exception:
+            # the previous entry keeps being served; try again next pass
+            self.errors += 1
+
+    async def _loop(self) -> None:
+        while True:
+            await asyncio.sleep(self._jittered(self.interval_seconds))
+            try:
+                await self.run_once()
+            except Exception:
+                self.errors += 1
+
+    def start(self) -> None:
+        if self._task is None or self._task.done():
+            self._task = asyncio.ensure_future(self._loop())
+
+    async def stop(self) -> None:
+        tasks = list(self._refreshing.values())
+        if self._task is not None:
+            tasks.append(self._task)
+            self._task = None
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "running": self._task is not None and not self._task.done(),
+            "runs": self.runs,
+            "refreshed": self.refreshed,
+            "refreshing": len(self._refreshing),
+            "errors": self.errors,
+            "skipped_budget": self.skipped_budget,
+            "skipped_breaker": self.skipped_breaker,
+            "hot_sectors": hot_sectors(self.top_k, self.min_requests),
+        }
+
+
+prewarmer = Prewarmer(
+    top_k=settings.prewarm_top_k,
+    min_requests=settings.prewarm_min_requests,
+    interval_seconds=settings.prewarm_interval_seconds,
+    lead_seconds=settings.prewarm_lead_seconds,
+    jitter=settings.prewarm_jitter,
+    max_calls_per_minute=settings.prewarm_max_calls_per_minute,
+)
@@ -0,0 +1,158 @@
+import math
+import re
+import zlib
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from app.config import settings
+from app.core.metrics import PROMPT_TOKENS
+from app.schemas.analyze import CollectedData, MarketItem
+
+_WORD_RE = re.compile(r"[a-z0-9]+")
+
+_STOPWORDS = frozenset(
+    "a an and are as at be by for from has have in is it its of on or that the "
+    "this to was were will with india indian sector news stock stocks market".split()
+)
+
+# MinHash: NUM_PERM universal hashes h(x) = (a*x + b) mod p over crc32 shingles
+_NUM_PERM = 32
+_MERSENNE_PRIME = (1 << 61) - 1
+_PERMUTATIONS: Tuple[Tuple[int, int], ...] = tuple(
+    (
+        zlib.crc32(f"a{i}".encode()) * 2654435761 % _MERSENNE_PRIME | 1,
+        zlib.crc32(f"b{i}".encode()) * 40503 % _MERSENNE_PRIME,
+    )
+    for i in range(_NUM_PERM)
+)
+
+
+def estimate_tokens(text: str) -> int:
+    """
+    Cheap local token estimate (no tokenizer dependency): ~4 chars per token
+    for English prose, never less than the word count.
+    """
+    return max(math.ceil(len(text) / 4), len(text.split()))
+
+
+def items_tokens(items: Sequence[MarketItem]) -> int:
+    """Token estimate of items as a prompt lists them (title, snippet, URL)."""
+    return sum(estimate_tokens(f"{item.title} {item.snippet} {item.url or ''}") for item in items)
+
+
+def _words(text: str) -> List[str]:
+    return _WORD_RE.findall(text.lower())
+
+
+def _minhash(words: Sequence[str], shingle_size: int = 3) -> Optional[Tuple[int, ...]]:
+    if not words:
+        return None
+    shingles = {
+        zlib.crc32(" ".join(words[i : i + shingle_size]).encode())
+        for i in range(max(1, len(words) - shingle_size + 1))
+    }
+    return tuple(
+        min((a * s + b) % _MERSENNE_PRIME for s in shingles) for a, b in _PERMUTATIONS
+    )
+
+
+def _similarity(sig_a: Tuple[int, ...], sig_b: Tuple[int, ...]) -> float:
+    # fraction of equal MinHash slots estimates Jaccard similarity of shingles
+    return sum(1 for x, y in zip(sig_a, sig_b) if x == y) / _NUM_PERM
+
+
+def _is_low_information(words: Sequence[str]) -> bool:
+    informative = {w for w in words if w not in _STOPWORDS and not w.isdigit()}
+    return len(informative) < settings.prompt_min_item_words
+
+
+def _truncate(text: str, max_chars: int) -> str:
+    if len(text) <= max_chars:
+        return text
+    cut = text[:max_chars].rsplit(" ", 1)[0]
+    return cut.rstrip(" ,;:.") + "…"
+
+
+def compact_items(items: Sequence[MarketItem]) -> List[MarketItem]:
+    """
+    Shrink a ranked item list before it goes into a prompt:
+    1. drop items with too little information
+    2. drop near-duplicates (MinHash over word 3-gram shingles)
+    3. truncate snippets and stop once the token budget is spent
+    The first item always survives so the prompt is never empty.
+    """
+    kept: List[MarketItem] = []
+    signatures: List[Tuple[int, ...]] = []
+    budget = settings.prompt_token_budget
+
+    for item in items:
+        words = _words(f"{item.title} {item.snippet}")
+        if kept and _is_low_information(words):
+            continue
+
+        signature = _minhash(words)
+        if signature is not None:
+            if any(
+                _similarity(signature, seen) >= settings.prompt_dedupe_threshold
+                for seen in signatures
+            ):
+                continue
+            signatures.append(signature)
+
+        compacted = item.model_copy(
+            update={"snippet": _truncate(item.snippet, settings.prompt_max_snippet_chars)}
+        )
+        cost = items_tokens([compacted])
+        if kept and cost > budget:
+            break
+        budget -= cost
+        kept.append(compacted)
+
+    return kept
+
+
+def compact_collected(collected: CollectedData) -> CollectedData:
+    """Copy of `collected` with prompt-ready items (the report keeps the originals)."""
+    return collected.model_copy(update={"items": compact_items(collected.items)})
+
+
+class PromptStats:
+    """
+    Running prompt-size counters (estimated and, when reported, actual
+    tokens). The per-prompt distribution goes to PROMPT_TOKENS in /metrics.
+    """
+
+    def __init__(self) -> None:
+        self.prompts = 0
+        self.estimated_tokens_total = 0
+        self.estimated_tokens_saved = 0
+        self.actual_prompt_tokens_total = 0
+        self.last_estimated_tokens = 0
+        self.last_actual_tokens: Optional[int] = None
+
+    def record(self, estimated: int, uncompacted_estimate: int) -> None:
+        self.prompts += 1
+        self.estimated_tokens_total += estimated
+        self.estimated_tokens_saved += max(0, uncompacted_estimate - estimated)
+        self.last_estimated_tokens = estimated
+        PROMPT_TOKENS.observe(estimated, "estimated")
+
+    def record_actual(self, prompt_tokens: Optional[int]) -> None:
+        if prompt_tokens:
+            self.actual_prompt_tokens_total += prompt_tokens
+            self.last_actual_tokens = prompt_tokens
+            PROMPT_TOKENS.observe(prompt_tokens, "actual")
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "prompts": self.prompts,
+            "avg_estimated_tokens": (
+                self.estimated_tokens_total / self.prompts if self.prompts else 0.0
+            ),
+            "estimated_tokens_saved": self.estimated_tokens_saved,
+            "actual_prompt_tokens_total": self.actual_prompt_tokens_total,
+            "last_estimated_tokens": self.last_estimated_tokens,
+            "last_actual_tokens": self.last_actual_tokens,
+        }
+
+
+prompt_stats = PromptStats()
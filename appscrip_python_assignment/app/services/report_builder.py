@@ -1,70 +1,83 @@
 from datetime import datetime
+from functools import lru_cache
+from html import escape
+from typing import Callable, Dict, List, Optional
 
-from app.schemas.analyze import CollectedData, AIAnalysis
+from app.core.metrics import timed
+from app.schemas.analyze import CollectedData, AIAnalysis, MarketItem, ReportDocument
 
+TITLE = "Trade Opportunities Report — {sector} (India)"
+FOOTER_TEXT = "This report was generated automatically by the Trade Opportunities API using web search and Gemini."
 
-def build_markdown_report(collected: CollectedData, analysis: AIAnalysis) -> str:
-    """
-    Format the AIAnalysis into a structured markdown report.
-    """
 
-    sector_title = collected.sector.title()
-    timestamp = datetime.utcnow().strftime("%Y-%m-%d %H:%M UTC")
+def render_header(
+    collected: CollectedData, generated_at: Optional[datetime] = None
+) -> List[str]:
+    return [
+        "# " + TITLE.format(sector=collected.sector.title()),
+        "",
+        f"_Generated at: {report_timestamp(generated_at)}_",
+        "",
+    ]
 
-    lines: list[str] = []
-
-    # Title
-    lines.append(f"# Trade Opportunities Report — {sector_title} (India)")
-    lines.append("")
-    lines.append(f"_Generated at: {timestamp}_")
-    lines.append("")
 
+def render_summary(analysis: AIAnalysis) -> List[str]:
     # Executive summary
-    lines.append("## 1. Executive Summary")
-    lines.append("")
-    lines.append(analysis.summary or "No summary available.")
-    lines.append("")
+    return [
+        "## 1. Executive Summary",
+        "",
+        analysis.summary or "No summary available.",
+        "",
+    ]
 
-    # Time horizon
-    if analysis.time_horizon:
-        lines.append("### Suggested Time Horizon")
-        lines.append("")
-        lines.append(f"- {analysis.time_horizon}")
-        lines.append("")
 
-    # Opportunities
-    lines.append("## 2. Key Trade Opportunities")
-    lines.append("")
+def render_time_horizon(analysis: AIAnalysis) -> List[str]:
+    if not analysis.time_horizon:
+        return []
+    return [
+        "### Suggested Time Horizon",
+        "",
+        f"- {analysis.time_horizon}",
+        "",
+    ]
+
+
+def render_opportunities(analysis: AIAnalysis) -> List[str]:
+    lines = ["## 2. Key Trade Opportunities", ""]
     if analysis.opportunities:
         for idx, opp in enumerate(analysis.opportunities, start=1):
             lines.append(f"{idx}. {opp}")
     else:
         lines.append("- No specific opportunities identified.")
     lines.append("")
+    return lines
 
-    # Risks
-    lines.append("## 3. Key Risks & Watchpoints")
-    lines.append("")
+
+def render_risks(analysis: AIAnalysis) -> List[str]:
+    lines = ["## 3. Key Risks & Watchpoints", ""]
     if analysis.risks:
         for idx, risk in enumerate(analysis.risks, start=1):
             lines.append(f"{idx}. {risk}")
     else:
         lines.append("- No major risks identified.")
     lines.append("")
+    return lines
 
-    # Evidence
-    lines.append("## 4. Evidence & Supporting Signals")
-    lines.append("")
+
+def render_evidence(analysis: AIAnalysis) -> List[str]:
+    lines = ["## 4. Evidence & Supporting Signals", ""]
     if analysis.evidence_points:
         for point in analysis.evidence_points:
             lines.append(f"- {point}")
     else:
         lines.append("- Evidence not available from current data.")
     lines.append("")
+    return lines
+
 
+def render_sources(collected: CollectedData) -> List[str]:
     # Raw sources section
-    lines.append("## 5. Source Snippets (from web search)")
-    lines.append("")
+    lines = ["## 5. Source Snippets (from web search)", ""]
     for item in collected.items:
         lines.append(f"### {item.title}")
         if item.url:
@@ -72,10 +85,199 @@ def build_markdown_report(collected: CollectedData, analysis: AIAnalysis) -> str
         if item.snippet:
             lines.append(f"- Note: {item.snippet}")
         lines.append("")
+    return lines
+
+
+def render_footer() -> List[str]:
+    return [
+        "---",
+        f"_{FOOTER_TEXT}_",
+    ]
+
+
+# AIAnalysis field -> renderer for that part of the report (used when streaming)
+ANALYSIS_SECTIONS: Dict[str, Callable[[AIAnalysis], List[str]]] = {
+    "summary": render_summary,
+    "time_horizon": render_time_horizon,
+    "opportunities": render_opportunities,
+    "risks": render_risks,
+    "evidence_points": render_evidence,
+}
+
+
+# -- single-pass renderers -------------------------------------------------
+#
+# The render_* functions above return line lists (the streaming endpoint
+# sends them section by section). Whole reports are written in one pass
+# instead: static blocks are precomputed strings, each section is one
+# f-string or comprehension, everything is joined once, and the timestamp is
+# formatted once per generation time.
+
+_MD_SUMMARY = "## 1. Executive Summary\n\n"
+_MD_HORIZON = "### Suggested Time Horizon\n\n- "
+_MD_OPPORTUNITIES = "## 2. Key Trade Opportunities\n\n"
+_MD_NO_OPPORTUNITIES = "- No specific opportunities identified.\n"
+_MD_RISKS = "## 3. Key Risks & Watchpoints\n\n"
+_MD_NO_RISKS = "- No major risks identified.\n"
+_MD_EVIDENCE = "## 4. Evidence & Supporting Signals\n\n"
+_MD_NO_EVIDENCE = "- Evidence not available from current data.\n"
+_MD_SOURCES = "## 5. Source Snippets (from web search)\n\n"
+_MD_FOOTER = "---\n_" + FOOTER_TEXT + "_"
 
-    lines.append("---")
-    lines.append(
-        "_This report was generated automatically by the Trade Opportunities API using web search and Gemini._"
-    )
 
-    return "\n".join(lines)
+@lru_cache(maxsize=256)
+def _format_timestamp(generated_at: datetime) -> str:
+    # isoformat is ~2x faster than strftime; drop seconds and any UTC offset
+    return generated_at.isoformat(" ", "minutes")[:16] + " UTC"
+
+
+def report_timestamp(generated_at: Optional[datetime] = None) -> str:
+    """`YYYY-MM-DD HH:MM UTC`, cached per generation time."""
+    return _format_timestamp(generated_at or datetime.utcnow())
+
+
+def _md_numbered(values: List[str]) -> str:
+    return "".join([f"{idx}. {value}\n" for idx, value in enumerate(values, start=1)])
+
+
+def _md_source(item: MarketItem) -> str:
+    # HttpUrl truthiness goes through pydantic's __len__; compare to None instead
+    url = f"- URL: {item.url}\n" if item.url is not None else ""
+    note = f"- Note: {item.snippet}\n" if item.snippet else ""
+    return f"### {item.title}\n{url}{note}\n"
+
+
+def build_markdown_report(
+    collected: CollectedData,
+    analysis: AIAnalysis,
+    generated_at: Optional[datetime] = None,
+) -> str:
+    """
+    Format the AIAnalysis into a structured markdown report.
+    Pass `generated_at` (UTC) to get the same text for the same analysis.
+    """
+
+    with timed("render.markdown"):
+        horizon = (
+            f"{_MD_HORIZON}{analysis.time_horizon}\n\n" if analysis.time_horizon else ""
+        )
+        evidence = (
+            "".join([f"- {point}\n" for point in analysis.evidence_points])
+            if analysis.evidence_points
+            else _MD_NO_EVIDENCE
+        )
+        return "".join(
+            [
+                "# ",
+                TITLE.format(sector=collected.sector.title()),
+                "\n\n_Generated at: ",
+                report_timestamp(generated_at),
+                "_\n\n",
+                _MD_SUMMARY,
+                analysis.summary or "No summary available.",
+                "\n\n",
+                horizon,
+                _MD_OPPORTUNITIES,
+                _md_numbered(analysis.opportunities) if analysis.opportunities else _MD_NO_OPPORTUNITIES,
+                "\n",
+                _MD_RISKS,
+                _md_numbered(analysis.risks) if analysis.risks else _MD_NO_RISKS,
+                "\n",
+                _MD_EVIDENCE,
+                evidence,
+                "\n",
+                _MD_SOURCES,
+                "".join([_md_source(item) for item in collected.items]),
+                _MD_FOOTER,
+            ]
+        )
+
+
+_HTML_HEAD = (
+    "<!DOCTYPE html>\n<html lang=\"en\">\n<head>\n<meta charset=\"utf-8\">\n"
+    "<meta name=\"viewport\" content=\"width=device-width, initial-scale=1\">\n"
+    "<title>{title}</title>\n</head>\n<body>\n<article class=\"trade-report\">\n"
+)
+_HTML_SUMMARY = "<section id=\"summary\">\n<h2>1. Executive Summary</h2>\n"
+_HTML_OPPORTUNITIES = "</section>\n<section id=\"opportunities\">\n<h2>2. Key Trade Opportunities</h2>\n"
+_HTML_RISKS = "</section>\n<section id=\"risks\">\n<h2>3. Key Risks &amp; Watchpoints</h2>\n"
+_HTML_EVIDENCE = "</section>\n<section id=\"evidence\">\n<h2>4. Evidence &amp; Supporting Signals</h2>\n"
+_HTML_SOURCES = "</section>\n<section id=\"sources\">\n<h2>5. Source Snippets (from web search)</h2>\n"
+_HTML_FOOTER = "</section>\n<hr>\n<footer><em>" + escape(FOOTER_TEXT) + "</em></footer>\n</article>\n</body>\n</html>\n"
+
+
+def _html_list(tag: str, values: List[str], empty: str) -> str:
+    if not values:
+        return f"<ul><li>{escape(empty)}</li></ul>\n"
+    items = "".join([f"<li>{escape(value)}</li>\n" for value in values])
+    return f"<{tag}>\n{items}</{tag}>\n"
+
+
+def _html_source(item: MarketItem) -> str:
+    url = ""
+    if item.url is not None:
+        href = escape(str(item.url))
+        url = f"<li>URL: <a href=\"{href}\" rel=\"noopener nofollow\">{href}</a></li>\n"
+    note = f"<li>Note: {escape(item.snippet)}</li>\n" if item.snippet else ""
+    return f"<h3>{escape(item.title)}</h3>\n<ul>\n{url}{note}</ul>\n"
+
+
+def build_html_report(
+    collected: CollectedData,
+    analysis: AIAnalysis,
+    generated_at: Optional[datetime] = None,
+) -> str:
+    """Same report as a standalone HTML page (all collected text escaped)."""
+
+    with timed("render.html"):
+        title = escape(TITLE.format(sector=collected.sector.title()))
+        horizon = (
+            f"<h3>Suggested Time Horizon</h3>\n<ul><li>{escape(analysis.time_horizon)}</li></ul>\n"
+            if analysis.time_horizon
+            else ""
+        )
+        return "".join(
+            [
+                _HTML_HEAD.format(title=title),
+                f"<h1>{title}</h1>\n<p><em>Generated at: {report_timestamp(generated_at)}</em></p>\n",
+                _HTML_SUMMARY,
+                f"<p>{escape(analysis.summary or 'No summary available.')}</p>\n",
+                horizon,
+                _HTML_OPPORTUNITIES,
+                _html_list("ol", analysis.opportunities, "No specific opportunities identified."),
+                _HTML_RISKS,
+                _html_list("ol", analysis.risks, "No major risks identified."),
+                _HTML_EVIDENCE,
+                _html_list("ul", analysis.evidence_points, "Evidence not available from current data."),
+                _HTML_SOURCES,
+                "".join([_html_source(item) for item in collected.items]),
+                _HTML_FOOTER,
+            ]
+        )
+
+
+def markdown_as_html(markdown: str) -> str:
+    """HTML page for a report that only exists as markdown (older stored rows)."""
+    title = escape(markdown.partition("\n")[0].lstrip("# "))
+    return f"{_HTML_HEAD.format(title=title)}<pre>{escape(markdown)}</pre>\n</article>\n</body>\n</html>\n"
+
+
+def build_report_document(
+    collected: CollectedData,
+    analysis: AIAnalysis,
+    generated_at: datetime,
+) -> ReportDocument:
+    """The report's content as structured data (JSON representation)."""
+    return ReportDocument(
+        title=TITLE.format(sector=collected.sector.title()),
+        sector=collected.sector,
+        country=collected.country,
+        generated_at=generated_at,
+        degraded=analysis.degraded,
+        summary=analysis.summary,
+        time_horizon=analysis.time_horizon,
+        opportunities=analysis.opportunities,
+        risks=analysis.risks,
+        evidence_points=analysis.evidence_points,
+        sources=collected.items,
+    )
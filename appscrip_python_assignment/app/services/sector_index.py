@@ -0,0 +1,241 @@
+import difflib
+import hashlib
+import json
+import os
+import re
+import tempfile
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from cachetools import LRUCache
+
+from app.config import settings, shared_state_dir
+
+DEFAULT_ALIASES_FILE = Path(__file__).resolve().parent.parent / "data" / "sector_aliases.json"
+
+# bump when the vectorizer changes, so old index files aren't reused
+_INDEX_VERSION = 1
+
+_NON_WORD_RE = re.compile(r"[^a-z0-9]+")
+# words that don't change which sector is meant ("IT sector in India" == "IT")
+_FILLER_WORDS = frozenset(
+    {"sector", "sectors", "industry", "industries", "india", "indian", "in", "the", "stocks", "companies"}
+)
+
+
+def normalize_sector(text: str) -> str:
+    """Lowercase, `&` -> `and`, punctuation to spaces, filler words dropped."""
+    words = _NON_WORD_RE.sub(" ", text.lower().replace("&", " and ")).split()
+    kept = [w for w in words if w not in _FILLER_WORDS]
+    return " ".join(kept or words)
+
+
+def _features(text: str) -> List[str]:
+    # character trigrams of the padded text (robust to typos and inflections)
+    # plus whole words, plural `s` folded (so shared words count more than
+    # shared fragments, and "fertilizer" meets "fertilizers")
+    padded = f" {text} "
+    grams = [padded[i : i + 3] for i in range(len(padded) - 2)]
+    return grams + ["w:" + _fold(word) for word in text.split()]
+
+
+def _fold(word: str) -> str:
+    return word[:-1] if len(word) > 3 and word.endswith("s") else word
+
+
+def _same_word(a: str, b: str) -> bool:
+    """Equal up to a plural (`s`, `ies`) or, for longer words, a typo or two."""
+    a, b = (_fold(w[:-3] + "y" if len(w) > 4 and w.endswith("ies") else w) for w in (a, b))
+    if a == b:
+        return True
+    return min(len(a), len(b)) >= 5 and difflib.SequenceMatcher(None, a, b).ratio() >= 0.85
+
+
+def covers(name: str, query: str) -> bool:
+    """
+    Whether every word of `query` is in `name` (up to plurals and typos):
+    "logistic" and "pharmaceuticls" are spellings of a known sector, while
+    "healthcare it" or "renewable energy finance" are narrower sectors of
+    their own, however similar their vectors.
+    """
+    words = name.split()
+    return all(any(_same_word(q, w) for w in words) for q in query.split())
+
+
+def _hash(feature: str) -> int:
+    return int.from_bytes(hashlib.blake2b(feature.encode("utf-8"), digest_size=8).digest(), "little")
+
+
+def embed(text: str, dims: int):
+    """
+    Hashed-feature vector of `text`, L2-normalised (float32). A sign bit per
+    feature keeps hash collisions from adding up to a bias.
+    """
+    import numpy as np
+
+    vec = np.zeros(dims, dtype=np.float32)
+    for feature in _features(text):
+        h = _hash(feature)
+        vec[h % dims] += 1.0 if (h >> 63) & 1 else -1.0
+    norm = float(np.linalg.norm(vec))
+    return vec / norm if norm else vec
+
+
+@dataclass(frozen=True)
+class SectorMatch:
+    sector: str  # canonical sector (or the input as given when nothing matched)
+    via: str  # alias | vector | none
+    score: float = 1.0
+
+
+class SectorIndex:
+    """
+    Maps incoming sector strings to a canonical sector so near-duplicate
+    queries ("it", "IT services", "information technology", "tech") share
+    one cache entry and one analysis.
+
+    - exact lookup in the alias table (normalised canonical names + aliases)
+    - otherwise cosine similarity against hashed character-trigram vectors of
+      every name in the table; the best-scoring name at or above `threshold`
+      that covers every word of the input (`covers`: typos and plurals only,
+      never a sub-sector) gives the canonical, else the input is used as is
+    - the vector matrix is written once to `index_dir` (file name derived from
+      the table's contents) and opened memory-mapped, so every worker on the
+      host shares the same pages; numpy is imported on first use
+    """
+
+    def __init__(
+        self,
+        aliases: Dict[str, List[str]],
+        index_dir: str,
+        threshold: float = 0.8,
+        dims: int = 512,
+        cache_size: int = 4096,
+    ):
+        self.index_dir = index_dir
+        self.threshold = threshold
+        self.dims = dims
+        self._exact: Dict[str, str] = {}
+        for canonical, names in aliases.items():
+            canonical_key = normalize_sector(canonical)
+            self._exact[canonical_key] = canonical
+            for name in names:
+                self._exact.setdefault(normalize_sector(name), canonical)
+        # one matrix row per distinct name; row i belongs to _labels[i]
+        self._texts = sorted(self._exact)
+        self._labels = [self._exact[text] for text in self._texts]
+        self._matrix = None
+        self._resolved: LRUCache = LRUCache(maxsize=cache_size)
+
+        self.alias_hits = 0
+        self.vector_hits = 0
+        self.misses = 0
+
+    @property
+    def path(self) -> str:
+        digest = hashlib.sha256(
+            json.dumps([_INDEX_VERSION, self.dims, self._texts]).encode("utf-8")
+        ).hexdigest()[:16]
+        return os.path.join(self.index_dir, f"sector-index-{digest}.npy")
+
+    def _load_matrix(self):
+        if self._matrix is None:
+            import numpy as np
+
+            path = self.path
+            if not os.path.exists(path):
+                os.makedirs(self.index_dir, exist_ok=True)
+                matrix = np.stack([embed(text, self.dims) for text in self._texts])
+                # write-then-rename: concurrent workers never see a partial file
+                fd, tmp = tempfile.mkstemp(dir=self.index_dir, suffix=".npy")
+                with os.fdopen(fd, "wb") as fh:
+                    np.save(fh, matrix)
+                os.replace(tmp, path)
+            self._matrix = np.load(path, mmap_mode="r")
+        return self._matrix
+
+    def preload(self) -> None:
+        """Build / map the index now (call off the event loop)."""
+        self._load_matrix()
+
+    def _search(self, text: str) -> SectorMatch:
+        scores = self._load_matrix() @ embed(text, self.dims)
+        for row in scores.argsort()[::-1]:
+            score = float(scores[row])
+            if score < self.threshold:
+                break
+            if covers(self._texts[row], text):
+                return SectorMatch(self._labels[row], "vector", round(score, 3))
+        return SectorMatch(text, "none", round(float(scores.max()), 3))
+
+    def resolve(self, sector: str) -> SectorMatch:
+        match = self._resolved.get(sector)
+        if match is None:
+            text = normalize_sector(sector) or sector
+            canonical = self._exact.get(text)
+            if canonical is not None:
+                match = SectorMatch(canonical, "alias")
+            else:
+                match = self._search(text)
+                if match.via == "none":
+                    # unknown sector: keep the caller's spelling
+                    match = SectorMatch(sector, "none", match.score)
+            self._resolved[sector] = match
+        if match.via == "alias":
+            self.alias_hits += 1
+        elif match.via == "vector":
+            self.vector_hits += 1
+        else:
+            self.misses += 1
+        return match
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "canonical_sectors": len(set(self._labels)),
+            "names": len(self._texts),
+            "threshold": self.threshold,
+            "index_path": self.path if self._matrix is not None else None,
+            "alias_hits": self.alias_hits,
+            "vector_hits": self.vector_hits,
+            "misses": self.misses,
+        }
+
+
+def _load_aliases(path: Path) -> Dict[str, List[str]]:
+    with open(path, encoding="utf-8") as fh:
+        return json.load(fh)
+
+
+def _build_index() -> Optional[SectorIndex]:
+    if not settings.sector_semantic_enabled:
+        return None
+    return SectorIndex(
+        _load_aliases(
+            Path(settings.sector_aliases_file) if settings.sector_aliases_file else DEFAULT_ALIASES_FILE
+        ),
+        index_dir=settings.sector_index_dir or shared_state_dir(),
+        threshold=settings.sector_match_threshold,
+        dims=settings.sector_vector_dims,
+    )
+
+
+sector_index: Optional[SectorIndex] = _build_index()
+
+
+def preload() -> None:
+    if sector_index is not None:
+        sector_index.preload()
+
+
+def sector_stats() -> Dict[str, Any]:
+    if sector_index is None:
+        return {"enabled": False}
+    return {"enabled": True, **sector_index.stats()}
+
+
+def canonicalize(sector: str) -> str:
+    """Canonical sector for an already cleaned sector string."""
+    if sector_index is None:
+        return sector
+    return sector_index.resolve(sector).sector
@@ -0,0 +1,157 @@
+import json
+import re
+from typing import Any, Collection, List, Optional, Tuple
+
+_DECODER = json.JSONDecoder()
+
+# next char that matters outside / inside a JSON string
+_STRUCTURAL_RE = re.compile(r'[{}\[\]",]')
+_STRING_SPECIAL_RE = re.compile(r'["\\]')
+
+
+class JsonObjectStream:
+    """
+    Incrementally scan streamed text for a top-level JSON object and return
+    each member (key, value) as soon as its value is complete.
+
+    - Text before the object (prose, ```json fences) is ignored.
+    - A brace-delimited span that yields no usable member (e.g. "{see below}"
+      in prose) is skipped and scanning continues with the next '{'.
+    - With `expected_keys`, scanning stops once all of them have been seen.
+    - Work is linear in the input: each char is visited once (regex jumps
+      between structural chars) and member text is only joined when it closes.
+    """
+
+    def __init__(self, expected_keys: Optional[Collection[str]] = None) -> None:
+        self.expected_keys = frozenset(expected_keys) if expected_keys else None
+        self.seen_keys: set = set()
+        self.done = False
+
+        self._in_object = False
+        self._depth = 0
+        self._in_string = False
+        self._escape = False
+        self._parts: List[str] = []  # text of the current member so far
+        self._object_members = 0  # usable members in the current object
+
+    def feed(self, chunk: str) -> List[Tuple[str, Any]]:
+        members: List[Tuple[str, Any]] = []
+        if self.done or not chunk:
+            return members
+
+        i = 0  # scan position in chunk
+        start = 0  # start of not-yet-saved member text in chunk
+        n = len(chunk)
+
+        while i < n:
+            if not self._in_object:
+                i = chunk.find("{", i)
+                if i < 0:
+                    break
+                self._in_object = True
+                self._depth = 1
+                self._parts = []
+                self._object_members = 0
+                i += 1
+                start = i
+                continue
+
+            if self._escape:
+                self._escape = False
+                i += 1
+                continue
+
+            if self._in_string:
+                match = _STRING_SPECIAL_RE.search(chunk, i)
+                if match is None:
+                    i = n
+                    break
+                i = match.end()
+                if match.group() == "\\":
+                    self._escape = True
+                else:
+                    self._in_string = False
+                continue
+
+            match = _STRUCTURAL_RE.search(chunk, i)
+            if match is None:
+                i = n
+                break
+            ch = match.group()
+            i = match.end()
+
+            if ch == '"':
+                self._in_string = True
+            elif ch in "{[":
+                self._depth += 1
+            elif ch in "}]":
+                self._depth -= 1
+                if self._depth == 0:
+                    self._parts.append(chunk[start : i - 1])
+                    self._close_member(members)
+                    self._in_object = False
+                    if self._object_members or self._complete():
+                        self.done = True
+                        break
+                    # nothing usable in that span: keep looking
+            elif ch == "," and self._depth == 1:
+                self._parts.append(chunk[start : i - 1])
+                self._close_member(members)
+                start = i
+                if self._complete():
+                    self.done = True
+                    break
+
+        if self._in_object and not self.done:
+            self._parts.append(chunk[start:])
+        return members
+
+    def _complete(self) -> bool:
+        return self.expected_keys is not None and self.expected_keys <= self.seen_keys
+
+    def _close_member(self, out: List[Tuple[str, Any]]) -> None:
+        member = "".join(self._parts)
+        self._parts = []
+        if not member.strip():
+            return
+        try:
+            parsed = json.loads("{" + member + "}")
+        except json.JSONDecodeError:
+            # malformed member; skip it and keep going
+            return
+        for key, value in parsed.items():
+            if self.expected_keys is not None and key not in self.expected_keys:
+                continue
+            self.seen_keys.add(key)
+            self._object_members += 1
+            out.append((key, value))
+
+
+def extract_json_object(
+    text: str, expected_keys: Optional[Collection[str]] = None
+) -> dict:
+    """
+    One-shot use of JsonObjectStream: pull the JSON object out of a complete
+    model response. Members that parsed are kept even if the text is
+    truncated or partly malformed. Raises ValueError if nothing was found.
+    """
+    # fast path: a well-formed object at the first '{' decodes in C, and
+    # raw_decode ignores whatever follows it (closing fence, prose)
+    start = text.find("{")
+    if start < 0:
+        raise ValueError("no JSON object found")
+    try:
+        obj, _end = _DECODER.raw_decode(text, start)
+    except json.JSONDecodeError:
+        obj = None
+    if isinstance(obj, dict):
+        if expected_keys is not None:
+            obj = {k: v for k, v in obj.items() if k in expected_keys}
+        if obj:
+            return obj
+
+    parser = JsonObjectStream(expected_keys)
+    members = parser.feed(text)
+    if not members:
+        raise ValueError("no JSON object found")
+    return dict(members)
@@ -0,0 +1,35 @@
+"""
+Standalone analysis-job worker: `python -m app.worker`.
+
+Consumes the shared job queue (JOBS_BACKEND=redis) so workers can be scaled
+separately from the API processes (run those with JOBS_RUN_WORKERS=false).
+"""
+import asyncio
+import signal
+
+from app.config import settings
+from app.core.http_client import close_http_client, start_http_client
+from app.core.report_store import report_store
+from app.services.jobs import job_runner
+
+
+async def main() -> None:
+    if settings.jobs_backend == "memory":
+        raise SystemExit("app.worker needs a shared queue: set JOBS_BACKEND=redis")
+
+    await start_http_client()
+    job_runner.start()
+
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(sig, stop.set)
+    await stop.wait()
+
+    await job_runner.stop()
+    await close_http_client()
+    report_store.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
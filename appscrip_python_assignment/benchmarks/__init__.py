@@ -0,0 +1,10 @@
+"""
+Offline benchmarks. Run from the project root, e.g.:
+
+    python -m benchmarks.http_client_reuse
+"""
+import os
+
+# Settings() requires these; benchmarks never talk to the real services.
+os.environ.setdefault("GEMINI_API_KEY", "benchmark-key")
+os.environ.setdefault("JWT_SECRET", "benchmark-secret")
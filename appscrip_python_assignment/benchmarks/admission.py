@@ -0,0 +1,192 @@
+"""
+Overload behaviour with and without admission control (ADMISSION_ENABLED).
+
+Starts the app (`python -m app.serve --workers 1`, offline fakes from
+benchmarks/fake_app.py) with a slow fake Gemini, then sends a burst of
+`--requests` concurrent `/analyze/{sector}` calls for distinct sectors
+(nothing is cached or coalesced), alternating between a normal-priority
+and a low-priority user. Gemini can serve LLM_MAX_CONCURRENCY calls per
+`--gemini-latency` seconds, so most of the burst can't be served promptly.
+
+Clients retry a 503 after its Retry-After while their `--client-timeout`
+allows (`--no-retry`: give up at once). Per run: answered / shed (final
+503) / client timeouts, latency of each from the first attempt, the share
+of each user's requests that succeeded, and how often `/health` reported
+saturation while the burst was in flight.
+
+    python -m benchmarks.admission --requests 300 --gemini-latency 1.0
+"""
+import argparse
+import asyncio
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Dict, List
+
+from benchmarks.load_test import USERS, _percentile
+from benchmarks.workers import RATE_CAPACITY, RATE_WINDOW_SECONDS, _free_port, _start_stub, _wait_healthy
+
+
+def _start_app(port: int, stub_url: str, args: argparse.Namespace, state_dir: str, admission: bool):
+    env = dict(os.environ)
+    env.update(
+        {
+            "GEMINI_API_KEY": env.get("GEMINI_API_KEY", "benchmark-key"),
+            "JWT_SECRET": env.get("JWT_SECRET", "benchmark-secret"),
+            "STUB_SEARCH_URL": stub_url,
+            "FAKE_GEMINI_LATENCY": str(args.gemini_latency),
+            "RATE_LIMIT_REQUESTS": str(RATE_CAPACITY),
+            "RATE_LIMIT_WINDOW_SECONDS": str(RATE_WINDOW_SECONDS),
+            "PREWARM_ENABLED": "false",
+            "INCREMENTAL_ENABLED": "false",
+            "REPORT_STORE_PATH": os.path.join(state_dir, "reports.sqlite3"),
+            "SHARED_STATE_DIR": state_dir,
+            "ADMISSION_ENABLED": str(admission).lower(),
+        }
+    )
+    return subprocess.Popen(
+        [
+            sys.executable, "-m", "app.serve",
+            "--app", "benchmarks.fake_app:app",
+            "--workers", "1",
+            "--port", str(port),
+            "--log-level", "warning",
+        ],
+        env=env,
+    )
+
+
+async def _burst(url: str, args: argparse.Namespace, run: str) -> Dict[str, object]:
+    import httpx
+
+    limits = httpx.Limits(max_connections=args.requests + 10)
+    async with httpx.AsyncClient(base_url=url, limits=limits, timeout=args.client_timeout) as client:
+        headers = []
+        for username, password in USERS:
+            resp = await client.post("/token", data={"username": username, "password": password})
+            headers.append({"Authorization": f"Bearer {resp.json()['access_token']}"})
+
+        ok: List[float] = []
+        shed: List[float] = []
+        timeouts = 0
+        retries = 0
+        served = {username: 0 for username, _ in USERS}
+        retry_after: List[int] = []
+        health = {"polls": 0, "saturated": 0}
+        done = asyncio.Event()
+
+        async def analyze(i: int) -> None:
+            nonlocal timeouts, retries
+            user = i % len(USERS)
+            start = time.perf_counter()
+            while True:
+                left = args.client_timeout - (time.perf_counter() - start)
+                try:
+                    resp = await client.get(
+                        f"/analyze/{run}-sector-{i}", headers=headers[user], timeout=left
+                    )
+                except httpx.TimeoutException:
+                    timeouts += 1
+                    return
+                elapsed = time.perf_counter() - start
+                if resp.status_code == 200:
+                    ok.append(elapsed)
+                    served[USERS[user][0]] += 1
+                    return
+                if resp.status_code != 503:
+                    return
+                wait = int(resp.headers.get("Retry-After", 0))
+                retry_after.append(wait)
+                if not args.retry or elapsed + wait >= args.client_timeout:
+                    shed.append(elapsed)
+                    return
+                retries += 1
+                await asyncio.sleep(wait)
+
+        async def poll_health() -> None:
+            while not done.is_set():
+                resp = await client.get("/health")
+                health["polls"] += 1
+                health["saturated"] += resp.status_code == 503
+                await asyncio.sleep(0.25)
+
+        poller = asyncio.create_task(poll_health())
+        start = time.perf_counter()
+        await asyncio.gather(*(analyze(i) for i in range(args.requests)))
+        elapsed = time.perf_counter() - start
+        done.set()
+        await poller
+        # admin only: USERS[0]
+        stats = (await client.get("/admission/stats", headers=headers[0])).json()
+
+    per_user = args.requests / len(USERS)
+    return {
+        "elapsed": elapsed,
+        "ok": len(ok),
+        "ok_p50": _percentile(ok, 50),
+        "ok_p99": _percentile(ok, 99),
+        "shed": len(shed),
+        "shed_p99": _percentile(shed, 99),
+        "retry_after": max(retry_after, default=0),
+        "timeouts": timeouts,
+        "retries": retries,
+        "served": {user: n / per_user for user, n in served.items()},
+        "health": health,
+        "limit": stats["limit"],
+        "reasons": stats["rejected"],
+    }
+
+
+def main(args: argparse.Namespace) -> None:
+    stub, stub_url = _start_stub(0.0)
+    print(
+        f"{args.requests} concurrent requests, fake Gemini {args.gemini_latency}s/call, "
+        f"client timeout {args.client_timeout}s"
+    )
+    try:
+        for admission in (False, True):
+            state_dir = tempfile.mkdtemp(prefix="bench-admission-")
+            port = _free_port()
+            proc = _start_app(port, stub_url, args, state_dir, admission)
+            try:
+                url = f"http://127.0.0.1:{port}"
+                asyncio.run(_wait_healthy(url))
+                r = asyncio.run(_burst(url, args, "on" if admission else "off"))
+            finally:
+                proc.terminate()
+                try:
+                    proc.wait(timeout=10)
+                except subprocess.TimeoutExpired:
+                    # without admission control, the backlog outlives the clients
+                    proc.kill()
+                    proc.wait()
+                shutil.rmtree(state_dir, ignore_errors=True)
+            served = "  ".join(f"{user} {share:.0%}" for user, share in r["served"].items())
+            print(
+                f"admission {'on ' if admission else 'off'}: {r['elapsed']:6.1f}s  "
+                f"200={r['ok']:<4} (p50 {r['ok_p50']:5.1f}s, p99 {r['ok_p99']:5.1f}s)  "
+                f"503={r['shed']:<4} (p99 {r['shed_p99']:5.2f}s, Retry-After <= {r['retry_after']}s, "
+                f"{r['retries']} retries)  "
+                f"timeouts={r['timeouts']:<4} served: {served}  "
+                f"/health saturated {r['health']['saturated']}/{r['health']['polls']}  "
+                f"final limit {r['limit']}  503 reasons {r['reasons']}"
+            )
+    finally:
+        stub.terminate()
+        stub.wait(timeout=10)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument("--requests", type=int, default=300)
+    parser.add_argument("--gemini-latency", type=float, default=1.0, help="seconds per fake Gemini call")
+    parser.add_argument("--client-timeout", type=float, default=30.0, help="per request, retries included")
+    parser.add_argument(
+        "--no-retry", dest="retry", action="store_false", help="don't retry a 503 after its Retry-After"
+    )
+    main(parser.parse_args())
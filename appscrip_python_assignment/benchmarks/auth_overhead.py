@@ -0,0 +1,52 @@
+"""
+Per-request auth cost of `get_current_user`: the original path (full
+jwt.decode + a fresh UserInDB per request) vs the cached verifier and
+immutable user index. Also prints the CPU share that cost implies at a
+given request rate.
+
+    python -m benchmarks.auth_overhead --requests 20000 --rps 1000
+"""
+import argparse
+import asyncio
+import time
+
+from jose import jwt
+
+from app.config import settings
+from app.core import security
+from app.schemas.auth import UserInDB
+
+
+async def _legacy_get_current_user(token: str) -> UserInDB:
+    # what every authenticated request used to do
+    payload = jwt.decode(token, settings.jwt_secret, algorithms=[settings.jwt_algorithm])
+    return UserInDB(**security.users_db[payload["sub"]])
+
+
+async def _measure(fn, token: str, requests: int) -> float:
+    start = time.perf_counter()
+    for _ in range(requests):
+        await fn(token)
+    return (time.perf_counter() - start) / requests
+
+
+async def main(requests: int, rps: int) -> None:
+    token = security.create_access_token({"sub": "prabal"})
+    for name, fn in (
+        ("jwt.decode + UserInDB per request", _legacy_get_current_user),
+        ("cached verify + user index", security.get_current_user),
+    ):
+        await _measure(fn, token, 100)  # warm-up
+        per_request = await _measure(fn, token, requests)
+        print(
+            f"{name:<36} {per_request * 1e6:8.2f}us/request  "
+            f"{per_request * rps * 100:6.2f}% of one core at {rps} RPS"
+        )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--requests", type=int, default=20000)
+    parser.add_argument("--rps", type=int, default=1000)
+    args = parser.parse_args()
+    asyncio.run(main(args.requests, args.rps))
@@ -0,0 +1,21 @@
+"""
+`app.main:app` with the offline fakes installed, for benchmarks that run
+the app in separate worker processes (`python -m app.serve --app
+benchmarks.fake_app:app`): every worker imports this module.
+
+    STUB_SEARCH_URL         base URL of a running benchmarks.stub_server
+    FAKE_GEMINI_LATENCY     seconds per fake Gemini call (default 0.2)
+    FAKE_GEMINI_TOKENS      approx. output tokens per call (default 400)
+"""
+import os
+
+from benchmarks.fakes import install_fakes
+from app.main import app
+
+install_fakes(
+    gemini_latency_seconds=float(os.environ.get("FAKE_GEMINI_LATENCY", "0.2")),
+    gemini_output_tokens=int(os.environ.get("FAKE_GEMINI_TOKENS", "400")),
+    search_base_url=os.environ["STUB_SEARCH_URL"],
+)
+
+__all__ = ["app"]
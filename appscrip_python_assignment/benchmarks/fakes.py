@@ -0,0 +1,111 @@
+"""
+Offline stand-ins for the upstream services, for benchmarks.
+
+- FakeGenerativeModel replaces google.generativeai.GenerativeModel and
+  answers with a valid analysis JSON of roughly `output_tokens` tokens
+  after a configurable delay.
+- FixtureSource replaces the collector's web sources with items parsed
+  from the recorded pages in benchmarks/fixtures/; alternatively
+  `install_fakes(search_base_url=...)` points the real sources at the
+  stub server (benchmarks/stub_server.py) so fetching + parsing is exercised.
+"""
+import asyncio
+import json
+from types import SimpleNamespace
+from typing import List, Optional
+
+from benchmarks.stub_server import load_fixtures
+from app.schemas.analyze import MarketItem
+from app.services import ai_client, collector
+
+
+def fake_analysis_json(sector: str = "sector", output_tokens: int = 0) -> str:
+    """Analysis JSON; with `output_tokens`, evidence is padded to about that size."""
+    analysis = {
+        "summary": f"The {sector} sector shows steady momentum with mixed signals.",
+        "opportunities": [f"{sector} opportunity {i}" for i in range(1, 6)],
+        "risks": [f"{sector} risk {i}" for i in range(1, 5)],
+        "time_horizon": "medium-term 6-18 months",
+        "evidence_points": [f"{sector} evidence {i}" for i in range(1, 6)],
+    }
+    text = json.dumps(analysis)
+    missing_chars = output_tokens * 4 - len(text)  # ~4 chars per token
+    i = 6
+    while missing_chars > 0:
+        point = f"{sector} evidence {i}: order books and margins improved this quarter."
+        analysis["evidence_points"].append(point)
+        missing_chars -= len(point) + 4
+        i += 1
+    return json.dumps(analysis)
+
+
+def _response(text: str, prompt_tokens: int = 0) -> SimpleNamespace:
+    part = SimpleNamespace(text=text)
+    return SimpleNamespace(
+        text=text,
+        candidates=[SimpleNamespace(content=SimpleNamespace(parts=[part]))],
+        usage_metadata=SimpleNamespace(
+            prompt_token_count=prompt_tokens,
+            candidates_token_count=len(text) // 4,
+        ),
+    )
+
+
+class FakeGenerativeModel:
+    latency_seconds: float = 0.0
+    output_tokens: int = 0
+    calls: int = 0
+
+    def __init__(self, model_name: str = "", **kwargs):
+        self.model_name = model_name
+
+    async def generate_content_async(self, prompt, stream: bool = False, **kwargs):
+        type(self).calls += 1
+        text = fake_analysis_json(output_tokens=self.output_tokens)
+        if not stream:
+            await asyncio.sleep(self.latency_seconds)
+            return _response(text, prompt_tokens=len(str(prompt)) // 4)
+
+        async def _chunks():
+            step = max(1, len(text) // 10)
+            for i in range(0, len(text), step):
+                await asyncio.sleep(self.latency_seconds / 10)
+                yield _response(text[i : i + step])
+
+        return _chunks()
+
+
+class FixtureSource(collector.SourceAdapter):
+    name = "duckduckgo"
+
+    def __init__(self, latency_seconds: float = 0.0):
+        self.latency_seconds = latency_seconds
+        self._pages = {k: v.decode("utf-8") for k, v in load_fixtures().items()}
+
+    async def fetch(self, sector: str, country: str) -> List[MarketItem]:
+        await asyncio.sleep(self.latency_seconds)
+        html = self._pages.get(sector) or next(iter(self._pages.values()))
+        return collector._extract_duckduckgo_results(html)
+
+
+def install_fakes(
+    gemini_latency_seconds: float = 0.0,
+    search_latency_seconds: float = 0.0,
+    gemini_output_tokens: int = 0,
+    search_base_url: Optional[str] = None,
+) -> None:
+    """
+    Route the app's Gemini and search calls to the local fakes.
+    With `search_base_url` (a running stub server) the real DuckDuckGo and
+    Google News sources are kept and only their URLs are redirected; the
+    stub's own latency then applies instead of `search_latency_seconds`.
+    """
+    FakeGenerativeModel.latency_seconds = gemini_latency_seconds
+    FakeGenerativeModel.output_tokens = gemini_output_tokens
+    ai_client.get_genai().GenerativeModel = FakeGenerativeModel
+    ai_client._get_model.cache_clear()
+    if search_base_url is not None:
+        collector.SEARCH_URL = f"{search_base_url}/html"
+        collector.GOOGLE_NEWS_RSS_URL = f"{search_base_url}/rss/search"
+    else:
+        collector.default_sources = lambda: [FixtureSource(search_latency_seconds)]
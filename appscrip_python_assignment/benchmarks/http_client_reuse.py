@@ -0,0 +1,78 @@
+"""
+Per-request httpx.AsyncClient (old collector behaviour) vs the shared pooled
+client from app.core.http_client, against the local stub search server.
+
+    python -m benchmarks.http_client_reuse --requests 500 --concurrency 20
+"""
+import argparse
+import asyncio
+import statistics
+import time
+from typing import Awaitable, Callable, List
+
+import httpx
+
+from benchmarks.stub_server import start_stub_server
+from app.core.http_client import close_http_client, get_http_client, host_slot
+
+
+def _percentile(samples: List[float], pct: float) -> float:
+    ordered = sorted(samples)
+    idx = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[idx]
+
+
+async def _run(
+    fetch: Callable[[str], Awaitable[None]], url: str, total: int, concurrency: int
+) -> List[float]:
+    sem = asyncio.Semaphore(concurrency)
+    latencies: List[float] = []
+
+    async def one() -> None:
+        async with sem:
+            start = time.perf_counter()
+            await fetch(url)
+            latencies.append((time.perf_counter() - start) * 1000)
+
+    await asyncio.gather(*(one() for _ in range(total)))
+    return latencies
+
+
+async def _fetch_new_client(url: str) -> None:
+    async with httpx.AsyncClient(timeout=10.0) as client:
+        resp = await client.get(url)
+        resp.raise_for_status()
+
+
+async def _fetch_shared_client(url: str) -> None:
+    client = get_http_client()
+    async with host_slot(url):
+        resp = await client.get(url)
+    resp.raise_for_status()
+
+
+async def main(total: int, concurrency: int) -> None:
+    server, base_url = start_stub_server()
+    url = f"{base_url}/html?q=pharma+sector+stock+market+news+India"
+    try:
+        for name, fetch in (
+            ("new client per request", _fetch_new_client),
+            ("shared pooled client", _fetch_shared_client),
+        ):
+            await _run(fetch, url, min(20, total), concurrency)  # warm-up
+            latencies = await _run(fetch, url, total, concurrency)
+            print(
+                f"{name:<24} p50={statistics.median(latencies):7.2f}ms "
+                f"p99={_percentile(latencies, 99):7.2f}ms n={len(latencies)}"
+            )
+    finally:
+        await close_http_client()
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--requests", type=int, default=500)
+    parser.add_argument("--concurrency", type=int, default=20)
+    args = parser.parse_args()
+    asyncio.run(main(args.requests, args.concurrency))
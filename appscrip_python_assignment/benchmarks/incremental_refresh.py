@@ -0,0 +1,129 @@
+"""
+Steady-state re-analysis: Gemini calls and prompt tokens spent refreshing
+`--sectors` sectors for `--rounds` rounds, with full analyses every time
+(INCREMENTAL_ENABLED=false) vs incremental refresh (reuse / delta prompts).
+
+Each round, every collected item is replaced by a new article with
+probability `--churn` (one row per value). Gemini is the offline fake from
+benchmarks/fakes.py; reports go to a temporary SQLite store.
+
+    python -m benchmarks.incremental_refresh --sectors 20 --rounds 24
+"""
+import argparse
+import asyncio
+import os
+import random
+import tempfile
+from typing import Dict, List
+
+os.environ.setdefault("GEMINI_API_KEY", "benchmark-key")
+os.environ.setdefault("JWT_SECRET", "benchmark-secret")
+os.environ.setdefault("REPORT_STORE_PATH", os.path.join(tempfile.mkdtemp(), "reports.sqlite3"))
+
+from benchmarks.fakes import FakeGenerativeModel, install_fakes
+from app.config import settings
+from app.core.cache import _new_entry
+from app.schemas.analyze import MarketItem
+from app.services import collector
+from app.services.incremental import refresh_stats
+from app.services.pipeline import publish_report, run_analysis_pipeline
+from app.services.prompt_compactor import prompt_stats
+
+ITEMS_PER_SECTOR = 8
+_WORDS = (
+    "exports orders margins capacity capex demand pricing policy tariffs imports "
+    "credit monsoon rupee inventory guidance earnings quarter volumes subsidy auction "
+    "contracts retail rural urban freight costs expansion merger listing rating"
+).split()
+
+
+def _text(article: int, words: int) -> str:
+    rng = random.Random(article)
+    return " ".join(rng.choice(_WORDS) for _ in range(words))
+
+
+class ChurningSource(collector.SourceAdapter):
+    """Same articles as last round, except each is replaced with probability `churn`."""
+
+    name = "duckduckgo"
+
+    def __init__(self, churn: float, seed: int = 11):
+        self.churn = churn
+        self.rng = random.Random(seed)
+        self.articles: Dict[str, List[int]] = {}
+        self.next_id = 0
+
+    def _new_article(self) -> int:
+        self.next_id += 1
+        return self.next_id
+
+    def advance(self) -> None:
+        for ids in self.articles.values():
+            for i in range(len(ids)):
+                if self.rng.random() < self.churn:
+                    ids[i] = self._new_article()
+
+    async def fetch(self, sector: str, country: str) -> List[MarketItem]:
+        if sector not in self.articles:
+            self.articles[sector] = [self._new_article() for _ in range(ITEMS_PER_SECTOR)]
+        return [
+            MarketItem(
+                title=f"{sector}: {_text(i, 8)}",
+                url=f"https://news.example.com/{sector}/{i}",
+                snippet=_text(-i, 30),
+                source="duckduckgo",
+            )
+            for i in self.articles[sector]
+        ]
+
+
+async def _run(sectors: int, rounds: int, churn: float, incremental: bool) -> Dict[str, float]:
+    settings.incremental_enabled = incremental
+    source = ChurningSource(churn)
+    collector.default_sources = lambda: [source]
+    names = [f"sector{incremental:d}x{churn}x{i}" for i in range(sectors)]
+
+    calls, tokens = FakeGenerativeModel.calls, prompt_stats.estimated_tokens_total
+    for _ in range(rounds):
+        for sector in names:
+            collected, analysis = await run_analysis_pipeline(sector)
+            await publish_report(_new_entry(collected, analysis))
+        source.advance()
+    return {
+        "calls": FakeGenerativeModel.calls - calls,
+        "tokens": prompt_stats.estimated_tokens_total - tokens,
+    }
+
+
+async def main(sectors: int, rounds: int, churns: List[float]) -> None:
+    install_fakes()
+    print(
+        f"{sectors} sectors x {rounds} rounds, {ITEMS_PER_SECTOR} items each; "
+        f"reuse <= {settings.incremental_reuse_threshold:.0%} new, "
+        f"delta <= {settings.incremental_delta_threshold:.0%} new"
+    )
+    for churn in churns:
+        full = await _run(sectors, rounds, churn, incremental=False)
+        before = dict(refresh_stats.modes)
+        inc = await _run(sectors, rounds, churn, incremental=True)
+        modes = {mode: n - before[mode] for mode, n in refresh_stats.modes.items()}
+        print(
+            f"churn {churn:4.0%}: calls {full['calls']:5.0f} -> {inc['calls']:5.0f} "
+            f"({inc['calls'] / full['calls']:6.1%})   "
+            f"prompt tokens {full['tokens']:8.0f} -> {inc['tokens']:8.0f} "
+            f"({inc['tokens'] / full['tokens']:6.1%})   "
+            f"full/delta/reused {modes['full']}/{modes['delta']}/{modes['reused']}"
+        )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument("--sectors", type=int, default=20)
+    parser.add_argument("--rounds", type=int, default=24)
+    parser.add_argument(
+        "--churn", type=float, nargs="+", default=[0.0, 0.05, 0.15, 0.3, 0.6]
+    )
+    args = parser.parse_args()
+    asyncio.run(main(args.sectors, args.rounds, args.churn))
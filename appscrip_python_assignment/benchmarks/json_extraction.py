@@ -0,0 +1,149 @@
+"""
+Model-output JSON extraction: fuzz checks plus timings of the original
+regex/multi-pass `_extract_json` vs the single-pass incremental parser.
+
+Fuzz: valid analyses wrapped in prose/fences, randomly mutated and fed in
+random chunk sizes. The streamed result must equal the one-shot result and
+the parser may only ever raise ValueError (nothing found).
+
+    python -m benchmarks.json_extraction --fuzz 2000
+"""
+import argparse
+import json
+import random
+import re
+import string
+import timeit
+
+from app.services.ai_client import ANALYSIS_KEYS
+from app.utils.text import JsonObjectStream, extract_json_object
+
+
+def _legacy_extract_json(text: str) -> dict:
+    # the implementation this parser replaced, kept for comparison
+    text = text.strip()
+    try:
+        return json.loads(text)
+    except json.JSONDecodeError:
+        pass
+    fence_match = re.search(r"```json(.*)```", text, re.DOTALL | re.IGNORECASE)
+    if not fence_match:
+        fence_match = re.search(r"```(.*)```", text, re.DOTALL)
+    if fence_match:
+        try:
+            return json.loads(fence_match.group(1).strip())
+        except json.JSONDecodeError:
+            pass
+    start = text.find("{")
+    end = text.rfind("}")
+    if start != -1 and end != -1 and end > start:
+        try:
+            return json.loads(text[start : end + 1])
+        except json.JSONDecodeError:
+            pass
+    raise RuntimeError("Gemini response was not valid JSON")
+
+
+def _analysis(rng: random.Random, points: int, alphabet: str = string.ascii_letters) -> dict:
+    def sentence() -> str:
+        words = rng.randint(5, 25)
+        return " ".join(
+            "".join(rng.choices(alphabet, k=rng.randint(2, 9)))
+            for _ in range(words)
+        )
+
+    return {
+        "summary": sentence(),
+        "opportunities": [sentence() for _ in range(points)],
+        "risks": [sentence() for _ in range(points)],
+        "time_horizon": "medium-term 6-18 months",
+        "evidence_points": [sentence() for _ in range(points)],
+    }
+
+
+def _wrap(rng: random.Random, body: str) -> str:
+    return rng.choice(
+        [
+            body,
+            f"```json\n{body}\n```",
+            f"Sure! Here is the analysis {{as requested}}:\n```\n{body}\n```\nLet me know.",
+            f"Note: see {{below}}.\n{body}\nThanks",
+        ]
+    )
+
+
+def _mutate(rng: random.Random, text: str) -> str:
+    chars = list(text)
+    for _ in range(rng.randint(1, 5)):
+        pos = rng.randrange(len(chars))
+        if rng.random() < 0.5:
+            del chars[pos]
+        else:
+            chars.insert(pos, rng.choice('{}[],":\\` x'))
+    return "".join(chars)
+
+
+def _feed_chunked(rng: random.Random, text: str) -> dict:
+    parser = JsonObjectStream(ANALYSIS_KEYS)
+    out = {}
+    i = 0
+    while i < len(text):
+        step = rng.randint(1, 64)
+        out.update(parser.feed(text[i : i + step]))
+        i += step
+    return out
+
+
+def fuzz(iterations: int, seed: int = 1) -> None:
+    rng = random.Random(seed)
+    recovered = 0
+    for _ in range(iterations):
+        # JSON-significant chars inside strings to stress the scanner
+        expected = _analysis(rng, rng.randint(1, 6), string.ascii_letters + '{}[],"\\:')
+        text = _wrap(rng, json.dumps(expected, indent=rng.choice([None, 2])))
+        mutated = rng.random() < 0.5
+        if mutated:
+            text = _mutate(rng, text)
+
+        try:
+            one_shot = extract_json_object(text, ANALYSIS_KEYS)
+        except ValueError:
+            one_shot = {}
+        assert _feed_chunked(rng, text) == one_shot, "streamed != one-shot"
+        if not mutated:
+            assert one_shot == expected, "valid output not recovered"
+        recovered += bool(one_shot)
+    print(f"fuzz: {iterations} cases ok, {recovered} with members recovered")
+
+
+def timings() -> None:
+    rng = random.Random(2)
+    huge = json.dumps(_analysis(rng, 4000))
+    cases = {
+        "plain (small)": json.dumps(_analysis(rng, 5)),
+        f"plain ({len(huge) // 1024} KiB)": huge,
+        "fenced + prose (huge)": f"Here you go:\n```json\n{huge}\n```\nHope this helps.",
+        "brace in prose (huge)": f"Result {{see below}}:\n{huge}\nDone.",
+        "truncated (huge)": huge[: len(huge) // 2],
+    }
+    for name, text in cases.items():
+        row = [f"{name:<24}"]
+        for label, fn in (
+            ("legacy", _legacy_extract_json),
+            ("incremental", lambda t: extract_json_object(t, ANALYSIS_KEYS)),
+        ):
+            try:
+                fn(text)
+                seconds = timeit.timeit(lambda: fn(text), number=5) / 5
+                row.append(f"{label}={seconds * 1000:8.2f}ms")
+            except (RuntimeError, ValueError):
+                row.append(f"{label}=  failed  ")
+        print("  ".join(row))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--fuzz", type=int, default=2000)
+    args = parser.parse_args()
+    fuzz(args.fuzz)
+    timings()
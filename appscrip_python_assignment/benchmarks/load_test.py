@@ -0,0 +1,294 @@
+"""
+Offline end-to-end load test.
+
+Starts the stub search server (recorded DuckDuckGo pages + RSS fixture),
+swaps Gemini for FakeGenerativeModel, runs the app under uvicorn in a
+background thread, then drives `/token` and `/analyze/{sector}` over real
+HTTP at a fixed concurrency. Sectors are drawn from a Zipf distribution
+(a few hot sectors, a long tail), seeded for reproducibility.
+
+Reports RPS and p50/p95/p99 per endpoint, plus event-loop lag sampled
+inside the server's loop. The driver shares the process (and the GIL)
+with the server, so absolute numbers are conservative; compare runs made
+with the same options on the same machine.
+
+    python -m benchmarks.load_test --requests 2000 --concurrency 50
+    python -m benchmarks.load_test --save benchmarks/baseline.json
+    python -m benchmarks.load_test --baseline benchmarks/baseline.json  # exit 1 on regression
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import socket
+import sys
+import tempfile
+import threading
+import time
+from typing import Any, Dict, List, Optional
+
+SECTORS = [
+    "banking", "it", "pharma", "auto", "fmcg", "energy", "metals", "realty",
+    "telecom", "infrastructure", "chemicals", "textiles", "cement", "aviation",
+    "insurance", "media", "logistics", "defence", "agriculture", "renewables",
+]
+USERS = [("prabal", "prabal123"), ("guest", "guest123")]
+
+
+def _percentile(samples: List[float], pct: float) -> float:
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    idx = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[idx]
+
+
+def _summary(latencies: List[float], errors: int, elapsed: float) -> Dict[str, float]:
+    return {
+        "count": len(latencies),
+        "errors": errors,
+        "rps": round(len(latencies) / elapsed, 1) if elapsed else 0.0,
+        "p50_ms": round(_percentile(latencies, 50) * 1000, 2),
+        "p95_ms": round(_percentile(latencies, 95) * 1000, 2),
+        "p99_ms": round(_percentile(latencies, 99) * 1000, 2),
+    }
+
+
+def _zipf_weights(n: int, s: float) -> List[float]:
+    return [1 / (rank ** s) for rank in range(1, n + 1)]
+
+
+class _LoopLagProbe:
+    """Schedules a short sleep repeatedly; the overshoot is event-loop lag."""
+
+    def __init__(self, interval: float = 0.01):
+        self.interval = interval
+        self.samples: List[float] = []
+
+    async def run(self) -> None:
+        while True:
+            start = time.perf_counter()
+            await asyncio.sleep(self.interval)
+            self.samples.append(max(0.0, time.perf_counter() - start - self.interval))
+
+
+class _ServerThread:
+    """uvicorn on 127.0.0.1:<free port> in its own thread and event loop."""
+
+    def __init__(self, app):
+        import uvicorn
+
+        self._sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        self._sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        # accepted connections inherit this; without it small responses hit
+        # Nagle + delayed ACK (~40ms per request on loopback)
+        self._sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self._sock.bind(("127.0.0.1", 0))
+        self.url = "http://127.0.0.1:%d" % self._sock.getsockname()[1]
+        config = uvicorn.Config(app, log_level="warning", access_log=False)
+        self.server = uvicorn.Server(config)
+        self.probe = _LoopLagProbe()
+        self._thread = threading.Thread(target=lambda: asyncio.run(self._serve()), daemon=True)
+
+    async def _serve(self) -> None:
+        probe = asyncio.ensure_future(self.probe.run())
+        try:
+            await self.server.serve(sockets=[self._sock])
+        finally:
+            probe.cancel()
+
+    def __enter__(self) -> "_ServerThread":
+        self._thread.start()
+        while not self.server.started:
+            time.sleep(0.01)
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.server.should_exit = True
+        self._thread.join(timeout=10)
+
+
+async def _drive(url: str, args: argparse.Namespace) -> Dict[str, Any]:
+    import httpx
+
+    limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+    async with httpx.AsyncClient(base_url=url, limits=limits, timeout=60.0) as client:
+        sem = asyncio.Semaphore(args.concurrency)
+
+        # phase 1: logins (bcrypt-bound)
+        token_latencies: List[float] = []
+        token_errors = 0
+        tokens: List[str] = []
+
+        async def login(i: int) -> None:
+            nonlocal token_errors
+            username, password = USERS[i % len(USERS)]
+            async with sem:
+                start = time.perf_counter()
+                resp = await client.post("/token", data={"username": username, "password": password})
+                token_latencies.append(time.perf_counter() - start)
+            if resp.status_code == 200:
+                tokens.append(resp.json()["access_token"])
+            else:
+                token_errors += 1
+
+        start = time.perf_counter()
+        await asyncio.gather(*(login(i) for i in range(args.logins)))
+        token_elapsed = time.perf_counter() - start
+        if not tokens:
+            raise SystemExit("no successful logins; is the server healthy?")
+
+        # phase 2: analyses
+        rng = random.Random(args.seed)
+        sectors = SECTORS[: args.sectors] + [
+            f"sector-{i}" for i in range(max(0, args.sectors - len(SECTORS)))
+        ]
+        picks = rng.choices(sectors, weights=_zipf_weights(len(sectors), args.zipf), k=args.requests)
+        analyze_latencies: List[float] = []
+        analyze_errors = 0
+        statuses: Dict[str, int] = {}
+
+        async def analyze(i: int, sector: str) -> None:
+            nonlocal analyze_errors
+            headers = {"Authorization": f"Bearer {tokens[i % len(tokens)]}"}
+            async with sem:
+                start = time.perf_counter()
+                resp = await client.get(f"/analyze/{sector}", headers=headers)
+                analyze_latencies.append(time.perf_counter() - start)
+            statuses[str(resp.status_code)] = statuses.get(str(resp.status_code), 0) + 1
+            if resp.status_code != 200:
+                analyze_errors += 1
+
+        start = time.perf_counter()
+        await asyncio.gather(*(analyze(i, s) for i, s in enumerate(picks)))
+        analyze_elapsed = time.perf_counter() - start
+
+    return {
+        "token": _summary(token_latencies, token_errors, token_elapsed),
+        "analyze": {**_summary(analyze_latencies, analyze_errors, analyze_elapsed), "statuses": statuses},
+    }
+
+
+def _scenario(args: argparse.Namespace) -> Dict[str, Any]:
+    keys = (
+        "logins", "requests", "concurrency", "sectors", "zipf", "seed",
+        "gemini_latency", "gemini_tokens", "search_latency", "cache_ttl",
+    )
+    return {k: getattr(args, k) for k in keys}
+
+
+def _compare(results: Dict[str, Any], baseline: Dict[str, Any], tolerance: float) -> List[str]:
+    """Regressions beyond `tolerance` (fraction) vs the baseline results."""
+    regressions = []
+    for endpoint in ("token", "analyze"):
+        now, base = results[endpoint], baseline[endpoint]
+        for key in ("p50_ms", "p95_ms", "p99_ms"):
+            if base[key] and now[key] > base[key] * (1 + tolerance):
+                regressions.append(f"{endpoint} {key}: {base[key]} -> {now[key]}")
+        if base["rps"] and now["rps"] < base["rps"] * (1 - tolerance):
+            regressions.append(f"{endpoint} rps: {base['rps']} -> {now['rps']}")
+        if now["errors"] > base["errors"]:
+            regressions.append(f"{endpoint} errors: {base['errors']} -> {now['errors']}")
+    lag_now, lag_base = results.get("event_loop_lag_ms"), baseline.get("event_loop_lag_ms")
+    if lag_now and lag_base:
+        # lag is noisy at the low end: allow an absolute 5ms on top of the tolerance
+        if lag_now["p99"] > lag_base["p99"] * (1 + tolerance) + 5:
+            regressions.append(f"event loop lag p99: {lag_base['p99']} -> {lag_now['p99']}")
+    return regressions
+
+
+def main(args: argparse.Namespace) -> int:
+    # settings are read at import: configure before importing the app
+    os.environ.setdefault("GEMINI_API_KEY", "benchmark-key")
+    os.environ.setdefault("JWT_SECRET", "benchmark-secret")
+    os.environ["RATE_LIMIT_REQUESTS"] = str(10**9)
+    os.environ["PREWARM_ENABLED"] = "false"
+    os.environ["REPORT_CACHE_TTL_SECONDS"] = str(args.cache_ttl)
+    os.environ.setdefault(
+        "REPORT_STORE_PATH", os.path.join(tempfile.mkdtemp(), "reports.sqlite3")
+    )
+
+    from app.main import app
+    from benchmarks.fakes import install_fakes
+    from benchmarks.stub_server import start_stub_server
+
+    stub, stub_url = start_stub_server(latency_seconds=args.search_latency)
+    install_fakes(
+        gemini_latency_seconds=args.gemini_latency,
+        gemini_output_tokens=args.gemini_tokens,
+        search_base_url=stub_url,
+    )
+
+    lag: Optional[Dict[str, float]] = None
+    try:
+        with _ServerThread(app) as server:
+            results = asyncio.run(_drive(server.url, args))
+            samples = server.probe.samples
+            lag = {
+                "p50": round(_percentile(samples, 50) * 1000, 2),
+                "p99": round(_percentile(samples, 99) * 1000, 2),
+                "max": round(max(samples, default=0.0) * 1000, 2),
+            }
+    finally:
+        stub.shutdown()
+
+    results = {
+        "scenario": _scenario(args),
+        **results,
+        "event_loop_lag_ms": lag,
+        "environment": {
+            "python": platform.python_version(),
+            "machine": platform.machine(),
+            "cpus": os.cpu_count(),
+        },
+    }
+
+    for endpoint in ("token", "analyze"):
+        r = results[endpoint]
+        print(
+            f"{endpoint:<8} n={r['count']:<6} err={r['errors']:<4} {r['rps']:8.1f} rps  "
+            f"p50={r['p50_ms']:8.2f}ms  p95={r['p95_ms']:8.2f}ms  p99={r['p99_ms']:8.2f}ms"
+        )
+    print(f"event loop lag: p50={lag['p50']}ms p99={lag['p99']}ms max={lag['max']}ms")
+
+    if args.save:
+        with open(args.save, "w", encoding="utf-8") as fh:
+            json.dump(results, fh, indent=2)
+            fh.write("\n")
+        print(f"results written to {args.save}")
+
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as fh:
+            baseline = json.load(fh)
+        if baseline.get("scenario") != results["scenario"]:
+            print("warning: scenario differs from the baseline; comparison is indicative only")
+        regressions = _compare(results, baseline, args.tolerance)
+        if regressions:
+            print("REGRESSIONS vs baseline:")
+            for line in regressions:
+                print(f"  - {line}")
+            return 1
+        print(f"no regressions vs {args.baseline} (tolerance {args.tolerance:.0%})")
+    return 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument("--logins", type=int, default=20)
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--sectors", type=int, default=20, help="distinct sectors requested")
+    parser.add_argument("--zipf", type=float, default=1.1, help="skew of sector popularity")
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--gemini-latency", type=float, default=0.2, help="seconds per fake Gemini call")
+    parser.add_argument("--gemini-tokens", type=int, default=400, help="approx. output tokens per call")
+    parser.add_argument("--search-latency", type=float, default=0.05, help="seconds per stub search request")
+    parser.add_argument("--cache-ttl", type=int, default=900, help="REPORT_CACHE_TTL_SECONDS (0 = every request runs the pipeline)")
+    parser.add_argument("--save", help="write results JSON here (e.g. a new baseline)")
+    parser.add_argument("--baseline", help="compare against this results JSON")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="allowed relative regression")
+    sys.exit(main(parser.parse_args()))
@@ -0,0 +1,82 @@
+"""
+/analyze latency while a burst of /token logins is in flight, with bcrypt
+run inline on the event loop (old behaviour) vs on the bounded pool.
+
+    python -m benchmarks.login_burst --logins 20
+"""
+import os
+
+os.environ.setdefault("RATE_LIMIT_REQUESTS", "1000000")
+
+import argparse  # noqa: E402
+import asyncio  # noqa: E402
+import itertools  # noqa: E402
+import statistics  # noqa: E402
+import time  # noqa: E402
+from typing import List  # noqa: E402
+
+import httpx  # noqa: E402
+
+from benchmarks.fakes import install_fakes  # noqa: E402
+from app.core import security  # noqa: E402
+from app.main import app  # noqa: E402
+
+LOGIN = {"username": "prabal", "password": "prabal123"}
+_sector_ids = itertools.count()
+
+
+async def _inline_verify(plain_password: str, hashed_password: str) -> bool:
+    # the original behaviour: bcrypt on the event loop thread
+    return security.verify_password(plain_password, hashed_password)
+
+
+async def _probe(client: httpx.AsyncClient, headers: dict, stop: asyncio.Event) -> List[float]:
+    latencies: List[float] = []
+    while not stop.is_set():
+        start = time.perf_counter()
+        # unique sector each time so the report cache doesn't hide the work
+        resp = await client.get(f"/analyze/s{next(_sector_ids)}", headers=headers)
+        resp.raise_for_status()
+        latencies.append((time.perf_counter() - start) * 1000)
+    return latencies
+
+
+async def _phase(client, headers, seconds: float, logins: int) -> List[float]:
+    stop = asyncio.Event()
+    probe = asyncio.ensure_future(_probe(client, headers, stop))
+    if logins:
+        await asyncio.gather(*(client.post("/token", data=LOGIN) for _ in range(logins)))
+    else:
+        await asyncio.sleep(seconds)
+    stop.set()
+    return await probe
+
+
+def _fmt(latencies: List[float]) -> str:
+    ordered = sorted(latencies)
+    p99 = ordered[min(len(ordered) - 1, int(len(ordered) * 0.99))]
+    return f"p50={statistics.median(ordered):7.1f}ms p99={p99:7.1f}ms max={ordered[-1]:7.1f}ms n={len(ordered)}"
+
+
+async def main(logins: int) -> None:
+    install_fakes(gemini_latency_seconds=0.02, search_latency_seconds=0.01)
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        token = (await client.post("/token", data=LOGIN)).json()["access_token"]
+        headers = {"Authorization": f"Bearer {token}"}
+
+        pooled_verify = security.password_verifier.verify
+        for name, verify in (("inline bcrypt", _inline_verify), ("pooled bcrypt", pooled_verify)):
+            security.password_verifier.verify = verify
+            idle = await _phase(client, headers, 1.0, 0)
+            burst = await _phase(client, headers, 0, logins)
+            print(f"{name:<14} idle  {_fmt(idle)}")
+            print(f"{name:<14} burst {_fmt(burst)}")
+        security.password_verifier.verify = pooled_verify
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--logins", type=int, default=20)
+    args = parser.parse_args()
+    asyncio.run(main(args.logins))
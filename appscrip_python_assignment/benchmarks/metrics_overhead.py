@@ -0,0 +1,129 @@
+"""
+Cost of the latency instrumentation (`timed` blocks, counters, the metrics
+middleware with Server-Timing) relative to a request.
+
+Runs the full /analyze path in-process with zero-latency fakes and
+caching disabled, so the pipeline itself is as cheap as it gets and the
+instrumentation share is an upper bound (real requests wait on the
+network and Gemini for hundreds of milliseconds).
+
+Two numbers are printed:
+- computed: measured cost per timed block / middleware pass x the number
+  of them per request, as a share of the request time
+- end-to-end: interleaved metrics on/off runs through the ASGI app in
+  one event loop (best of N rounds); a sanity check on the computed figure
+
+    python -m benchmarks.metrics_overhead --requests 300 --rounds 7
+"""
+import argparse
+import asyncio
+import os
+import time
+
+os.environ.setdefault("RATE_LIMIT_REQUESTS", "1000000")
+os.environ.setdefault("PREWARM_ENABLED", "false")
+os.environ.setdefault("METRICS_SERVER_TIMING", "true")
+os.environ.setdefault("REPORT_STORE_PATH", ":memory:")
+# nothing is ever fresh: every request runs collect -> Gemini -> render
+os.environ.setdefault("REPORT_CACHE_TTL_SECONDS", "0")
+os.environ.setdefault("REPORT_CACHE_STALE_SECONDS", "0")
+
+import httpx  # noqa: E402
+
+from app.core import metrics  # noqa: E402
+from app.main import app  # noqa: E402
+from benchmarks.fakes import install_fakes  # noqa: E402
+
+
+def _timed_block_cost(iterations: int) -> float:
+    start = time.perf_counter()
+    for _ in range(iterations):
+        with metrics.timed("benchmark.noop"):
+            pass
+    return (time.perf_counter() - start) / iterations
+
+
+def _middleware_cost(iterations: int) -> float:
+    async def _app(scope, receive, send):
+        await send({"type": "http.response.start", "status": 200, "headers": []})
+        await send({"type": "http.response.body", "body": b""})
+
+    async def _send(message):
+        pass
+
+    wrapped = metrics.MetricsMiddleware(_app, server_timing=True)
+    scope = {"type": "http"}
+
+    async def _loop(target) -> float:
+        start = time.perf_counter()
+        for _ in range(iterations):
+            await target(scope, None, _send)
+        return time.perf_counter() - start
+
+    bare = asyncio.run(_loop(_app))
+    instrumented = asyncio.run(_loop(wrapped))
+    return (instrumented - bare) / iterations
+
+
+def _stage_observations() -> float:
+    # series = [per-bucket counts..., +Inf count, sum]
+    return sum(sum(series[:-1]) for series in metrics.STAGE_SECONDS._series.values())
+
+
+async def _run(client: httpx.AsyncClient, requests: int) -> float:
+    start = time.perf_counter()
+    for i in range(requests):
+        response = await client.get(f"/analyze/sector-{i % 50}")
+        assert response.status_code == 200, response.text
+    return (time.perf_counter() - start) / requests
+
+
+async def _end_to_end(requests: int, rounds: int):
+    # ASGI in-process on one loop: no threads or sockets between client and app
+    transport = httpx.ASGITransport(app=app)
+    async with app.router.lifespan_context(app), httpx.AsyncClient(
+        transport=transport, base_url="http://bench"
+    ) as client:
+        token = (
+            await client.post(
+                "/token", data={"username": "prabal", "password": "prabal123"}
+            )
+        ).json()["access_token"]
+        client.headers["Authorization"] = f"Bearer {token}"
+        await _run(client, 50)  # warm-up
+
+        before = _stage_observations()
+        await _run(client, requests)
+        blocks = (_stage_observations() - before) / requests
+
+        on, off = [], []
+        for _ in range(rounds):
+            metrics.enabled = False
+            off.append(await _run(client, requests))
+            metrics.enabled = True
+            on.append(await _run(client, requests))
+    return blocks, min(off), min(on)
+
+
+def main(requests: int, rounds: int) -> None:
+    install_fakes()
+    metrics.enabled = True
+    block = _timed_block_cost(200_000)
+    middleware = _middleware_cost(50_000)
+    print(f"timed() block:      {block * 1e9:7.0f}ns")
+    print(f"middleware/request: {middleware * 1e9:7.0f}ns")
+
+    blocks, base, inst = asyncio.run(_end_to_end(requests, rounds))
+    cost = blocks * block + middleware
+    print(f"timed blocks/request: {blocks:.1f}")
+    print(f"request (metrics off): {base * 1e3:.3f}ms")
+    print(f"computed overhead:     {cost * 1e6:.1f}us/request = {cost / base * 100:.2f}%")
+    print(f"end-to-end overhead:   {(inst - base) / base * 100:+.2f}% (best of {rounds} rounds)")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--requests", type=int, default=300)
+    parser.add_argument("--rounds", type=int, default=7)
+    args = parser.parse_args()
+    main(args.requests, args.rounds)
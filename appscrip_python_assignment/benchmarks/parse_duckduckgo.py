@@ -0,0 +1,34 @@
+"""
+BeautifulSoup reference parser vs the streaming lxml extractor on the
+recorded DuckDuckGo pages in benchmarks/fixtures/ (that both produce the
+same items is tested in tests/test_duckduckgo_parser.py).
+
+    python -m benchmarks.parse_duckduckgo --iterations 200
+"""
+import argparse
+import timeit
+
+from benchmarks.stub_server import load_fixtures
+from app.services.collector import _extract_duckduckgo_results, _parse_duckduckgo_html
+
+
+def main(iterations: int) -> None:
+    for name, page in load_fixtures().items():
+        html = page.decode("utf-8")
+        bs4_s = timeit.timeit(lambda: _parse_duckduckgo_html(html), number=iterations)
+        lxml_s = timeit.timeit(
+            lambda: _extract_duckduckgo_results(html), number=iterations
+        )
+        print(
+            f"{name:<10} ({len(page) // 1024} KiB) "
+            f"bs4={bs4_s / iterations * 1000:7.3f}ms  "
+            f"streaming={lxml_s / iterations * 1000:7.3f}ms  "
+            f"speedup={bs4_s / lxml_s:5.1f}x"
+        )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--iterations", type=int, default=200)
+    args = parser.parse_args()
+    main(args.iterations)
@@ -0,0 +1,46 @@
+"""
+Prompt size with and without compaction on the fixture corpus.
+
+Items come from the recorded DuckDuckGo pages; to mimic multi-source
+collection, each page is also added a second time as lightly reworded
+copies (the same story surfacing via another query/feed).
+
+    python -m benchmarks.prompt_compaction
+"""
+import timeit
+
+from benchmarks.stub_server import load_fixtures
+from app.schemas.analyze import CollectedData
+from app.services.ai_client import SYSTEM_INSTRUCTION, _build_prompt
+from app.services.collector import _extract_duckduckgo_results
+from app.services.prompt_compactor import estimate_tokens
+
+
+def _corpus(sector: str, html: str) -> CollectedData:
+    items = _extract_duckduckgo_results(html, max_items=30)
+    reworded = [
+        item.model_copy(update={"snippet": "Update: " + item.snippet, "url": None})
+        for item in items[::2]
+    ]
+    return CollectedData(sector=sector, items=items + reworded)
+
+
+def main() -> None:
+    system_tokens = estimate_tokens(SYSTEM_INSTRUCTION)
+    for sector, page in load_fixtures().items():
+        collected = _corpus(sector, page.decode("utf-8"))
+        full = _build_prompt(collected, compact=False)
+        compact = _build_prompt(collected)
+        full_tokens = system_tokens + estimate_tokens(full)
+        compact_tokens = system_tokens + estimate_tokens(compact)
+        seconds = timeit.timeit(lambda: _build_prompt(collected), number=20) / 20
+        print(
+            f"{sector:<10} items={len(collected.items):3d}  "
+            f"tokens {full_tokens:6d} -> {compact_tokens:5d} "
+            f"({100 * (1 - compact_tokens / full_tokens):4.1f}% smaller)  "
+            f"compaction {seconds * 1000:5.2f}ms"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,171 @@
+"""
+Report rendering: the original line-list `build_markdown_report` vs the
+single-pass renderer, plus the HTML and JSON representations.
+
+Renders `--reports` distinct reports (random analyses, sources, sectors
+and generation times) with each renderer, checks that the new markdown is
+byte-identical to the old one (stored ETags stay valid), and prints the
+best of `--rounds` timings. The last row serves one hot report `--reports`
+times through `publish_report`, which now renders once per cache entry
+(previously: once per request).
+
+    python -m benchmarks.report_render --reports 10000
+"""
+import argparse
+import asyncio
+import os
+import random
+import string
+import tempfile
+import time
+from datetime import datetime, timedelta, timezone
+from typing import List, Optional, Tuple
+
+os.environ.setdefault("GEMINI_API_KEY", "benchmark-key")
+os.environ.setdefault("JWT_SECRET", "benchmark-secret")
+os.environ.setdefault("REPORT_STORE_PATH", os.path.join(tempfile.mkdtemp(), "reports.sqlite3"))
+
+from app.core.cache import _new_entry
+from app.schemas.analyze import AIAnalysis, CollectedData, MarketItem
+from app.services.report_builder import (
+    build_html_report,
+    build_markdown_report,
+    build_report_document,
+    render_evidence,
+    render_footer,
+    render_opportunities,
+    render_risks,
+    render_sources,
+    render_summary,
+    render_time_horizon,
+)
+from app.core.metrics import timed
+from app.services.pipeline import publish_report
+
+
+def _legacy_build_markdown_report(
+    collected: CollectedData,
+    analysis: AIAnalysis,
+    generated_at: Optional[datetime] = None,
+) -> str:
+    # the implementation the single-pass renderer replaced, kept for comparison
+    def render_header() -> List[str]:
+        sector_title = collected.sector.title()
+        timestamp = (generated_at or datetime.utcnow()).strftime("%Y-%m-%d %H:%M UTC")
+        return [
+            f"# Trade Opportunities Report — {sector_title} (India)",
+            "",
+            f"_Generated at: {timestamp}_",
+            "",
+        ]
+
+    with timed("render.markdown"):
+        lines: list[str] = []
+        lines.extend(render_header())
+        lines.extend(render_summary(analysis))
+        lines.extend(render_time_horizon(analysis))
+        lines.extend(render_opportunities(analysis))
+        lines.extend(render_risks(analysis))
+        lines.extend(render_evidence(analysis))
+        lines.extend(render_sources(collected))
+        lines.extend(render_footer())
+
+        return "\n".join(lines)
+
+
+def _reports(n: int, seed: int = 3) -> List[Tuple[CollectedData, AIAnalysis, datetime]]:
+    rng = random.Random(seed)
+
+    def sentence(lo: int = 6, hi: int = 24) -> str:
+        return " ".join(
+            "".join(rng.choices(string.ascii_lowercase, k=rng.randint(2, 9)))
+            for _ in range(rng.randint(lo, hi))
+        )
+
+    start = datetime(2025, 1, 1, tzinfo=timezone.utc)
+    reports = []
+    for i in range(n):
+        sector = f"{sentence(1, 2)} {i}"
+        collected = CollectedData(
+            sector=sector,
+            source="mixed",
+            items=[
+                MarketItem(
+                    title=sentence(4, 12),
+                    url=f"https://news.example.com/{i}/{j}" if rng.random() < 0.9 else None,
+                    snippet=sentence() if rng.random() < 0.9 else "",
+                    source="duckduckgo",
+                )
+                for j in range(rng.randint(3, 8))
+            ],
+        )
+        analysis = AIAnalysis(
+            summary=sentence(20, 60),
+            opportunities=[sentence() for _ in range(rng.randint(0, 6))],
+            risks=[sentence() for _ in range(rng.randint(0, 6))],
+            time_horizon=sentence(2, 5) if rng.random() < 0.8 else None,
+            evidence_points=[sentence() for _ in range(rng.randint(0, 6))],
+        )
+        generated_at = start + timedelta(seconds=rng.randint(0, 90 * 86400))
+        reports.append((collected, analysis, generated_at))
+    return reports
+
+
+def _best_of(rounds: int, fn, reports) -> float:
+    best = float("inf")
+    for _ in range(rounds):
+        start = time.perf_counter()
+        for collected, analysis, generated_at in reports:
+            fn(collected, analysis, generated_at)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main(n: int, rounds: int) -> None:
+    reports = _reports(n)
+    for collected, analysis, generated_at in reports:
+        assert _legacy_build_markdown_report(collected, analysis, generated_at) == build_markdown_report(
+            collected, analysis, generated_at
+        ), f"markdown differs for {collected.sector!r}"
+    print(f"{n} reports: new markdown identical to legacy")
+
+    renderers = {
+        "markdown (legacy)": _legacy_build_markdown_report,
+        "markdown (single-pass)": build_markdown_report,
+        "html": build_html_report,
+        "json (document + dump)": lambda c, a, g: build_report_document(c, a, g).model_dump_json(),
+    }
+    baseline = None
+    for name, fn in renderers.items():
+        seconds = _best_of(rounds, fn, reports)
+        baseline = baseline or seconds
+        print(
+            f"{name:<24} {seconds * 1000:8.1f}ms total  {seconds / n * 1e6:6.1f}us/report  "
+            f"x{baseline / seconds:.2f} vs legacy"
+        )
+
+    collected, analysis, _ = reports[0]
+    entry = _new_entry(collected, analysis)
+
+    async def serve_hot() -> float:
+        await publish_report(entry)  # first request renders + stores
+        start = time.perf_counter()
+        for _ in range(n):
+            await publish_report(entry)
+        return time.perf_counter() - start
+
+    seconds = asyncio.run(serve_hot())
+    print(
+        f"{'hot report, n requests':<24} {seconds * 1000:8.1f}ms total  {seconds / n * 1e6:6.1f}us/report  "
+        f"x{baseline / seconds:.2f} vs legacy"
+    )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument("--reports", type=int, default=10000)
+    parser.add_argument("--rounds", type=int, default=5)
+    args = parser.parse_args()
+    main(args.reports, args.rounds)
@@ -0,0 +1,66 @@
+"""
+Memory of the session store with N synthetic users: the original
+dict-of-dicts layout vs InMemorySessionBackend's __slots__ records.
+Measured with tracemalloc (Python allocations made while filling the
+store, user-id strings excluded since both layouts share them).
+
+    python -m benchmarks.session_memory --users 1000000
+"""
+import argparse
+import gc
+import time
+import tracemalloc
+from typing import Any, Callable, Dict, List, Tuple
+
+from app.core.session import InMemorySessionBackend
+
+
+def _legacy_fill(user_ids: List[str], now: float) -> Dict[str, Dict[str, Any]]:
+    # what touch_session used to do for every request
+    store: Dict[str, Dict[str, Any]] = {}
+    for i, user_id in enumerate(user_ids):
+        ts = now + i * 1e-3
+        session = store.get(user_id, {"calls": 0, "created_at": ts})
+        session["calls"] = session.get("calls", 0) + 1
+        session["last_call_at"] = ts
+        store[user_id] = session
+    return store
+
+
+def _slots_fill(user_ids: List[str], now: float) -> InMemorySessionBackend:
+    backend = InMemorySessionBackend(max_sessions=len(user_ids), idle_seconds=1e9)
+    for i, user_id in enumerate(user_ids):
+        backend.touch_at(user_id, now + i * 1e-3)
+    return backend
+
+
+def _measure(fill: Callable, user_ids: List[str]) -> Tuple[int, float, Any]:
+    gc.collect()
+    tracemalloc.start()
+    start = time.perf_counter()
+    store = fill(user_ids, time.time())
+    elapsed = time.perf_counter() - start
+    current, _peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return current, elapsed, store
+
+
+def main(users: int) -> None:
+    user_ids = [f"user-{i:07d}" for i in range(users)]
+    for name, fill in (
+        ("dict of dicts (old)", _legacy_fill),
+        ("__slots__ records, LRU order", _slots_fill),
+    ):
+        size, elapsed, store = _measure(fill, user_ids)
+        print(
+            f"{name:<30} {size / 2**20:8.1f} MiB  {size / users:6.1f} B/user  "
+            f"fill {elapsed:5.2f}s (under tracemalloc)"
+        )
+        del store
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--users", type=int, default=1_000_000)
+    args = parser.parse_args()
+    main(args.users)
@@ -0,0 +1,91 @@
+"""
+Worker cold start: time and resident memory to import `app.main` in a
+fresh interpreter, with the heavy dependencies (Gemini client, lxml,
+passlib) left lazy vs loaded eagerly (what every worker paid at import
+before they were deferred). Also lists the slowest imports from
+`python -X importtime`.
+
+Each measurement runs in its own subprocess; medians over `--runs`.
+
+    python -m benchmarks.startup --runs 7
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+from typing import Dict, List, Tuple
+
+_CHILD = """
+import json, resource, time
+t0 = time.perf_counter()
+import app.main
+t1 = time.perf_counter()
+if {eager!r}:
+    app.main._preload()
+t2 = time.perf_counter()
+print(json.dumps({{
+    "import_s": t1 - t0,
+    "total_s": t2 - t0,
+    "rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+}}))
+"""
+
+
+def _env() -> Dict[str, str]:
+    env = dict(os.environ)
+    env.setdefault("GEMINI_API_KEY", "benchmark-key")
+    env.setdefault("JWT_SECRET", "benchmark-secret")
+    return env
+
+
+def _run(eager: bool) -> Dict[str, float]:
+    out = subprocess.run(
+        [sys.executable, "-c", _CHILD.format(eager=eager)],
+        capture_output=True,
+        text=True,
+        check=True,
+        env=_env(),
+    )
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+
+def _slowest_imports(top: int) -> List[Tuple[int, str]]:
+    out = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import app.main"],
+        capture_output=True,
+        text=True,
+        check=True,
+        env=_env(),
+    )
+    rows = []
+    for line in out.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        rows.append((int(cumulative_us), name.rstrip()))
+    return sorted(rows, reverse=True)[:top]
+
+
+def main(runs: int, top: int) -> None:
+    _run(eager=False)  # warm the .pyc cache
+    for label, eager in (("lazy (current)", False), ("eager (preloaded)", True)):
+        samples = [_run(eager) for _ in range(runs)]
+        total = statistics.median(s["total_s"] for s in samples)
+        rss = statistics.median(s["rss_mb"] for s in samples)
+        print(f"{label:<18} import app.main: {total * 1000:7.1f}ms   max RSS: {rss:6.1f} MB")
+
+    print("\nslowest imports (cumulative, lazy):")
+    for cumulative_us, name in _slowest_imports(top):
+        print(f"  {cumulative_us / 1000:7.1f}ms  {name}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument("--runs", type=int, default=7)
+    parser.add_argument("--top", type=int, default=15)
+    args = parser.parse_args()
+    main(args.runs, args.top)
@@ -0,0 +1,91 @@
+"""
+Local stand-in for the DuckDuckGo HTML endpoint and the Google News RSS feed.
+
+Serves the recorded pages in benchmarks/fixtures/ over HTTP/1.1 keep-alive:
+- /html: the fixture is picked by the first query word that matches a
+  fixture name (duckduckgo_<word>.html), otherwise the first one is served
+- /rss/search: google_news_sample.xml
+"""
+import argparse
+import threading
+import time
+import urllib.parse
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Dict, Tuple
+
+FIXTURES_DIR = Path(__file__).parent / "fixtures"
+
+
+def load_rss_fixture() -> bytes:
+    return (FIXTURES_DIR / "google_news_sample.xml").read_bytes()
+
+
+def load_fixtures() -> Dict[str, bytes]:
+    pages: Dict[str, bytes] = {}
+    for path in sorted(FIXTURES_DIR.glob("duckduckgo_*.html")):
+        pages[path.stem.split("_", 1)[1]] = path.read_bytes()
+    return pages
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # keep-alive
+    pages: Dict[str, bytes] = {}
+    rss: bytes = b""
+    latency_seconds: float = 0.0
+
+    def do_GET(self):  # noqa: N802 (http.server naming)
+        parts = urllib.parse.urlsplit(self.path)
+        if parts.path.startswith("/rss"):
+            body, content_type = self.rss, "application/rss+xml; charset=UTF-8"
+        else:
+            query = urllib.parse.parse_qs(parts.query)
+            words = " ".join(query.get("q", [""])).lower().split()
+            body = next(
+                (self.pages[w] for w in words if w in self.pages),
+                next(iter(self.pages.values())),
+            )
+            content_type = "text/html; charset=UTF-8"
+        if self.latency_seconds:
+            time.sleep(self.latency_seconds)
+        self.send_response(200)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):  # silence per-request logging
+        pass
+
+
+def start_stub_server(
+    port: int = 0, latency_seconds: float = 0.0
+) -> Tuple[ThreadingHTTPServer, str]:
+    """Start the stub in a daemon thread; returns (server, base_url)."""
+    handler = type(
+        "StubHandler",
+        (_Handler,),
+        {
+            "pages": load_fixtures(),
+            "rss": load_rss_fixture(),
+            "latency_seconds": latency_seconds,
+        },
+    )
+    server = ThreadingHTTPServer(("127.0.0.1", port), handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    host, real_port = server.server_address[:2]
+    return server, f"http://{host}:{real_port}"
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency", type=float, default=0.0)
+    args = parser.parse_args()
+    server, url = start_stub_server(args.port, args.latency)
+    print(f"stub search server on {url}/html and {url}/rss/search")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
@@ -0,0 +1,192 @@
+"""
+Throughput with 1, 2, 4 and 8 worker processes (`python -m app.serve`).
+
+For each worker count, starts the app as a separate process tree with the
+offline fakes (benchmarks/fake_app.py) against the stub search server,
+logs in, then drives `/analyze/{sector}` at a fixed concurrency (same
+Zipf mix as load_test). With `--cache-ttl 0` (default) every request runs
+the pipeline, so throughput is bound by server CPU.
+
+Also checks that state is shared: all requests use one user whose
+rate-limit bucket is far from empty, so the `X-RateLimit-Remaining` seen
+at the end must equal capacity minus every request charged, whichever
+worker served it (per-process buckets would each see only their share).
+
+Scaling needs cores: compare `cpus` in the output before reading the
+numbers.
+
+    python -m benchmarks.workers --workers 1 2 4 8 --requests 2000
+"""
+import argparse
+import asyncio
+import os
+import random
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Dict, List
+
+from benchmarks.load_test import SECTORS, USERS, _percentile, _zipf_weights
+
+# practically no refill during a run: remaining = capacity - charged
+RATE_CAPACITY = 10**9
+RATE_WINDOW_SECONDS = 10**12
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def _wait_listening(port: int, timeout: float = 30.0) -> None:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            socket.create_connection(("127.0.0.1", port), timeout=1).close()
+            return
+        except OSError:
+            time.sleep(0.1)
+    raise SystemExit(f"nothing listening on port {port}")
+
+
+def _start_stub(latency: float):
+    # own process: the driver's GIL shouldn't limit the search stub
+    port = _free_port()
+    proc = subprocess.Popen(
+        [sys.executable, "-m", "benchmarks.stub_server", "--port", str(port), "--latency", str(latency)],
+        stdout=subprocess.DEVNULL,
+    )
+    _wait_listening(port)
+    return proc, f"http://127.0.0.1:{port}"
+
+
+def _start_app(workers: int, port: int, stub_url: str, args: argparse.Namespace, state_dir: str):
+    env = dict(os.environ)
+    env.update(
+        {
+            "GEMINI_API_KEY": env.get("GEMINI_API_KEY", "benchmark-key"),
+            "JWT_SECRET": env.get("JWT_SECRET", "benchmark-secret"),
+            "STUB_SEARCH_URL": stub_url,
+            "FAKE_GEMINI_LATENCY": str(args.gemini_latency),
+            "RATE_LIMIT_REQUESTS": str(RATE_CAPACITY),
+            "RATE_LIMIT_WINDOW_SECONDS": str(RATE_WINDOW_SECONDS),
+            "PREWARM_ENABLED": "false",
+            "REPORT_CACHE_TTL_SECONDS": str(args.cache_ttl),
+            "REPORT_STORE_PATH": os.path.join(state_dir, "reports.sqlite3"),
+            "SHARED_STATE_DIR": state_dir,
+        }
+    )
+    return subprocess.Popen(
+        [
+            sys.executable, "-m", "app.serve",
+            "--app", "benchmarks.fake_app:app",
+            "--workers", str(workers),
+            "--port", str(port),
+            "--log-level", "warning",
+        ],
+        env=env,
+    )
+
+
+async def _wait_healthy(url: str, timeout: float = 60.0) -> None:
+    import httpx
+
+    deadline = time.monotonic() + timeout
+    async with httpx.AsyncClient(base_url=url) as client:
+        while time.monotonic() < deadline:
+            try:
+                if (await client.get("/health")).status_code == 200:
+                    return
+            except httpx.TransportError:
+                pass
+            await asyncio.sleep(0.2)
+    raise SystemExit(f"server at {url} did not become healthy")
+
+
+async def _drive(url: str, args: argparse.Namespace) -> Dict[str, float]:
+    import httpx
+
+    limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+    async with httpx.AsyncClient(base_url=url, limits=limits, timeout=120.0) as client:
+        username, password = USERS[0]
+        resp = await client.post("/token", data={"username": username, "password": password})
+        headers = {"Authorization": f"Bearer {resp.json()['access_token']}"}
+
+        rng = random.Random(args.seed)
+        picks = rng.choices(SECTORS, weights=_zipf_weights(len(SECTORS), 1.1), k=args.requests)
+        sem = asyncio.Semaphore(args.concurrency)
+        latencies: List[float] = []
+        errors = 0
+
+        async def analyze(sector: str) -> None:
+            nonlocal errors
+            async with sem:
+                start = time.perf_counter()
+                resp = await client.get(f"/analyze/{sector}", headers=headers)
+                latencies.append(time.perf_counter() - start)
+            if resp.status_code != 200:
+                errors += 1
+
+        start = time.perf_counter()
+        await asyncio.gather(*(analyze(s) for s in picks))
+        elapsed = time.perf_counter() - start
+
+        resp = await client.get(f"/analyze/{SECTORS[0]}", headers=headers)
+        charged = RATE_CAPACITY - int(resp.headers["X-RateLimit-Remaining"])
+
+    return {
+        "rps": len(latencies) / elapsed,
+        "p50_ms": _percentile(latencies, 50) * 1000,
+        "p99_ms": _percentile(latencies, 99) * 1000,
+        "errors": errors,
+        # requests the shared bucket saw (the final one included)
+        "charged": charged,
+        "sent": args.requests + 1,
+    }
+
+
+def main(args: argparse.Namespace) -> None:
+    stub, stub_url = _start_stub(args.search_latency)
+    print(f"cpus available: {len(os.sched_getaffinity(0)) if hasattr(os, 'sched_getaffinity') else os.cpu_count()}")
+    baseline = None
+    try:
+        for workers in args.workers:
+            state_dir = tempfile.mkdtemp(prefix="bench-workers-")
+            port = _free_port()
+            proc = _start_app(workers, port, stub_url, args, state_dir)
+            try:
+                url = f"http://127.0.0.1:{port}"
+                asyncio.run(_wait_healthy(url))
+                r = asyncio.run(_drive(url, args))
+            finally:
+                proc.terminate()
+                proc.wait(timeout=30)
+                shutil.rmtree(state_dir, ignore_errors=True)
+            baseline = baseline or r["rps"]
+            print(
+                f"{workers} worker(s): {r['rps']:8.1f} rps (x{r['rps'] / baseline:.2f})  "
+                f"p50={r['p50_ms']:7.1f}ms  p99={r['p99_ms']:7.1f}ms  err={r['errors']}  "
+                f"rate-limit charges {r['charged']}/{r['sent']}"
+                + ("" if r["charged"] == r["sent"] else "  <- NOT SHARED")
+            )
+    finally:
+        stub.terminate()
+        stub.wait(timeout=10)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4, 8])
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=64)
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--gemini-latency", type=float, default=0.05, help="seconds per fake Gemini call")
+    parser.add_argument("--search-latency", type=float, default=0.0, help="seconds per stub search request")
+    parser.add_argument("--cache-ttl", type=int, default=0, help="REPORT_CACHE_TTL_SECONDS")
+    main(parser.parse_args())
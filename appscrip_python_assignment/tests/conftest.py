@@ -0,0 +1,7 @@
+import os
+import tempfile
+
+# required settings, and no report history left behind in the working tree
+os.environ.setdefault("GEMINI_API_KEY", "test-key")
+os.environ.setdefault("JWT_SECRET", "test-secret")
+os.environ.setdefault("REPORT_STORE_PATH", os.path.join(tempfile.mkdtemp(), "reports.sqlite3"))
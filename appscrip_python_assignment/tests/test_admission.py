@@ -0,0 +1,54 @@
+import pytest
+
+from app.core import metrics
+from app.core.admission import AdmissionController
+
+
+def _controller(**overrides) -> AdmissionController:
+    options = dict(
+        enabled=True,
+        initial_limit=34,
+        min_limit=4,
+        max_limit=64,
+        max_queue=16,
+        queue_timeout_seconds=5.0,
+        latency_tolerance=2.0,
+        backoff=0.75,
+    )
+    options.update(overrides)
+    return AdmissionController(**options)
+
+
+def test_one_freak_fast_sample_does_not_move_the_baseline():
+    admission = _controller()
+    for _ in range(100):
+        admission.observe("gemini.call", 1.0)
+    admission.observe("gemini.call", 2.6e-6)
+    for _ in range(50):
+        admission.observe("gemini.call", 1.0)
+
+    assert admission.limit == 34
+    assert admission.limit_decreases == 0
+
+
+def test_sustained_slowdown_cuts_the_limit():
+    admission = _controller()
+    for _ in range(100):
+        admission.observe("gemini.call", 1.0)
+    for _ in range(10):
+        admission.observe("gemini.call", 3.0)
+
+    assert admission.limit == 25
+
+
+def test_failed_blocks_are_not_observed(monkeypatch):
+    seen = []
+    monkeypatch.setitem(metrics._stage_observers, "test.stage", [lambda stage, s: seen.append(stage)])
+
+    with metrics.timed("test.stage"):
+        pass
+    with pytest.raises(RuntimeError):
+        with metrics.timed("test.stage"):
+            raise RuntimeError("circuit open")
+
+    assert seen == ["test.stage"]
@@ -0,0 +1,108 @@
+import asyncio
+
+import pytest
+from fastapi import HTTPException
+
+from app.core import rate_limiter
+from app.core.cache import report_cache
+from app.schemas.analyze import AIAnalysis, CollectedData, MarketItem
+from app.services import batch
+from app.services.llm_scheduler import CircuitOpenError
+
+
+def _collected(sector: str) -> CollectedData:
+    item = MarketItem(
+        title=f"{sector} orders rise", url=f"https://news.example.com/{sector}",
+        snippet=f"{sector} demand and margins improved this quarter", source="duckduckgo",
+    )
+    return CollectedData(sector=sector, items=[item])
+
+
+async def _collect(sector: str, country: str = "India") -> CollectedData:
+    return _collected(sector)
+
+
+def _run(sectors, pack_prompts):
+    async def _items():
+        return [item async for item in batch.run_batch(sectors, pack_prompts=pack_prompts)]
+
+    return {item.sector: item for item in asyncio.run(_items())}
+
+
+def test_packed_sector_missing_from_response_fails_alone(monkeypatch):
+    async def analyze_many(collected_list):
+        # the model leaves every sector but the first out of its answer
+        return {collected_list[0].sector: AIAnalysis(summary="fine")}
+
+    monkeypatch.setattr(batch, "collect_sector_info", _collect)
+    monkeypatch.setattr(batch, "analyze_many_with_gemini", analyze_many)
+    items = _run(["packa", "packb", "packc"], pack_prompts=True)
+
+    assert items["packa"].status == "ok"
+    assert [items[s].status for s in ("packb", "packc")] == ["error", "error"]
+    assert "missing" in items["packb"].detail
+
+
+def test_cached_sectors_are_served_without_a_call(monkeypatch):
+    report_cache.put("cachedx", "India", _collected("cachedx"), AIAnalysis(summary="cached"))
+    packed = []
+
+    async def analyze_many(collected_list):
+        packed.extend(c.sector for c in collected_list)
+        return {c.sector: AIAnalysis(summary="fresh") for c in collected_list}
+
+    monkeypatch.setattr(batch, "collect_sector_info", _collect)
+    monkeypatch.setattr(batch, "analyze_many_with_gemini", analyze_many)
+    items = _run(["cachedx", "freshy"], pack_prompts=True)
+
+    assert {s: i.status for s, i in items.items()} == {"cachedx": "ok", "freshy": "ok"}
+    assert packed == ["freshy"]
+
+
+def test_open_circuit_degrades_each_packed_sector(monkeypatch):
+    async def analyze_many(collected_list):
+        raise CircuitOpenError("Gemini circuit breaker is open")
+
+    monkeypatch.setattr(batch, "collect_sector_info", _collect)
+    monkeypatch.setattr(batch, "analyze_many_with_gemini", analyze_many)
+    items = _run(["openpacka", "openpackb"], pack_prompts=True)
+
+    assert [items[s].status for s in ("openpacka", "openpackb")] == ["ok", "ok"]
+    assert report_cache.peek("openpacka", "India").degraded
+
+
+def test_single_request_joins_a_pack_in_flight(monkeypatch):
+    calls = []
+
+    async def analyze_many(collected_list):
+        calls.append([c.sector for c in collected_list])
+        await asyncio.sleep(0.05)
+        return {c.sector: AIAnalysis(summary="packed") for c in collected_list}
+
+    async def pipeline():
+        calls.append("single")
+        return _collected("joinpacka"), AIAnalysis(summary="single")
+
+    monkeypatch.setattr(batch, "collect_sector_info", _collect)
+    monkeypatch.setattr(batch, "analyze_many_with_gemini", analyze_many)
+
+    async def scenario():
+        items = asyncio.ensure_future(
+            batch._run_packed(["joinpacka", "joinpackb"], asyncio.Semaphore(2))
+        )
+        await asyncio.sleep(0.01)
+        entry = await report_cache.get_or_load("joinpacka", "India", pipeline)
+        return entry, await items
+
+    entry, items = asyncio.run(scenario())
+
+    assert calls == [["joinpacka", "joinpackb"]]
+    assert entry.analysis.summary == "packed"
+    assert [item.status for item in items] == ["ok", "ok"]
+
+
+def test_batch_larger_than_its_budget_is_rejected_without_retry_after():
+    with pytest.raises(HTTPException) as exc_info:
+        asyncio.run(rate_limiter.charge_rate_limit("alice", cost=5, limit=3, bucket="batch"))
+    assert exc_info.value.status_code == 413
+    assert "Retry-After" not in (exc_info.value.headers or {})
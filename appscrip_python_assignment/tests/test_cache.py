@@ -0,0 +1,118 @@
+import asyncio
+
+from app.core.cache import ReportCache
+from app.schemas.analyze import AIAnalysis, CollectedData
+
+
+def _cache(**overrides) -> ReportCache:
+    options = dict(ttl_seconds=60, stale_seconds=60, max_entries=10, max_bytes=10**6)
+    options.update(overrides)
+    return ReportCache(**options)
+
+
+class Loader:
+    """Pipeline stand-in: counts runs, answers after `latency`."""
+
+    def __init__(self, summary: str = "fresh", latency: float = 0.0, degraded: bool = False):
+        self.summary = summary
+        self.latency = latency
+        self.degraded = degraded
+        self.runs = 0
+
+    async def __call__(self):
+        self.runs += 1
+        await asyncio.sleep(self.latency)
+        return (
+            CollectedData(sector="pharma", items=[]),
+            AIAnalysis(summary=f"{self.summary} {self.runs}", degraded=self.degraded),
+        )
+
+
+def _age(cache: ReportCache, seconds: float) -> None:
+    for entry in cache._entries.values():
+        entry.created_at -= seconds
+
+
+def test_concurrent_misses_share_one_run():
+    cache = _cache()
+    loader = Loader(latency=0.02)
+
+    async def scenario():
+        return await asyncio.gather(*(cache.get_or_load("Pharma ", "India", loader) for _ in range(5)))
+
+    entries = asyncio.run(scenario())
+
+    assert loader.runs == 1
+    assert all(entry is entries[0] for entry in entries)
+    assert (cache.misses, cache.coalesced) == (1, 4)
+
+
+def test_cancelled_caller_does_not_cancel_the_shared_run():
+    cache = _cache()
+    loader = Loader(latency=0.03)
+
+    async def scenario():
+        first = asyncio.ensure_future(cache.get_or_load("pharma", "India", loader))
+        second = asyncio.ensure_future(cache.get_or_load("pharma", "India", loader))
+        await asyncio.sleep(0.01)
+        first.cancel()
+        return await second
+
+    assert asyncio.run(scenario()).analysis.summary == "fresh 1"
+    assert loader.runs == 1
+
+
+def test_stale_entry_is_served_while_it_refreshes():
+    cache = _cache()
+    loader = Loader(latency=0.02)
+
+    async def scenario():
+        await cache.get_or_load("pharma", "India", loader)
+        _age(cache, 90)  # past the TTL, within the stale window
+        stale = await cache.get_or_load("pharma", "India", loader)
+        await asyncio.sleep(0.05)
+        return stale, await cache.get_or_load("pharma", "India", loader)
+
+    stale, refreshed = asyncio.run(scenario())
+
+    assert stale.analysis.summary == "fresh 1"
+    assert refreshed.analysis.summary == "fresh 2"
+    assert (cache.stale_hits, cache.hits) == (1, 1)
+
+
+def test_entry_past_the_stale_window_is_reloaded_in_line():
+    cache = _cache()
+    loader = Loader()
+
+    async def scenario():
+        await cache.get_or_load("pharma", "India", loader)
+        _age(cache, 200)
+        return await cache.get_or_load("pharma", "India", loader)
+
+    assert asyncio.run(scenario()).analysis.summary == "fresh 2"
+    assert cache.misses == 2
+
+
+def test_degraded_result_never_replaces_a_real_analysis():
+    cache = _cache()
+
+    async def scenario():
+        await cache.get_or_load("pharma", "India", Loader("real"))
+        _age(cache, 200)
+        return await cache.get_or_load("pharma", "India", Loader("fallback", degraded=True))
+
+    assert asyncio.run(scenario()).analysis.summary == "real 1"
+
+
+def test_lru_is_bounded_by_entry_count():
+    cache = _cache(max_entries=2)
+
+    async def scenario():
+        for sector in ("pharma", "steel", "cement"):
+            await cache.get_or_load(sector, "India", Loader())
+
+    asyncio.run(scenario())
+
+    assert cache.peek("pharma", "India") is None
+    assert cache.peek("cement", "India") is not None
+    assert cache.stats()["evictions"] == 1
@@ -0,0 +1,79 @@
+import asyncio
+import threading
+
+from app.schemas.analyze import MarketItem
+from app.services import collector
+
+
+def _item(url: str, snippet: str = "orders rise", source: str = "duckduckgo") -> MarketItem:
+    return MarketItem(title=url, url=f"https://{url}", snippet=snippet, source=source)
+
+
+class FakeSource(collector.SourceAdapter):
+    name = "duckduckgo"
+
+    def __init__(self, *items: MarketItem, latency: float = 0.0, error: bool = False):
+        self.items = list(items)
+        self.latency = latency
+        self.error = error
+        self.unwound = False
+
+    async def fetch(self, sector, country):
+        try:
+            await asyncio.sleep(self.latency)
+            if self.error:
+                raise RuntimeError("search failed")
+            return self.items
+        finally:
+            self.unwound = True
+
+
+def test_keeps_sources_that_finished_by_the_deadline(monkeypatch):
+    monkeypatch.setattr(collector.settings, "collector_deadline_seconds", 0.1)
+    fast = FakeSource(_item("a.com/1"))
+    failing = FakeSource(error=True)
+    late = FakeSource(_item("b.com/1"), latency=5)
+
+    collected = asyncio.run(
+        collector.collect_sector_info("steel", sources=[fast, failing, late])
+    )
+
+    assert [item.title for item in collected.items] == ["a.com/1"]
+    # late sources are cancelled and awaited, not left running
+    assert late.unwound
+
+
+def test_no_results_falls_back():
+    collected = asyncio.run(collector.collect_sector_info("steel", sources=[FakeSource(error=True)]))
+
+    assert collected.source == "fallback"
+
+
+def test_merge_dedupes_and_ranks_items_several_sources_agree_on():
+    first = [_item("a.com/1"), _item("www.b.com/2/", snippet="short")]
+    second = [_item("b.com/2", snippet="a longer snippet", source="google_news"), _item("c.com/3")]
+
+    merged = collector._merge_and_rank([first, second], max_items=10)
+
+    assert [str(item.url) for item in merged] == [
+        "https://b.com/2", "https://a.com/1", "https://c.com/3",
+    ]
+    # the duplicate with the most text wins
+    assert merged[0].snippet == "a longer snippet"
+
+
+def test_rss_is_parsed_off_the_event_loop(monkeypatch):
+    parsed_on = []
+
+    async def fetch_text(url):
+        return "<rss/>"
+
+    def parse(xml_text):
+        parsed_on.append(threading.current_thread())
+        return []
+
+    monkeypatch.setattr(collector, "_fetch_text", fetch_text)
+    monkeypatch.setattr(collector, "_parse_google_news_rss", parse)
+    asyncio.run(collector.GoogleNewsRssSource().fetch("steel", "India"))
+
+    assert parsed_on and parsed_on[0] is not threading.main_thread()
@@ -0,0 +1,91 @@
+import asyncio
+import time
+
+import pytest
+from fastapi import FastAPI, HTTPException
+from fastapi.testclient import TestClient
+
+from app.core.diagnostics import ProfileStore, ProfilingMiddleware, SamplingProfiler
+from app.core.security import create_access_token, get_admin_user, get_user, is_admin_authorization
+
+
+def _bearer(username: str) -> str:
+    return "Bearer " + create_access_token({"sub": username})
+
+
+def test_admin_authorization():
+    assert is_admin_authorization(_bearer("prabal"))
+    assert not is_admin_authorization(_bearer("guest"))
+    assert not is_admin_authorization(_bearer("nobody"))
+    assert not is_admin_authorization("Bearer not-a-jwt")
+    assert not is_admin_authorization(None)
+
+
+def test_debug_endpoints_need_an_admin():
+    assert asyncio.run(get_admin_user(get_user("prabal"))).username == "prabal"
+    with pytest.raises(HTTPException) as denied:
+        asyncio.run(get_admin_user(get_user("guest")))
+    assert denied.value.status_code == 403
+
+
+@pytest.fixture
+def profiled_app():
+    store = ProfileStore(max_profiles=5)
+    app = FastAPI()
+
+    @app.get("/ping")
+    async def ping():
+        return {}
+
+    app.add_middleware(
+        ProfilingMiddleware,
+        profiler=SamplingProfiler(interval_seconds=0.001),
+        store=store,
+        header="X-Profile",
+        authorize=is_admin_authorization,
+    )
+    return TestClient(app), store
+
+
+@pytest.mark.parametrize(
+    "authorization, profiled",
+    [("prabal", True), ("guest", False), (None, False)],
+)
+def test_only_admins_can_profile_requests(profiled_app, authorization, profiled):
+    client, store = profiled_app
+    headers = {"X-Profile": "1"}
+    if authorization is not None:
+        headers["Authorization"] = _bearer(authorization)
+
+    response = client.get("/ping", headers=headers)
+
+    assert response.status_code == 200
+    assert ("x-profile-id" in response.headers) is profiled
+    assert len(store.list()) == int(profiled)
+
+
+def test_unsubscribed_profile_is_no_longer_written():
+    profiler = SamplingProfiler(interval_seconds=0.001)
+    counts = profiler.subscribe()
+    other = profiler.subscribe()
+    time.sleep(0.02)
+    profiler.unsubscribe(counts)
+    snapshot = dict(counts)
+    time.sleep(0.02)
+    profiler.unsubscribe(other)
+
+    assert snapshot and counts == snapshot
+    # sampling went on for the other subscriber
+    assert sum(other.values()) > sum(snapshot.values())
+
+
+@pytest.mark.parametrize("path", ["/cache/stats", "/auth/stats", "/llm/stats", "/admission/stats"])
+def test_ops_stats_need_an_admin(path):
+    from app.main import app
+
+    client = TestClient(app)
+
+    assert client.get(path).status_code == 401
+    assert client.get(path, headers={"Authorization": _bearer("guest")}).status_code == 403
+    assert client.get(path, headers={"Authorization": _bearer("prabal")}).status_code == 200
+    assert client.get("/metrics").status_code == 200
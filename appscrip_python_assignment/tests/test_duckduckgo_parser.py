@@ -0,0 +1,24 @@
+import pytest
+
+from benchmarks.stub_server import load_fixtures
+from app.services.collector import _extract_duckduckgo_results, _parse_duckduckgo_html
+
+PAGES = load_fixtures()
+
+
+@pytest.mark.parametrize("name", sorted(PAGES))
+@pytest.mark.parametrize("max_items", [1, 3, 8, 50])
+def test_streaming_extractor_matches_reference(name, max_items):
+    html = PAGES[name].decode("utf-8")
+    expected = _parse_duckduckgo_html(html, max_items=max_items)
+    assert expected, "fixture has no results"
+    assert _extract_duckduckgo_results(html, max_items=max_items) == expected
+
+
+def test_max_items_stops_early():
+    html = next(iter(PAGES.values())).decode("utf-8")
+    assert len(_extract_duckduckgo_results(html, max_items=2)) <= 2
+
+
+def test_page_without_results():
+    assert _extract_duckduckgo_results("<html><body><p>no results</p></body></html>") == []
@@ -0,0 +1,40 @@
+import asyncio
+
+from app.core import http_client
+
+
+def test_one_client_is_shared_until_closed():
+    async def scenario():
+        started = await http_client.start_http_client()
+        shared = http_client.get_http_client()
+        await http_client.close_http_client()
+        reopened = http_client.get_http_client()
+        await http_client.close_http_client()
+        return started, shared, reopened
+
+    started, shared, reopened = asyncio.run(scenario())
+
+    assert shared is started
+    assert started.is_closed
+    assert reopened is not started
+
+
+def test_host_slot_caps_concurrency_per_host(monkeypatch):
+    monkeypatch.setattr(http_client.settings, "http_per_host_concurrency", 2)
+    in_flight = {"a.example.com": 0, "b.example.com": 0}
+    peak = dict(in_flight)
+
+    async def request(host: str):
+        async with http_client.host_slot(f"https://{host}/search?q=steel"):
+            in_flight[host] += 1
+            peak[host] = max(peak[host], in_flight[host])
+            await asyncio.sleep(0.01)
+            in_flight[host] -= 1
+
+    async def scenario():
+        await asyncio.gather(*(request("a.example.com") for _ in range(6)), request("b.example.com"))
+        await http_client.close_http_client()
+
+    asyncio.run(scenario())
+
+    assert peak == {"a.example.com": 2, "b.example.com": 1}
@@ -0,0 +1,93 @@
+import asyncio
+import time
+
+import pytest
+
+from app.schemas.analyze import AIAnalysis, CollectedData, MarketItem
+from app.services import pipeline
+from app.services.incremental import DELTA, FULL, REUSED, Baseline, plan_refresh
+
+
+def _items(*ids: int, snippet: str = "orders rise") -> list:
+    return [
+        MarketItem(
+            title=f"story {i}", url=f"https://news.example.com/{i}",
+            snippet=f"{snippet} {i}", source="duckduckgo",
+        )
+        for i in ids
+    ]
+
+
+def _collected(items: list) -> CollectedData:
+    return CollectedData(sector="pharma", items=items)
+
+
+BASELINE = Baseline(
+    collected=_collected(_items(*range(10))),
+    analysis=AIAnalysis(summary="last time"),
+    generated_at=time.time() - 600,
+)
+
+
+@pytest.mark.parametrize(
+    "new, mode",
+    [(0, REUSED), (1, REUSED), (2, DELTA), (5, DELTA), (6, FULL), (10, FULL)],
+)
+def test_mode_follows_the_share_of_new_items(new, mode):
+    # 10 items, `new` of them not in the baseline (thresholds 15% / 50%)
+    collected = _collected(_items(*range(new, 10), *range(100, 100 + new)))
+
+    plan = plan_refresh(collected, BASELINE)
+
+    assert plan.mode == mode
+    if mode == DELTA:
+        assert [item.title for item in plan.new_items] == [f"story {i}" for i in range(100, 100 + new)]
+        assert plan.items_skipped == 10 - new
+
+
+def test_a_changed_snippet_is_a_new_item():
+    collected = _collected(_items(*range(5)) + _items(*range(5, 10), snippet="margins fall"))
+
+    assert plan_refresh(collected, BASELINE).mode == DELTA
+
+
+def test_no_baseline_or_an_old_full_analysis_means_full():
+    collected = _collected(_items(*range(10)))
+
+    assert plan_refresh(collected, None).mode == FULL
+    later = BASELINE.full_analysis_at + 7 * 3600
+    assert plan_refresh(collected, BASELINE, now=later).mode == FULL
+
+
+def test_delta_prompt_gets_only_new_items_and_the_previous_analysis():
+    collected = _collected(_items(*range(3, 10), 100, 101, 102))
+    plan = plan_refresh(collected, BASELINE)
+
+    sent, previous = plan.prompt_input(collected)
+    analysis = plan.finish(AIAnalysis(summary="updated"))
+
+    assert len(sent.items) == 3
+    assert previous is BASELINE.analysis
+    assert analysis.refresh == DELTA
+    # chains of deltas count their age from the full analysis they build on
+    assert analysis.full_analysis_at == BASELINE.generated_at
+
+
+def test_pipeline_reuses_the_baseline_without_calling_gemini(monkeypatch):
+    async def collect(sector, country="India"):
+        return _collected(_items(*range(10)))
+
+    async def load_baseline(sector, country):
+        return BASELINE
+
+    async def analyze(collected, previous=None):
+        raise AssertionError("Gemini should not be called")
+
+    monkeypatch.setattr(pipeline, "collect_sector_info", collect)
+    monkeypatch.setattr(pipeline, "load_baseline", load_baseline)
+    monkeypatch.setattr(pipeline, "analyze_with_gemini", analyze)
+
+    _, analysis = asyncio.run(pipeline.run_analysis_pipeline("pharma"))
+
+    assert analysis.summary == "last time"
+    assert analysis.refresh == REUSED
@@ -0,0 +1,47 @@
+import asyncio
+
+import pytest
+from fastapi import HTTPException, Response
+
+from app.api import routes_jobs
+from app.api.deps import clean_sector
+from app.core.security import get_user
+from app.schemas.analyze import AnalyzeJobRequest
+from app.services.jobs import InMemoryJobBackend
+
+
+def test_jobs_are_visible_to_their_submitter_only(monkeypatch):
+    monkeypatch.setattr(
+        routes_jobs, "job_backend", InMemoryJobBackend(max_queue=10, result_ttl_seconds=60)
+    )
+    owner, other = get_user("prabal"), get_user("guest")
+
+    async def scenario():
+        job = await routes_jobs.create_analyze_job(
+            AnalyzeJobRequest(sector="pharma"), Response(), current_user=owner
+        )
+        polled = await routes_jobs.get_analyze_job(job.id, current_user=owner)
+        with pytest.raises(HTTPException) as hidden:
+            await routes_jobs.get_analyze_job(job.id, current_user=other)
+        # the other user's request for the sector gets a job of its own
+        own = await routes_jobs.create_analyze_job(
+            AnalyzeJobRequest(sector="pharma"), Response(), current_user=other
+        )
+        again = await routes_jobs.create_analyze_job(
+            AnalyzeJobRequest(sector="pharma"), Response(), current_user=owner
+        )
+        return job, polled, hidden.value, own, again
+
+    job, polled, hidden, own, again = asyncio.run(scenario())
+
+    assert polled.id == job.id
+    assert hidden.status_code == 404
+    assert own.id != job.id
+    assert again.id == job.id
+
+
+@pytest.mark.parametrize("name", ["jobs", "batch", " Jobs "])
+def test_route_names_are_not_sectors(name):
+    with pytest.raises(HTTPException) as rejected:
+        clean_sector(name)
+    assert rejected.value.status_code == 400
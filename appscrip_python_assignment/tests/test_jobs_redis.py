@@ -0,0 +1,95 @@
+import asyncio
+
+import pytest
+
+from app.services.jobs import RedisJobBackend, new_job
+
+fakeredis = pytest.importorskip("fakeredis")  # requirements-dev.txt
+
+
+def _backends(count: int, lease_seconds: int = 30):
+    server = fakeredis.FakeServer()
+    return [
+        RedisJobBackend(
+            "redis://unused",
+            max_queue=10,
+            result_ttl_seconds=3600,
+            lease_seconds=lease_seconds,
+            poll_seconds=1,
+            client=fakeredis.FakeAsyncRedis(server=server),
+        )
+        for _ in range(count)
+    ]
+
+
+async def _crash(backend: RedisJobBackend) -> None:
+    """The worker process dies: no more heartbeats, and its lease runs out."""
+    backend._heartbeat.cancel()
+    await backend._client.delete(backend._key("alive", backend.consumer))
+
+
+def test_job_of_a_crashed_worker_is_requeued():
+    crashed, survivor = _backends(2)
+
+    async def scenario():
+        job = await crashed.submit(new_job("steel"))
+        taken = await crashed.next_job()
+        await _crash(crashed)
+
+        # still pending: a new request for the sector joins the lost job
+        assert (await survivor.submit(new_job("steel"))).id == job.id
+        requeued = await survivor.next_job()
+        return job, taken, requeued, await survivor.stats()
+
+    job, taken, requeued, stats = asyncio.run(scenario())
+
+    assert taken.id == requeued.id == job.id
+    assert stats["requeued"] == 1
+    assert stats["processing"] == 1
+    assert stats["consumers"] == 1
+
+
+def test_live_worker_keeps_its_jobs():
+    busy, other = _backends(2)
+
+    async def scenario():
+        await busy.submit(new_job("cement"))
+        await busy.next_job()
+        return await other.reap()
+
+    assert asyncio.run(scenario()) == 0
+
+
+def test_finished_job_leaves_processing_and_stops_deduplicating():
+    (backend,) = _backends(1)
+
+    async def scenario():
+        job = await backend.submit(new_job("textiles"))
+        job = await backend.next_job()
+        job.status = "done"
+        await backend.save(job)
+        again = await backend.submit(new_job("textiles"))
+        return job, again, await backend.stats()
+
+    job, again, stats = asyncio.run(scenario())
+
+    assert again.id != job.id
+    assert stats["processing"] == 0
+    assert stats["queued"] == 1
+
+
+def test_stopping_hands_unfinished_jobs_back_at_once():
+    stopping, other = _backends(2)
+
+    async def scenario():
+        job = await stopping.submit(new_job("shipping"))
+        await stopping.submit(new_job("mining"))
+        await stopping.next_job()
+        await stopping.close()
+        first = await other.next_job()
+        return job, first
+
+    job, first = asyncio.run(scenario())
+
+    # back at the front of the queue, ahead of the job that never started
+    assert first.id == job.id
@@ -0,0 +1,199 @@
+import asyncio
+import time
+
+import pytest
+from google.api_core import exceptions as google_exceptions
+
+from app.services.llm_scheduler import CircuitOpenError, DeadlineExceeded, LLMScheduler, within
+
+
+def _scheduler(**overrides) -> LLMScheduler:
+    options = dict(
+        max_concurrency=2,
+        timeout_seconds=1.0,
+        max_retries=2,
+        backoff_base_seconds=0.001,
+        backoff_max_seconds=0.01,
+        hedge_enabled=False,
+        breaker_failure_threshold=2,
+        breaker_reset_seconds=0.05,
+        request_deadline_seconds=5.0,
+    )
+    options.update(overrides)
+    return LLMScheduler(**options)
+
+
+class FakeModel:
+    """Answers with the queued outcomes in order (an exception is raised), then "ok"."""
+
+    def __init__(self, *outcomes, latency: float = 0.0):
+        self.outcomes = list(outcomes)
+        self.latency = latency
+        self.calls = 0
+
+    async def __call__(self):
+        self.calls += 1
+        await asyncio.sleep(self.latency)
+        outcome = self.outcomes.pop(0) if self.outcomes else "ok"
+        if isinstance(outcome, BaseException):
+            raise outcome
+        return outcome
+
+
+def _overloaded():
+    return google_exceptions.ServiceUnavailable("overloaded")
+
+
+async def _open_breaker(scheduler: LLMScheduler) -> None:
+    for _ in range(scheduler.breaker_failure_threshold):
+        with pytest.raises(google_exceptions.ServiceUnavailable):
+            await scheduler.run(FakeModel(*[_overloaded()] * (scheduler.max_retries + 1)))
+
+
+def test_retries_until_success():
+    scheduler = _scheduler()
+    model = FakeModel(_overloaded(), google_exceptions.TooManyRequests("slow down"))
+
+    assert asyncio.run(scheduler.run(model)) == "ok"
+    assert model.calls == 3
+    assert scheduler.retries == 2
+    assert scheduler.state == "closed"
+
+
+def test_gives_up_after_max_retries():
+    scheduler = _scheduler(max_retries=1, breaker_failure_threshold=5)
+    model = FakeModel(_overloaded(), _overloaded(), _overloaded())
+
+    with pytest.raises(google_exceptions.ServiceUnavailable):
+        asyncio.run(scheduler.run(model))
+    assert model.calls == 2
+    assert scheduler.failures == 1
+
+
+def test_non_retryable_error_is_not_retried_and_not_counted():
+    scheduler = _scheduler()
+    model = FakeModel(google_exceptions.BadRequest("bad prompt"))
+
+    with pytest.raises(google_exceptions.BadRequest):
+        asyncio.run(scheduler.run(model))
+    assert model.calls == 1
+    assert scheduler.failures == 0
+
+
+def test_breaker_opens_then_recovers_through_one_trial():
+    scheduler = _scheduler(max_retries=0)
+
+    async def scenario():
+        await _open_breaker(scheduler)
+        assert scheduler.state == "open"
+        with pytest.raises(CircuitOpenError):
+            await scheduler.run(FakeModel())
+
+        await asyncio.sleep(scheduler.breaker_reset_seconds)
+        assert scheduler.state == "half_open"
+        trial = asyncio.ensure_future(scheduler.run(FakeModel(latency=0.05)))
+        await asyncio.sleep(0.01)
+        # only the trial reaches the model while half-open
+        with pytest.raises(CircuitOpenError):
+            await scheduler.run(FakeModel())
+        assert await trial == "ok"
+        assert scheduler.state == "closed"
+
+    asyncio.run(scenario())
+
+
+def test_failed_trial_reopens_the_breaker():
+    scheduler = _scheduler(max_retries=0)
+
+    async def scenario():
+        await _open_breaker(scheduler)
+        await asyncio.sleep(scheduler.breaker_reset_seconds)
+        with pytest.raises(google_exceptions.ServiceUnavailable):
+            await scheduler.run(FakeModel(_overloaded()))
+        assert scheduler.state == "open"
+
+    asyncio.run(scenario())
+
+
+@pytest.mark.parametrize("entry", ["run", "guard"])
+def test_trial_cancelled_while_waiting_for_a_slot_is_released(entry):
+    scheduler = _scheduler(max_concurrency=1, max_retries=0)
+
+    async def trial():
+        if entry == "run":
+            return await scheduler.run(FakeModel())
+        async with scheduler.guard():
+            return "ok"
+
+    async def scenario():
+        await _open_breaker(scheduler)
+        await asyncio.sleep(scheduler.breaker_reset_seconds)
+        # every slot taken: the trial queues, then its client goes away
+        async with scheduler._slot(time.monotonic() + 1):
+            waiting = asyncio.ensure_future(trial())
+            await asyncio.sleep(0.01)
+            waiting.cancel()
+            with pytest.raises(asyncio.CancelledError):
+                await waiting
+        assert scheduler.state == "half_open"
+        assert await trial() == "ok"
+        assert scheduler.state == "closed"
+
+    asyncio.run(scenario())
+
+
+def test_deadline_bounds_attempts_and_backoff():
+    scheduler = _scheduler(
+        timeout_seconds=0.2, max_retries=10, backoff_base_seconds=0.05, request_deadline_seconds=0.3
+    )
+    model = FakeModel(latency=1.0)
+
+    start = time.monotonic()
+    with pytest.raises(DeadlineExceeded):
+        asyncio.run(scheduler.run(model))
+    assert time.monotonic() - start < 0.5
+    assert model.calls == 2
+    assert scheduler.failures == 0
+
+
+def test_attempt_cut_short_by_the_deadline_is_not_an_upstream_failure():
+    scheduler = _scheduler(breaker_failure_threshold=1, request_deadline_seconds=0.1)
+
+    async def scenario():
+        with pytest.raises(DeadlineExceeded):
+            await scheduler.run(FakeModel(latency=1.0))
+        with pytest.raises(DeadlineExceeded):
+            async with scheduler.guard() as deadline:
+                await within(deadline, asyncio.sleep(1.0))
+
+    asyncio.run(scenario())
+    assert scheduler.failures == 0
+    assert scheduler.deadline_exceeded == 2
+    assert scheduler.state == "closed"
+
+
+def test_deadline_bounds_the_wait_for_a_slot():
+    scheduler = _scheduler(max_concurrency=1, request_deadline_seconds=0.1)
+
+    async def scenario():
+        async with scheduler._slot(time.monotonic() + 1):
+            with pytest.raises(DeadlineExceeded):
+                await scheduler.run(FakeModel())
+            with pytest.raises(DeadlineExceeded):
+                async with scheduler.guard():
+                    pass
+
+    asyncio.run(scenario())
+    # our own queueing says nothing about the upstream
+    assert scheduler.failures == 0
+    assert scheduler.deadline_exceeded == 2
+
+
+def test_guard_yields_the_request_deadline():
+    scheduler = _scheduler(request_deadline_seconds=2.0)
+
+    async def scenario():
+        async with scheduler.guard() as deadline:
+            return deadline - time.monotonic()
+
+    assert 1.5 < asyncio.run(scenario()) <= 2.0
@@ -0,0 +1,76 @@
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+from app.core import session
+from app.core.cache import ReportCache
+from app.schemas.analyze import AIAnalysis, CollectedData
+from app.services import prewarm
+
+
+def _prewarmer(**overrides) -> prewarm.Prewarmer:
+    options = dict(
+        top_k=3, min_requests=2, interval_seconds=60, lead_seconds=30, jitter=0.0,
+        max_calls_per_minute=10,
+    )
+    options.update(overrides)
+    return prewarm.Prewarmer(**options)
+
+
+async def _pipeline(sector: str, country: str = "India"):
+    return CollectedData(sector=sector, items=[]), AIAnalysis(summary=f"warm {sector}")
+
+
+@pytest.fixture
+def cache(monkeypatch):
+    cache = ReportCache(ttl_seconds=300, stale_seconds=60, max_entries=10, max_bytes=10**6)
+    monkeypatch.setattr(prewarm, "report_cache", cache)
+    monkeypatch.setattr(prewarm, "run_analysis_pipeline", _pipeline)
+    monkeypatch.setattr(session, "_sector_hits", {})
+    return cache
+
+
+def _requested(**counts: int) -> None:
+    for sector, count in counts.items():
+        for _ in range(count):
+            session.record_sector_request(sector)
+
+
+def _cached(cache: ReportCache, sector: str, expires_in: float) -> None:
+    entry = cache.put(sector, "India", *asyncio.run(_pipeline(sector)))
+    entry.created_at -= cache.ttl_seconds - expires_in
+
+
+def test_picks_hot_sectors_that_are_missing_or_about_to_expire(cache):
+    _requested(pharma=5, steel=4, cement=3, shipping=1, textiles=2)
+    _cached(cache, "steel", expires_in=10)  # within the 30 s lead
+    _cached(cache, "cement", expires_in=200)
+
+    # top 3 by requests; shipping is below min_requests, textiles outside the top
+    assert _prewarmer().due_sectors() == ["pharma", "steel"]
+
+
+def test_refreshes_within_the_call_budget(cache):
+    _requested(pharma=5, steel=4, cement=3)
+    prewarmer = _prewarmer(max_calls_per_minute=2)
+
+    async def scenario():
+        started = await prewarmer.run_once()
+        await asyncio.gather(*prewarmer._refreshing.values())
+        return started
+
+    assert asyncio.run(scenario()) == 2
+    assert prewarmer.skipped_budget == 1
+    assert prewarmer.refreshed == 2
+    assert cache.peek("pharma", "India").analysis.summary == "warm pharma"
+    assert cache.peek("cement", "India") is None
+
+
+def test_pauses_while_the_breaker_is_not_closed(cache, monkeypatch):
+    _requested(pharma=5)
+    monkeypatch.setattr(prewarm, "gemini_scheduler", SimpleNamespace(state="open"))
+    prewarmer = _prewarmer()
+
+    assert asyncio.run(prewarmer.run_once()) == 0
+    assert prewarmer.skipped_breaker == 1
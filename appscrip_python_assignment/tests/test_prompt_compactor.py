@@ -0,0 +1,23 @@
+from app.core.metrics import PROMPT_TOKENS
+from app.services.prompt_compactor import PromptStats
+
+
+def _count(kind: str) -> float:
+    prefix = f'{PROMPT_TOKENS.name}_count{{kind="{kind}"}} '
+    lines = [line for line in PROMPT_TOKENS.samples() if line.startswith(prefix)]
+    return float(lines[0].split()[-1]) if lines else 0.0
+
+
+def test_every_prompt_size_is_recorded_not_just_the_last():
+    stats = PromptStats()
+    before = {kind: _count(kind) for kind in ("estimated", "actual")}
+
+    stats.record(1200, 1500)
+    stats.record(3000, 3000)
+    stats.record_actual(1100)
+    stats.record_actual(None)  # not reported: not a sample
+
+    assert _count("estimated") - before["estimated"] == 2
+    assert _count("actual") - before["actual"] == 1
+    assert stats.stats()["estimated_tokens_saved"] == 300
+    assert stats.stats()["last_estimated_tokens"] == 3000
@@ -0,0 +1,97 @@
+import asyncio
+
+import pytest
+from fastapi import HTTPException, Response
+
+from app.core import rate_limiter
+from app.core.rate_limiter import RedisBackend
+
+fakeredis = pytest.importorskip("fakeredis")  # requirements-dev.txt
+
+
+def _backend(idle_seconds: float = 60.0) -> RedisBackend:
+    return RedisBackend("redis://unused", idle_seconds=idle_seconds, client=fakeredis.FakeAsyncRedis())
+
+
+def test_takes_tokens_until_the_bucket_is_empty():
+    async def scenario():
+        backend = _backend()
+        results = [await backend.consume("alice", 1, capacity=3, refill_per_second=0.1) for _ in range(4)]
+        return backend, results
+
+    _, results = asyncio.run(scenario())
+
+    assert [r.allowed for r in results] == [True, True, True, False]
+    assert [round(r.remaining, 1) for r in results[:3]] == [2, 1, 0]
+    # one token short at 0.1 tokens/s: 10 s (minus the few ms since the last call)
+    assert 9.9 < results[3].retry_after <= 10
+
+
+def test_retry_after_covers_the_whole_cost():
+    async def scenario():
+        backend = _backend()
+        await backend.consume("bob", 4, capacity=5, refill_per_second=1)
+        return await backend.consume("bob", 3, capacity=5, refill_per_second=1)
+
+    result = asyncio.run(scenario())
+
+    assert not result.allowed
+    assert 1.9 < result.retry_after <= 2
+    assert 0.99 < result.remaining < 1.1
+
+
+def test_refills_with_time():
+    async def scenario():
+        backend = _backend()
+        for _ in range(2):
+            await backend.consume("carol", 1, capacity=2, refill_per_second=20)
+        denied = await backend.consume("carol", 1, capacity=2, refill_per_second=20)
+        await asyncio.sleep(0.1)  # two tokens' worth
+        allowed = await backend.consume("carol", 1, capacity=2, refill_per_second=20)
+        return denied, allowed
+
+    denied, allowed = asyncio.run(scenario())
+
+    assert not denied.allowed
+    assert allowed.allowed
+    # refill is capped at capacity
+    assert allowed.remaining <= 1
+
+
+def test_buckets_are_per_key_and_expire_when_idle():
+    async def scenario():
+        backend = _backend(idle_seconds=30)
+        await backend.consume("dave", 3, capacity=3, refill_per_second=0.01)
+        other = await backend.consume("batch:dave", 1, capacity=3, refill_per_second=0.01)
+        # an empty bucket takes 300 s to refill, longer than idle_seconds
+        ttl = await backend._client.ttl("ratelimit:dave")
+        return other, ttl
+
+    other, ttl = asyncio.run(scenario())
+
+    assert other.allowed
+    assert ttl == 300
+
+
+def test_charge_rate_limit_headers(monkeypatch):
+    monkeypatch.setattr(rate_limiter.settings, "rate_limit_requests", 2)
+    monkeypatch.setattr(rate_limiter.settings, "rate_limit_window_seconds", 60)
+
+    async def scenario():
+        monkeypatch.setattr(rate_limiter, "_backend", _backend())
+        response = Response()
+        await rate_limiter.charge_rate_limit("erin", response=response)
+        await rate_limiter.charge_rate_limit("erin")
+        with pytest.raises(HTTPException) as denied:
+            await rate_limiter.charge_rate_limit("erin")
+        return response, denied.value
+
+    response, denied = asyncio.run(scenario())
+
+    assert response.headers["X-RateLimit-Limit"] == "2"
+    assert response.headers["X-RateLimit-Remaining"] == "1"
+    assert "Retry-After" not in response.headers
+    assert denied.status_code == 429
+    assert denied.headers["X-RateLimit-Remaining"] == "0"
+    # 2 tokens per 60 s: one token back in 30 s
+    assert denied.headers["Retry-After"] == "30"
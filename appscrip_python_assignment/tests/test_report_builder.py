@@ -0,0 +1,81 @@
+from datetime import datetime
+
+import pytest
+
+from app.schemas.analyze import AIAnalysis, CollectedData, MarketItem
+from app.services import report_builder
+from app.services.report_builder import (
+    ANALYSIS_SECTIONS,
+    build_html_report,
+    build_markdown_report,
+    build_report_document,
+)
+
+GENERATED_AT = datetime(2026, 3, 4, 5, 6, 7)
+
+COLLECTED = CollectedData(
+    sector="pharma",
+    items=[
+        MarketItem(
+            title="Exports <rise>", url="https://news.example.com/a?x=1&y=2",
+            snippet="API makers & CDMOs add capacity", source="duckduckgo",
+        ),
+        MarketItem(title="No link", url=None, snippet="", source="google_news"),
+    ],
+)
+FULL = AIAnalysis(
+    summary="Steady demand.",
+    time_horizon="6-12 months",
+    opportunities=["US generics", "CDMO"],
+    risks=["Pricing"],
+    evidence_points=["Order books up"],
+)
+EMPTY = AIAnalysis(summary="")
+
+
+@pytest.mark.parametrize("analysis", [FULL, EMPTY])
+def test_markdown_matches_the_streamed_sections(analysis):
+    lines = report_builder.render_header(COLLECTED, GENERATED_AT)
+    for render in ANALYSIS_SECTIONS.values():
+        lines += render(analysis)
+    lines += report_builder.render_sources(COLLECTED) + report_builder.render_footer()
+
+    assert build_markdown_report(COLLECTED, analysis, GENERATED_AT) == "\n".join(lines)
+
+
+def test_markdown_sections_and_placeholders():
+    full = build_markdown_report(COLLECTED, FULL, GENERATED_AT)
+    empty = build_markdown_report(COLLECTED, EMPTY, GENERATED_AT)
+
+    assert full.startswith("# Trade Opportunities Report — Pharma (India)\n\n_Generated at: 2026-03-04 05:06 UTC_")
+    assert "1. US generics\n2. CDMO\n" in full
+    assert "- 6-12 months" in full
+    assert "Suggested Time Horizon" not in empty
+    assert "No summary available." in empty
+    assert "- No specific opportunities identified." in empty
+    assert "- URL: https://news.example.com/a?x=1&y=2" in full
+
+
+def test_same_generation_time_gives_the_same_text():
+    assert build_markdown_report(COLLECTED, FULL, GENERATED_AT) == build_markdown_report(
+        COLLECTED, FULL, GENERATED_AT
+    )
+
+
+def test_html_escapes_collected_text():
+    html = build_html_report(COLLECTED, FULL, GENERATED_AT)
+
+    assert "<h3>Exports &lt;rise&gt;</h3>" in html
+    assert "API makers &amp; CDMOs" in html
+    assert 'href="https://news.example.com/a?x=1&amp;y=2"' in html
+    assert "<ol>\n<li>US generics</li>\n<li>CDMO</li>\n</ol>" in html
+    assert html.rstrip().endswith("</html>")
+
+
+def test_document_carries_the_structured_report():
+    document = build_report_document(COLLECTED, FULL, GENERATED_AT)
+
+    assert document.title == "Trade Opportunities Report — Pharma (India)"
+    assert document.opportunities == ["US generics", "CDMO"]
+    assert [item.title for item in document.sources] == ["Exports <rise>", "No link"]
+    assert not document.degraded
@@ -0,0 +1,90 @@
+import asyncio
+
+from fastapi import Response
+
+from app.api import deps, routes_analyze
+from app.api.routes_reports import report_history
+from app.core.report_store import report_store
+from app.core.security import get_user
+from app.schemas.analyze import AIAnalysis, CollectedData, MarketItem
+from app.services import pipeline
+from app.services.incremental import FULL, RefreshPlan
+
+
+async def _collect(sector: str, country: str = "India") -> CollectedData:
+    item = MarketItem(
+        title=f"{sector} exports grow", url=f"https://news.example.com/{sector}",
+        snippet=f"{sector} order books are full", source="duckduckgo",
+    )
+    return CollectedData(sector=sector, items=[item])
+
+
+async def _full_plan(collected: CollectedData) -> RefreshPlan:
+    return RefreshPlan(FULL)
+
+
+async def _analyze(collected, previous=None) -> AIAnalysis:
+    return AIAnalysis(summary="busy", opportunities=["exports"])
+
+
+async def _analyze_sector(sector: str, **headers):
+    options = dict(format=None, accept=None, if_none_match=None, if_modified_since=None)
+    options.update(headers)
+    return await routes_analyze.analyze_sector(
+        sector, Response(), current_user=get_user("prabal"), **options
+    )
+
+
+def test_fresh_reports_and_304s_are_not_charged(monkeypatch):
+    charged = []
+
+    async def charge(user_id, cost=1.0, response=None, **kwargs):
+        charged.append(user_id)
+
+    monkeypatch.setattr(deps, "charge_rate_limit", charge)
+    monkeypatch.setattr(pipeline, "collect_sector_info", _collect)
+    monkeypatch.setattr(pipeline, "plan_analysis", _full_plan)
+    monkeypatch.setattr(pipeline, "analyze_with_gemini", _analyze)
+
+    async def scenario():
+        first = await _analyze_sector("etagged")
+        markdown = await _analyze_sector("etagged", format="markdown")
+        etag = markdown.headers["ETag"]
+        unchanged = await _analyze_sector("etagged", format="markdown", if_none_match=f"W/{etag}")
+        other_format = await _analyze_sector("etagged", format="html", if_none_match=etag)
+        since = await _analyze_sector(
+            "etagged", if_modified_since=markdown.headers["Last-Modified"]
+        )
+        return first, etag, unchanged, other_format, since
+
+    first, etag, unchanged, other_format, since = asyncio.run(scenario())
+
+    assert first.report.summary == "busy"
+    assert etag.endswith('-markdown"')
+    assert unchanged.status_code == 304
+    assert unchanged.headers["ETag"] == etag
+    assert other_format.status_code == 200
+    assert since.status_code == 304
+    # only the request that ran the pipeline
+    assert charged == ["prabal"]
+
+
+def test_history_pages_newest_first():
+    async def scenario():
+        for generated_at in range(1, 6):
+            await report_store.save("paged", "India", float(generated_at), f"report {generated_at}")
+        pages, before = [], None
+        while True:
+            page = await report_history(
+                "paged", limit=2, before=before, include_reports=True, current_user=None
+            )
+            pages.append([item.markdown_report for item in page.items])
+            before = page.next_before
+            if before is None:
+                return pages
+
+    assert asyncio.run(scenario()) == [
+        ["report 5", "report 4"],
+        ["report 3", "report 2"],
+        ["report 1"],
+    ]
@@ -0,0 +1,50 @@
+import pytest
+
+from app.services.sector_index import canonicalize
+
+
+@pytest.mark.parametrize(
+    "sector, canonical",
+    [
+        ("pharma", "pharmaceuticals"),
+        ("infra", "infrastructure"),
+        ("IT services", "information technology"),
+        ("telecom sector in India", "telecommunications"),
+        ("m&e", "media and entertainment"),
+    ],
+)
+def test_synonyms_and_abbreviations_fold_in(sector, canonical):
+    assert canonicalize(sector.lower()) == canonical
+
+
+@pytest.mark.parametrize("sector", ["railways", "ports", "roads", "biotech", "two wheelers", "semiconductors"])
+def test_sub_sectors_keep_their_own_name(sector):
+    assert canonicalize(sector) == sector
+
+
+@pytest.mark.parametrize(
+    "sector, canonical",
+    [
+        ("telecommunication", "telecommunications"),
+        ("logistic", "logistics"),
+        ("telecomunications", "telecommunications"),
+        ("renewable energies", "renewable energy"),
+    ],
+)
+def test_typos_and_plurals_fold_in(sector, canonical):
+    assert canonicalize(sector) == canonical
+
+
+@pytest.mark.parametrize(
+    "sector",
+    [
+        "healthcare it",
+        "renewable energy finance",
+        "real estate finance",
+        "life insurance",
+        "infrastructure finance",
+        "insurance broker",
+    ],
+)
+def test_similar_but_narrower_sectors_keep_their_own_name(sector):
+    assert canonicalize(sector) == sector
@@ -0,0 +1,121 @@
+import asyncio
+import threading
+import time
+from datetime import timedelta
+
+import pytest
+from fastapi import HTTPException
+
+from app.core import security
+from app.core.security import create_access_token, get_current_user, get_user
+
+
+@pytest.fixture
+def decodes(monkeypatch):
+    """Count the signature checks that reach python-jose."""
+    calls = []
+    decode = security.jwt.decode
+
+    def counting_decode(*args, **kwargs):
+        calls.append(args[0])
+        return decode(*args, **kwargs)
+
+    monkeypatch.setattr(security.jwt, "decode", counting_decode)
+    monkeypatch.setattr(security, "_verified_tokens", security.LRUCache(maxsize=2))
+    return calls
+
+
+def _user(token: str):
+    return asyncio.run(get_current_user(token))
+
+
+def test_verified_token_is_checked_once(decodes):
+    token = create_access_token({"sub": "prabal"})
+
+    users = [_user(token) for _ in range(3)]
+
+    assert len(decodes) == 1
+    # one shared, prebuilt record per user
+    assert users[0] is users[2] is get_user("prabal")
+
+
+def test_cache_is_not_trusted_past_the_token_exp(decodes, monkeypatch):
+    token = create_access_token({"sub": "prabal"}, expires_delta=timedelta(minutes=5))
+    _user(token)
+    _, exp = security._verified_tokens[token]
+
+    def expired(*args, **kwargs):
+        raise security.JWTError("Signature has expired.")
+
+    # past its exp, a cached token is checked again (and jose rejects it)
+    monkeypatch.setattr(security.time, "time", lambda: exp + 1)
+    monkeypatch.setattr(security.jwt, "decode", expired)
+    with pytest.raises(HTTPException) as rejected:
+        _user(token)
+
+    assert rejected.value.status_code == 401
+    assert token not in security._verified_tokens
+
+
+def test_expired_and_forged_tokens_are_rejected_and_not_cached(decodes):
+    expired = create_access_token({"sub": "prabal"}, expires_delta=timedelta(seconds=-5))
+    forged = create_access_token({"sub": "prabal"})[:-2] + "xx"
+
+    for token in (expired, forged, "not-a-jwt"):
+        with pytest.raises(HTTPException):
+            _user(token)
+
+    assert len(security._verified_tokens) == 0
+
+
+def test_token_cache_is_bounded(decodes):
+    tokens = [create_access_token({"sub": "prabal", "n": n}) for n in range(3)]
+
+    for token in tokens:
+        _user(token)
+
+    assert len(security._verified_tokens) == 2
+    assert tokens[0] not in security._verified_tokens
+
+
+def test_login_checks_the_password_off_the_event_loop():
+    async def scenario():
+        return (
+            await security.authenticate_user("prabal", "prabal123"),
+            await security.authenticate_user("prabal", "wrong"),
+            await security.authenticate_user("nobody", "prabal123"),
+        )
+
+    ok, wrong, unknown = asyncio.run(scenario())
+
+    assert ok is get_user("prabal")
+    assert wrong is None and unknown is None
+
+
+def test_password_checks_are_capped_and_excess_logins_shed(monkeypatch):
+    verifier = security.PasswordVerifier(max_workers=2, max_queue=3)
+    running, peak, threads = [0], [0], set()
+
+    def slow_verify(plain, hashed):
+        running[0] += 1
+        peak[0] = max(peak[0], running[0])
+        threads.add(threading.current_thread())
+        time.sleep(0.02)
+        running[0] -= 1
+        return plain == hashed
+
+    monkeypatch.setattr(security, "verify_password", slow_verify)
+
+    async def scenario():
+        return await asyncio.gather(
+            *(verifier.verify("pw", "pw") for _ in range(6)), return_exceptions=True
+        )
+
+    results = asyncio.run(scenario())
+
+    # 2 run, 3 queue, the sixth is turned away
+    assert results[:5] == [True] * 5
+    assert isinstance(results[5], HTTPException) and results[5].status_code == 503
+    assert peak[0] == 2
+    assert threading.main_thread() not in threads
+    assert verifier.stats()["rejected"] == 1
@@ -0,0 +1,49 @@
+import os
+
+import pytest
+
+from app import serve
+from app.core import shared_state
+
+
+@pytest.fixture(autouse=True)
+def environment(monkeypatch):
+    # configure_workers writes os.environ for the worker processes
+    environ = dict(os.environ)
+    for name in ("RATE_LIMIT_BACKEND", "SESSION_BACKEND"):
+        environ.pop(name, None)
+    monkeypatch.setattr(os, "environ", environ)
+
+
+@pytest.fixture
+def without_fcntl(monkeypatch):
+    monkeypatch.setattr(shared_state, "supported", lambda: False)
+    monkeypatch.setattr(serve.settings, "server_workers", None)
+    monkeypatch.setattr(serve.settings, "rate_limit_backend", "memory")
+    monkeypatch.setattr(serve.settings, "session_backend", "memory")
+
+
+def test_several_workers_without_fcntl_exit_with_a_hint(without_fcntl):
+    with pytest.raises(SystemExit) as exited:
+        serve.configure_workers(4)
+    assert "RATE_LIMIT_BACKEND=redis and SESSION_BACKEND=redis" in str(exited.value)
+    assert "RATE_LIMIT_BACKEND" not in os.environ
+
+
+def test_redis_backends_work_without_fcntl(without_fcntl, monkeypatch):
+    monkeypatch.setattr(serve.settings, "rate_limit_backend", "redis")
+    monkeypatch.setattr(serve.settings, "session_backend", "redis")
+    serve.configure_workers(4)
+    assert "RATE_LIMIT_BACKEND" not in os.environ
+
+
+def test_one_worker_by_default_without_fcntl(without_fcntl):
+    assert serve.default_workers() == 1
+    serve.configure_workers(1)
+
+
+def test_memory_backends_switch_to_shm(monkeypatch):
+    monkeypatch.setattr(serve.settings, "rate_limit_backend", "memory")
+    monkeypatch.setattr(serve.settings, "session_backend", "memory")
+    serve.configure_workers(2)
+    assert os.environ["RATE_LIMIT_BACKEND"] == os.environ["SESSION_BACKEND"] == "shm"
@@ -0,0 +1,60 @@
+import asyncio
+
+import pytest
+
+from app.core import shared_state
+from app.core.session import InMemorySessionBackend, SharedMemorySessionBackend
+
+
+def test_counts_calls_per_user():
+    store = InMemorySessionBackend(max_sessions=10, idle_seconds=60)
+    store.touch_at("alice", 100.0)
+    record = store.touch_at("alice", 130.0)
+
+    assert (record.calls, record.created_at, record.last_call_at) == (2, 100.0, 130.0)
+
+
+def test_idle_sessions_expire():
+    store = InMemorySessionBackend(max_sessions=10, idle_seconds=60)
+    store.touch_at("alice", 100.0)
+    store.touch_at("bob", 150.0)
+    store.touch_at("carol", 200.0)  # alice idle for 100 s
+
+    assert len(store) == 2
+    assert store.touch_at("alice", 201.0).calls == 1
+    assert asyncio.run(store.stats())["expired"] == 1
+
+
+def test_full_store_evicts_the_least_recently_active():
+    store = InMemorySessionBackend(max_sessions=2, idle_seconds=3600)
+    store.touch_at("alice", 100.0)
+    store.touch_at("bob", 100.1)
+    store.touch_at("alice", 100.2)  # bob is now the least recently active
+    store.touch_at("carol", 100.3)
+
+    assert len(store) == 2
+    assert store.touch_at("alice", 100.4).calls == 3
+    assert store.touch_at("bob", 100.5).calls == 1
+    assert asyncio.run(store.stats())["evicted"] == 2
+
+
+@pytest.mark.skipif(not shared_state.supported(), reason="needs POSIX fcntl")
+def test_shared_sessions_are_seen_by_every_worker_and_bounded(tmp_path):
+    workers = [
+        SharedMemorySessionBackend(str(tmp_path), max_sessions=64, idle_seconds=3600)
+        for _ in range(2)
+    ]
+
+    async def scenario():
+        await workers[0].touch("alice")
+        await workers[1].touch("alice")
+        alice = await workers[0].get("alice")
+        for n in range(200):
+            await workers[n % 2].touch(f"user-{n}")
+        return alice, await workers[1].get("user-198"), await workers[0].stats()
+
+    alice, record, stats = asyncio.run(scenario())
+
+    assert alice.calls == 2
+    assert record.calls == 1
+    assert stats["sessions"] <= 64
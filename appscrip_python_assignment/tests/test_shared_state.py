@@ -0,0 +1,53 @@
+import os
+import stat
+
+import pytest
+
+from app.core import shared_state
+
+pytestmark = pytest.mark.skipif(not shared_state.supported(), reason="needs POSIX fcntl")
+
+
+def _table(directory) -> shared_state.SharedTable:
+    return shared_state.SharedTable(
+        os.path.join(directory, "buckets.bin"),
+        fields=("tokens", "touched"),
+        capacity=8,
+        touched_field="touched",
+        idle_seconds=60,
+    )
+
+
+def test_creates_a_private_directory(tmp_path):
+    directory = tmp_path / "state"
+    _table(directory)
+
+    assert stat.S_IMODE(directory.stat().st_mode) & 0o077 == 0
+
+
+@pytest.mark.parametrize("mode", [0o775, 0o777])
+def test_refuses_a_directory_others_can_write(tmp_path, mode):
+    directory = tmp_path / "state"
+    directory.mkdir()
+    directory.chmod(mode)
+
+    with pytest.raises(RuntimeError, match="SHARED_STATE_DIR"):
+        _table(directory)
+
+
+def test_refuses_a_symlinked_directory(tmp_path):
+    (tmp_path / "elsewhere").mkdir(mode=0o700)
+    (tmp_path / "state").symlink_to(tmp_path / "elsewhere")
+
+    with pytest.raises(RuntimeError):
+        _table(tmp_path / "state")
+
+
+@pytest.mark.skipif(os.geteuid() != 0, reason="needs root to hand the directory to another user")
+def test_refuses_a_directory_owned_by_someone_else(tmp_path):
+    directory = tmp_path / "state"
+    directory.mkdir(mode=0o700)
+    os.chown(directory, 12345, -1)
+
+    with pytest.raises(RuntimeError):
+        _table(directory)
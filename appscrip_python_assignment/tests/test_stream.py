@@ -0,0 +1,98 @@
+import asyncio
+import json
+
+from fastapi import Response
+
+from app.api import routes_analyze
+from app.core.admission import admission
+from app.core.cache import report_cache
+from app.core.security import get_user
+from app.schemas.analyze import AIAnalysis, CollectedData, MarketItem
+from app.services import pipeline
+from app.services.incremental import FULL, RefreshPlan
+
+
+async def _collect(sector: str, country: str = "India") -> CollectedData:
+    item = MarketItem(
+        title=f"{sector} orders rise", url=f"https://news.example.com/{sector}",
+        snippet=f"{sector} demand improved", source="duckduckgo",
+    )
+    return CollectedData(sector=sector, items=[item])
+
+
+async def _full_plan(collected: CollectedData) -> RefreshPlan:
+    return RefreshPlan(FULL)
+
+
+async def _events(sector: str):
+    response = await routes_analyze.analyze_sector_stream(sector, Response(), current_user=None)
+    events = []
+    async for chunk in response.body_iterator:
+        event, data = chunk.split("\n")[:2]
+        events.append((event.removeprefix("event: "), json.loads(data.removeprefix("data: "))))
+    return events
+
+
+def test_concurrent_streams_share_one_gemini_stream(monkeypatch):
+    streams = 0
+
+    async def stream(collected, previous=None):
+        nonlocal streams
+        streams += 1
+        for field, value in (("summary", "steady"), ("risks", ["costs"])):
+            await asyncio.sleep(0.02)
+            yield field, AIAnalysis(summary="steady", risks=["costs"] if field == "risks" else [])
+
+    monkeypatch.setattr(pipeline, "collect_sector_info", _collect)
+    monkeypatch.setattr(pipeline, "plan_analysis", _full_plan)
+    monkeypatch.setattr(pipeline, "stream_analysis_with_gemini", stream)
+
+    async def scenario():
+        first = asyncio.ensure_future(_events("sharedstream"))
+        await asyncio.sleep(0.03)  # joins mid-stream
+        return await asyncio.gather(first, _events("sharedstream"), _events("sharedstream"))
+
+    results = asyncio.run(scenario())
+
+    assert streams == 1
+    for events in results:
+        sections = [data["section"] for event, data in events if event == "section"]
+        assert sections[:3] == ["header", "sources", "summary"]
+        assert "risks" in sections
+        assert events[-1][0] == "done"
+    assert len({events[-1][1]["markdown_report"] for events in results}) == 1
+    assert report_cache.peek("sharedstream", "India").analysis.risks == ["costs"]
+
+
+def test_stream_failure_reaches_every_follower(monkeypatch):
+    async def stream(collected, previous=None):
+        await asyncio.sleep(0.02)
+        raise RuntimeError("upstream broke")
+        yield  # pragma: no cover
+
+    monkeypatch.setattr(pipeline, "collect_sector_info", _collect)
+    monkeypatch.setattr(pipeline, "plan_analysis", _full_plan)
+    monkeypatch.setattr(pipeline, "stream_analysis_with_gemini", stream)
+
+    async def scenario():
+        return await asyncio.gather(_events("brokenstream"), _events("brokenstream"))
+
+    for events in asyncio.run(scenario()):
+        assert events[-1][0] == "error"
+        assert "upstream broke" in events[-1][1]["detail"]
+    assert report_cache.peek("brokenstream", "India") is None
+
+
+def test_only_a_stream_that_generates_takes_an_admission_slot():
+    async def admitted(sector: str) -> int:
+        before = admission.admitted
+        dependency = routes_analyze.stream_admission(sector, current_user=get_user("prabal"))
+        await dependency.__anext__()
+        await dependency.aclose()
+        return admission.admitted - before
+
+    async def scenario():
+        report_cache.put("cachedstream", "India", await _collect("cachedstream"), AIAnalysis(summary="steady"))
+        return await admitted("cachedstream"), await admitted("uncachedstream")
+
+    assert asyncio.run(scenario()) == (0, 1)
@@ -0,0 +1,89 @@
+import json
+
+import pytest
+
+from app.utils.text import JsonObjectStream, extract_json_object
+
+KEYS = ("summary", "risks", "opportunities")
+
+
+def _feed(chunks, expected_keys=None):
+    parser = JsonObjectStream(expected_keys)
+    members = [member for chunk in chunks for member in parser.feed(chunk)]
+    return members, parser
+
+
+def test_chunk_boundary_inside_a_string_escape():
+    text = json.dumps({"summary": 'steel "rebar" demand \\ rises', "risks": ["a, b}"]})
+    # every split point, including right after a backslash
+    for cut in range(1, len(text)):
+        members, _ = _feed([text[:cut], text[cut:]])
+        assert dict(members) == json.loads(text), cut
+
+
+def test_members_are_returned_as_soon_as_they_close():
+    parser = JsonObjectStream()
+
+    assert parser.feed('{"summary": "ok", "risks": ["a"') == [("summary", "ok")]
+    assert parser.feed('], "time') == [("risks", ["a"])]
+    assert parser.feed('_horizon": "short"}') == [("time_horizon", "short")]
+    assert parser.done
+
+
+def test_braces_in_prose_before_the_object_are_skipped():
+    text = 'Use the format {see below}, e.g. {"x"}.\n{"summary": "ok", "risks": []}'
+
+    assert extract_json_object(text) == {"summary": "ok", "risks": []}
+    members, _ = _feed([text[:20], text[20:]])
+    assert dict(members) == {"summary": "ok", "risks": []}
+
+
+def test_json_fences_are_ignored():
+    text = 'Here you go:\n```json\n{"summary": "ok", "risks": ["costs"]}\n```\nAnything else?'
+
+    assert extract_json_object(text) == {"summary": "ok", "risks": ["costs"]}
+    members, _ = _feed(text.split("\n"))
+    assert dict(members) == {"summary": "ok", "risks": ["costs"]}
+
+
+def test_truncated_output_keeps_completed_members():
+    text = '```json\n{"summary": "ok", "risks": ["a", "b"], "opportunities": ["exp'
+
+    assert extract_json_object(text) == {"summary": "ok", "risks": ["a", "b"]}
+
+
+def test_malformed_member_is_skipped():
+    text = '{"summary": "ok", "risks": [oops], "opportunities": ["c"]}'
+
+    assert extract_json_object(text) == {"summary": "ok", "opportunities": ["c"]}
+
+
+def test_unexpected_keys_are_dropped():
+    text = '{"summary": "ok", "confidence": 0.9, "risks": []}'
+
+    assert extract_json_object(text, KEYS) == {"summary": "ok", "risks": []}
+    members, _ = _feed([text], KEYS)
+    assert [key for key, _ in members] == ["summary", "risks"]
+
+
+def test_missing_keys_return_what_was_found():
+    members, parser = _feed(['{"summary": "ok"}'], KEYS)
+
+    assert members == [("summary", "ok")]
+    assert parser.done
+    assert parser.seen_keys == {"summary"}
+    with pytest.raises(ValueError):
+        extract_json_object('{"confidence": 0.9}', KEYS)
+
+
+def test_stops_once_every_expected_key_is_seen():
+    members, parser = _feed(['{"summary": "ok", "risks": [], "opportunities": [], "extra": ['], KEYS)
+
+    assert parser.done
+    assert [key for key, _ in members] == list(KEYS)
+    assert parser.feed('"more"]}') == []
+
+
+def test_no_object_at_all():
+    with pytest.raises(ValueError):
+        extract_json_object("The model declined to answer.")